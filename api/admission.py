@@ -0,0 +1,174 @@
+"""
+Admission control: how many requests of each kind run at once.
+
+Rate limits are per client address, so one busy clinic behind a NAT can still
+fill every worker with renders. Admission control bounds the work itself: each
+lane (renders, batches, downloads, pages) runs at most `limit` requests at once
+in this process and lets at most `max_queue` more wait, each for at most
+`queue_timeout` seconds. Anything beyond that is shed with a 503 and a
+Retry-After, instead of piling up and timing out later. Lanes don't share slots,
+so downloads and pages never wait behind renders for one; RENDER_NICE in app.py
+keeps them from waiting behind renders for the CPU.
+"""
+import functools
+import logging
+import math
+import threading
+import time
+
+from metrics import METRICS
+
+
+class Overloaded(Exception):
+    """A lane shed a request; retry_after is the suggested wait in whole seconds."""
+
+    def __init__(self, lane, reason, retry_after):
+        super().__init__(f"{lane} lane {reason}")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Lane:
+    """
+    A bounded number of slots with a bounded, deadline-limited FIFO queue.
+
+    - acquire() takes a slot, waiting in line if all are busy, or raises
+      Overloaded when the queue is full or the wait passes queue_timeout.
+    - release() frees the slot for the longest waiting request.
+    - Each request's wait is timed as the 'admission_wait' stage on /metrics.
+    """
+
+    # Weight of the latest hold time in the moving average used for Retry-After
+    SMOOTHING = 0.2
+
+    def __init__(self, name, limit, max_queue=0, queue_timeout=0.0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self._hold_seconds = 1.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Takes a slot and returns the time it was taken (for release())."""
+        start = time.perf_counter()
+        with self._cond:
+            # Newcomers only skip the line if nobody is in it
+            if self.active < self.limit and self.queued == 0:
+                return self._admit(start)
+            if self.queued >= self.max_queue:
+                self.shed_queue_full += 1
+                raise self._shed('queue full')
+
+            self.queued += 1
+            deadline = start + self.queue_timeout
+            try:
+                while self.active >= self.limit:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self.shed_timeout += 1
+                        raise self._shed('queue timeout')
+                    self._cond.wait(remaining)
+            finally:
+                self.queued -= 1
+            return self._admit(start)
+
+    def _admit(self, start):
+        self.active += 1
+        self.admitted += 1
+        now = time.perf_counter()
+        METRICS.observe('admission_wait', now - start, self.name)
+        return now
+
+    def _shed(self, reason):
+        return Overloaded(self.name, reason, self.retry_after())
+
+    def release(self, acquired):
+        with self._cond:
+            self.active -= 1
+            held = time.perf_counter() - acquired
+            self._hold_seconds += self.SMOOTHING * (held - self._hold_seconds)
+            self._cond.notify()
+
+    def retry_after(self):
+        """Seconds until the queue ahead of a new request should have drained."""
+        return max(1, math.ceil(self._hold_seconds * (self.queued + self.active + 1) / max(self.limit, 1)))
+
+    def stats(self):
+        return {
+            'limit': self.limit,
+            'active': self.active,
+            'queued': self.queued,
+            'admitted': self.admitted,
+            'shed_queue_full': self.shed_queue_full,
+            'shed_timeout': self.shed_timeout,
+        }
+
+
+class AdmissionController:
+    """
+    The app's lanes, by name: {name: {'limit', 'max_queue', 'queue_timeout'}}.
+
+    - admitted(lane) decorates a view so it only runs while holding a slot.
+    - acquire(lane) / release(lane, token) for work that outlives its view, such
+      as a streamed response; releaser(lane, token) wraps release() so it can be
+      called from every path that may end that work.
+    - enabled = False admits everything, e.g. to compare load tests with and without.
+    - reset() rebuilds the lanes, e.g. once gevent has patched threading in a
+      worker: a greenlet waiting on a real thread lock would block all the others.
+    """
+
+    def __init__(self, lanes):
+        self.settings = lanes
+        self.enabled = True
+        self.reset()
+
+    def reset(self):
+        self.lanes = {name: Lane(name, **settings) for name, settings in self.settings.items()}
+
+    def acquire(self, lane):
+        if not self.enabled:
+            return None
+        try:
+            return self.lanes[lane].acquire()
+        except Overloaded as e:
+            logging.warning(f"Shed a request: {str(e)}, retry after {e.retry_after} s")
+            raise
+
+    def release(self, lane, token):
+        if token is not None:
+            self.lanes[lane].release(token)
+
+    def releaser(self, lane, token):
+        """A function that gives back token's slot the first time it's called and does nothing after."""
+        once = threading.Lock()
+
+        def release():
+            if once.acquire(blocking=False):
+                self.release(lane, token)
+        return release
+
+    def admitted(self, lane):
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                token = self.acquire(lane)
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    self.release(lane, token)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        stats = {}
+        for name, lane in self.lanes.items():
+            for key, value in lane.stats().items():
+                stats[f'{name}_{key}'] = value
+        return stats
@@ -1,30 +1,144 @@
-from flask import Flask, render_template, request, send_file
-from docx import Document
+import time
+
+# Start of the cold start, so the 'startup' stage on /metrics includes importing Flask
+IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, Response, g, jsonify, render_template, request, send_file, stream_with_context, url_for
+import csv
+import io
 import os
+import sys
+import uuid
 from datetime import datetime
-import zipfile
 import logging
-import re
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+# Sibling modules live next to this file; make them importable however the app is launched
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from admission import AdmissionController, Overloaded
+from batch import detect_format, iter_batch_zip, read_records, record_to_form
+from bundles import BundleError, BundleStore, CompressionPolicy, DiskBundleStore, build_zip, start_sweeper
+from forms import FORM_TYPES
+from jobs import JobQueue
+from metrics import METRICS
+from page_cache import PageCache, StaticFingerprints
+# Registers the sqlite:// storage used by the limiter below
+import rate_limit_storage  # noqa: F401
+from render_cache import RenderCache
+from rendering import RenderExecutor
+from structured_logging import request_id_var, setup_logging
+from template_registry import TemplateRegistry
+from tenants import TenantRegistry
+from warmup import WarmUp
+
 app = Flask(__name__, static_folder="../static", template_folder="../templates")
 
 # Define directories using /tmp/ for Vercel compatibility
 LOGS_DIR = "/tmp/logs"
-OUTPUT_DIR = "/tmp/output"
-DOWNLOAD_DIR = "/tmp/downloads"
 TEMPLATES_DIR = "templates_docx"
 
+# Clinic details filled into the {tenant_*} placeholders, one JSON profile per
+# tenant. Requests pick one with a 'tenant' parameter, else DEFAULT_TENANT.
+TENANTS_DIR = "tenants"
+DEFAULT_TENANT = "cryoconserve"
+# Memory for each tenant's partially filled templates, and how many tenants to keep them for
+TENANT_BASE_MAX_BYTES = 8 * 1024 * 1024
+TENANT_BASE_MAX_TENANTS = 16
+
+# Upper bound on the memory held by generated ZIPs waiting to be downloaded (on
+# disk with a DiskBundleStore, shared by all worker processes)
+MAX_BUNDLE_STORE_BYTES = 64 * 1024 * 1024
+
+# ZIPs not downloaded within this many seconds are deleted by a background sweep
+# run every BUNDLE_SWEEP_INTERVAL seconds
+BUNDLE_MAX_AGE = 60 * 60
+BUNDLE_SWEEP_INTERVAL = 60
+
+# None keeps ZIPs in this process's memory. With several worker processes, set a
+# directory (e.g. "/tmp/bundles") so any worker can serve any download.
+BUNDLE_STORE_DIR = None
+
+# How members of the downloaded ZIP are compressed. The .docx files are already
+# deflated, so they are stored as-is; other members use this deflate level.
+BUNDLE_COMPRESSION = CompressionPolicy(compresslevel=6)
+
+# How a submission's documents are rendered: 'thread', 'process' or 'serial',
+# with RENDER_WORKERS workers (None means one per core)
+RENDER_EXECUTOR = 'thread'
+RENDER_WORKERS = None
+# Nice value of the render threads (or processes). Above 0, page views and downloads
+# get the CPU ahead of renders, so they stay fast while generation is saturated.
+RENDER_NICE = 10
+
+# Rendered documents kept for resubmissions: memory cap and seconds each entry stays valid
+RENDER_CACHE_MAX_BYTES = 32 * 1024 * 1024
+RENDER_CACHE_TTL = 15 * 60
+
+# When True, /generate_* validate the form, queue the rendering as a background job
+# and return straight away; success.html polls /jobs/<id> until the ZIP is ready
+ASYNC_GENERATION = False
+JOB_WORKERS = 4
+
+# Executor used for /generate_batch; processes scale past the GIL for big uploads
+BATCH_EXECUTOR = 'process'
+
+# Versioned JSON API for intake systems (/api/v1/documents/...): one POST returns
+# the ZIP, or a single .docx, in its response. Limits are per client address and
+# separate from the HTML forms' limits.
+API_BUNDLE_RATE_LIMIT = "30 per minute"
+API_DOCUMENT_RATE_LIMIT = "60 per minute"
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+# /validate/<form_type> is called as the user types (debounced in the page scripts)
+VALIDATE_RATE_LIMIT = "300 per minute"
+
+# Admission control, per worker process and across all clients: each lane runs at
+# most 'limit' requests at once, lets 'max_queue' more wait up to 'queue_timeout'
+# seconds, and answers the rest 503 with a Retry-After. Renders are bounded
+# tightly so the lanes for downloads and pages stay fast when generation is saturated.
+ADMISSION_LANES = {
+    'render': {'limit': 2, 'max_queue': 8, 'queue_timeout': 5.0},
+    'batch': {'limit': 1, 'max_queue': 0, 'queue_timeout': 0.0},
+    'download': {'limit': 16, 'max_queue': 32, 'queue_timeout': 2.0},
+    'page': {'limit': 16, 'max_queue': 32, 'queue_timeout': 1.0},
+}
+
+# Where rate limit counters live. memory:// is per process, so every worker would
+# count separately; the SQLite file is shared by all workers on the host. Any
+# limits storage URI works here too, e.g. redis://localhost:6379 across hosts.
+RATELIMIT_STORAGE_URI = "sqlite:////tmp/ratelimit.sqlite"
+# Sliding window counter: smooth limits with two counters per client and limit
+RATELIMIT_STRATEGY = "sliding-window-counter"
+
+# app.log is JSON lines written by a background thread, rotated at LOG_MAX_BYTES
+# with LOG_BACKUP_COUNT old files kept. Only 1 in LOG_INFO_SAMPLE_EVERY INFO lines
+# from each call site is written; warnings, errors and request summaries always are.
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_INFO_SAMPLE_EVERY = 10
+
+# The home page and blank forms are rendered once a day into memory and served
+# with ETags; this bounds how many (page, tenant) variants are kept
+PAGE_CACHE_MAX_ENTRIES = 64
+# Static files linked with a ?v=<content hash> are cached by browsers this long
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+
+# Templates are parsed, and the default tenant's copies built, on a background
+# thread once the first response has been sent, so a cold start doesn't wait for
+# them (python-docx isn't even imported until then). False loads them at import.
+WARM_UP_IN_BACKGROUND = True
+
 # Create directories if they don't exist
-for directory in [LOGS_DIR, OUTPUT_DIR, DOWNLOAD_DIR]:
-    os.makedirs(directory, exist_ok=True)
+os.makedirs(LOGS_DIR, exist_ok=True)
 
 # Setup logging
-logging.basicConfig(
-    filename=os.path.join(LOGS_DIR, 'app.log'),
+setup_logging(
+    os.path.join(LOGS_DIR, 'app.log'),
     level=logging.INFO,
-    format='%(asctime)s %(levelname)s: %(message)s'
+    max_bytes=LOG_MAX_BYTES,
+    backup_count=LOG_BACKUP_COUNT,
+    sample_every=LOG_INFO_SAMPLE_EVERY,
 )
 
 # Setup rate limiting
@@ -32,569 +146,492 @@ limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    storage_uri=RATELIMIT_STORAGE_URI,
+    strategy=RATELIMIT_STRATEGY,
 )
 
+# Generated ZIPs are kept until downloaded or expired, looked up by an opaque token
+if BUNDLE_STORE_DIR:
+    bundle_store = DiskBundleStore(BUNDLE_STORE_DIR, MAX_BUNDLE_STORE_BYTES, BUNDLE_MAX_AGE)
+else:
+    bundle_store = BundleStore(MAX_BUNDLE_STORE_BYTES, BUNDLE_MAX_AGE)
+bundle_sweeper = start_sweeper(bundle_store, BUNDLE_SWEEP_INTERVAL)
+
+def use_disk_bundle_store(directory):
+    """
+    Switches to a DiskBundleStore in directory, so that with several worker
+    processes (see server.py) any of them can serve any download. Called in
+    server.py's master before it forks: threads don't survive a fork, so the
+    master's sweeper is the only one for the directory.
+    """
+    global bundle_store, bundle_sweeper
+    bundle_sweeper.set()
+    bundle_store = DiskBundleStore(directory, MAX_BUNDLE_STORE_BYTES, BUNDLE_MAX_AGE)
+    bundle_sweeper = start_sweeper(bundle_store, BUNDLE_SWEEP_INTERVAL)
+    METRICS.add_stats('bundle_store', bundle_store.stats)
+
+# Parsed .docx templates, shared by all requests
+template_registry = TemplateRegistry(TEMPLATES_DIR, TENANT_BASE_MAX_BYTES, TENANT_BASE_MAX_TENANTS)
+
+# Clinic profiles for the {tenant_*} placeholders
+tenant_registry = TenantRegistry(TENANTS_DIR)
+
+# Documents rendered for earlier submissions, reused when a donor is resubmitted
+render_cache = RenderCache(RENDER_CACHE_MAX_BYTES, RENDER_CACHE_TTL)
+
+# Renders a submission's templates concurrently
+render_executor = RenderExecutor(template_registry, mode=RENDER_EXECUTOR, workers=RENDER_WORKERS, cache=render_cache, nice=RENDER_NICE)
+
+# Pages that only change daily, and the content hashes that version static URLs
+page_cache = PageCache(PAGE_CACHE_MAX_ENTRIES)
+static_fingerprints = StaticFingerprints(app.static_folder)
+
+@app.template_global()
+def static_url(filename):
+    """URL of a static file that changes whenever its content does, so it can be cached long."""
+    return url_for('static', filename=filename, v=static_fingerprints.version(filename))
+
+# Background generation jobs for ASYNC_GENERATION
+job_queue = JobQueue(JOB_WORKERS)
+
+# Batch uploads render across a separate pool so they don't starve single submissions
+batch_executor = RenderExecutor(template_registry, mode=BATCH_EXECUTOR, workers=RENDER_WORKERS, nice=RENDER_NICE)
+
+# Bounds concurrent work per lane; see ADMISSION_LANES
+admission = AdmissionController(ADMISSION_LANES)
+
+# Registry, cache, bundle and job counters exported on /metrics next to the stage timings
+METRICS.add_stats('template_registry', template_registry.stats)
+METRICS.add_stats('tenant_bases', template_registry.tenant_bases.stats)
+METRICS.add_stats('render_cache', render_cache.stats)
+METRICS.add_stats('bundle_store', bundle_store.stats)
+METRICS.add_stats('jobs', job_queue.stats)
+METRICS.add_stats('page_cache', page_cache.stats)
+METRICS.add_stats('admission', admission.stats)
+
+def warm_tenant_bases():
+    """Builds the default tenant's partially filled copy of every template."""
+    tenant = tenant_registry.get(DEFAULT_TENANT)
+    if tenant is None:
+        return
+    for form_type in FORM_TYPES.values():
+        for template in form_type.templates:
+            entry = template_registry.get(template_registry.path_for(template['file']))
+            template_registry.tenant_bases.resolve(entry, tenant)
+
+def compile_page_templates():
+    """Compiles every Jinja page template, so the first visit to each form doesn't."""
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+def prerender_pages():
+    """Renders today's cached pages for the default tenant ahead of their first visit."""
+    for path, template, form_type_name in CACHED_PAGES:
+        with app.test_request_context(path):
+            cached_page(template, FORM_TYPES.get(form_type_name))
+
+warm_up = WarmUp([
+    ('templates', template_registry.preload),
+    ('tenant_bases', warm_tenant_bases),
+    ('pages', compile_page_templates),
+    ('page_cache', prerender_pages),
+])
+METRICS.add_stats('warm_up', warm_up.stats)
+if not WARM_UP_IN_BACKGROUND:
+    warm_up.run()
+
+@app.before_request
+def start_request():
+    request_id_var.set(request.headers.get('X-Request-ID') or uuid.uuid4().hex)
+    g.request_started = time.perf_counter()
+    g.stages = METRICS.start_request()
+
+@app.after_request
+def finish_request(response):
+    response.headers['X-Request-ID'] = request_id_var.get()
+    if request.endpoint == 'static' and request.args.get('v'):
+        # Fingerprinted URL: a changed file gets a new URL, so this one never goes stale
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    if not warm_up.started:
+        # Runs once the response has been sent, so the first request isn't slowed by it
+        response.call_on_close(start_warm_up)
+    if request.endpoint not in ('static', 'metrics'):
+        logging.info(
+            f"{request.method} {request.path} {response.status_code}",
+            extra={
+                'duration_ms': round((time.perf_counter() - g.request_started) * 1e3, 2),
+                'stages_ms': {stage: round(seconds * 1e3, 2) for stage, seconds in g.stages.items()},
+                # Per-keystroke validation calls are sampled like other INFO lines
+                'keep': request.endpoint != 'validate_form',
+            },
+        )
+    return response
+
+class ApiError(Exception):
+    """An /api/ request failed; answered as {"errors": [...]} with status."""
+
+    def __init__(self, status, errors):
+        super().__init__('; '.join(errors))
+        self.status = status
+        self.errors = errors
+
+def start_warm_up():
+    if warm_up.start():
+        METRICS.observe('startup', time.perf_counter() - IMPORT_STARTED, 'first_response')
+        logging.info(f"First response sent {(time.perf_counter() - IMPORT_STARTED) * 1e3:.0f} ms after startup, warming caches")
+
+def current_tenant():
+    """The TenantProfile the request asks for (DEFAULT_TENANT if none), or None if it doesn't exist."""
+    return tenant_registry.get(request.values.get('tenant') or DEFAULT_TENANT)
+
+def render_documents(form_type, form_data, tenant, timestamp, templates=None):
+    """Renders one submission into templates (by default all of the form type's); returns [(filename, bytes)]."""
+    documents = []
+    for template, future in render_executor.submit_all(templates or form_type.templates, form_data, tenant):
+        try:
+            data = future.result()
+            output_filename = form_type.output_filename(template, form_data, timestamp)
+            documents.append((output_filename, data))
+            logging.info(f"Generated {output_filename}")
+        except FileNotFoundError as e:
+            logging.error(f"Template file {template['file']} not found: {str(e)}")
+            raise BundleError([f"Template file {template['file']} not found."])
+        except Exception as e:
+            logging.error(f"Error processing {template['file']}: {str(e)}")
+            raise BundleError([f"Error processing document: {str(e)}"])
+    return documents
+
+def build_bundle(form_type, form_data, tenant):
+    """Renders every template for one submission into a ZIP and returns its download token."""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    zip_filename = form_type.zip_filename(form_data, timestamp)
+    documents = render_documents(form_type, form_data, tenant, timestamp)
+
+    try:
+        with METRICS.timer('zip_write', form_type.name):
+            data = build_zip(documents, BUNDLE_COMPRESSION)
+        token = bundle_store.put(zip_filename, data)
+    except Exception as e:
+        logging.error(f"Error creating ZIP file: {str(e)}")
+        raise BundleError([f"Error creating ZIP file: {str(e)}"])
+
+    logging.info(f"ZIP file created: {zip_filename} (render cache hit rate {render_cache.stats()['hit_rate']:.0%})")
+    return token
+
+def generate_bundle(form_type, form_data):
+    """Builds the submission's ZIP (or queues it in async mode) and returns the success or error page."""
+    tenant = current_tenant()
+    if tenant is None:
+        return render_template('error.html', errors=["Unknown clinic. Please check the link you used."], show_modal=True), 404
+    if ASYNC_GENERATION:
+        job_id = job_queue.submit(build_bundle, form_type, form_data, tenant)
+        logging.info(f"Queued job {job_id} for {form_type.name} documents")
+        return render_template('success.html', job_id=job_id, errors=[], donor_type=form_type.name)
+    try:
+        token = build_bundle(form_type, form_data, tenant)
+    except BundleError as e:
+        return render_template('error.html', errors=e.errors, show_modal=True)
+    return render_template('success.html', token=token, errors=[], donor_type=form_type.name)
+
+# Pages served through cached_page(): (path, template, form type or None)
+CACHED_PAGES = [('/', 'home.html', None)] + [
+    (f'/{name}', form_type.index_template, name) for name, form_type in FORM_TYPES.items()
+]
+
+def cached_page(template, form_type=None):
+    """
+    Serves template (a blank form_type form, if given) from page_cache with a
+    strong ETag; a request whose If-None-Match matches gets a 304 instead.
+    """
+    def render():
+        if form_type is None:
+            return render_template(template)
+        return render_template(template, form_data=form_type.schema.empty_form(), errors=[], today=datetime.now().date().isoformat())
+
+    # Pages carry the tenant in a hidden field, so each tenant gets its own copy
+    tenant = request.args.get('tenant', '')
+    if tenant and tenant_registry.get(tenant) is None:
+        # Unknown names aren't cached, so they can't crowd out real pages
+        return render()
+    page = page_cache.get((template, tenant), render)
+    response = Response(page.body, mimetype='text/html')
+    response.set_etag(page.etag)
+    # Browsers may keep the page but must revalidate, which costs a 304 at most
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @app.route('/')
 @limiter.limit("10 per minute")
+@admission.admitted('page')
 def home():
-    return render_template('home.html')
+    return cached_page('home.html')
 
 @app.route('/sperm')
 @limiter.limit("10 per minute")
+@admission.admitted('page')
 def sperm_index():
-    form_data = {
-        'full_name': '', 'address': '', 'pin_code': '', 'contact_number': '', 'aadhaar_number': '',
-        'date_of_birth': '', 'email_address': '', 'donor_id': '', 'date_of_discussion': '',
-        'date_of_consultancy': '', 'genetic_disorders': '', 'family_history': '', 'current_medications': '',
-        'allergies': '', 'last_medical_exam': '', 'hiv_results': '', 'hbv_results': '', 'hcv_results': '',
-        'vdrl_results': '', 'serious_illness': '', 'smoking': 'No', 'smoking_frequency': '',
-        'cigarettes_per_day': '', 'alcohol': 'No', 'alcohol_frequency': '', 'alcohol_amount': '',
-        'drug_use': 'No', 'diet': 'Not Specified', 'marital_status': 'Not Specified', 'num_children': '0',
-        'donor_experience': 'No', 'donation_frequency': '', 'height': '', 'weight': '', 'education': '',
-        'mother_tongue': '', 'skin_colour': '', 'hair_colour': '', 'eye_colour': '', 'religion': '',
-        'occupation': '', 'consent_cryopreservation': 'No', 'consent_art_bank': 'No', 'consent_registry': 'No'
-    }
-    return render_template('sperm_index.html', form_data=form_data, errors=[], today=datetime.now().date().isoformat())
+    form_type = FORM_TYPES['sperm']
+    return cached_page(form_type.index_template, form_type)
 
 @app.route('/oocyte')
 @limiter.limit("10 per minute")
+@admission.admitted('page')
 def oocyte_index():
-    form_data = {
-        'full_name': '', 'address': '', 'district': '', 'state': '', 'pin_code': '', 'contact_number': '',
-        'aadhaar_number': '', 'date_of_birth': '', 'age': '', 'email_address': '', 'date_of_discussion': '', 'date_of_consultancy': '',
-        'marital_status': 'Not Specified', 'num_children': '0', 'donor_id': '', 'last_medical_exam': '',
-        'hiv_results': '', 'hbv_results': '', 'hcv_results': '', 'vdrl_results': '', 'family_history': '',
-        'serious_illness': '', 'current_medications': '', 'allergies': '', 'antral_follicle_count': '',
-        'fsh_levels': '', 'amh_levels': '', 'tobacco_use': 'No', 'tobacco_frequency': '', 'alcohol': 'No',
-        'alcohol_frequency': '', 'drug_use': 'No', 'exercise_routine': '', 'consent_registry': 'No',
-        'place': '', 'ivf_name': '', 'ivf_address': '', 'doctor_name': ''
-    }
-    return render_template('oocyte_index.html', form_data=form_data, errors=[], today=datetime.now().date().isoformat())
+    form_type = FORM_TYPES['oocyte']
+    return cached_page(form_type.index_template, form_type)
 
 @app.route('/commissioning_couple')
 @limiter.limit("10 per minute")
+@admission.admitted('page')
 def commissioning_couple_index():
-    form_data = {
-        'female_name': '', 'male_name': '', 'female_age': '', 'female_dob': '', 'female_aadhaar': '',
-        'female_occupation': '', 'male_age': '', 'male_dob': '', 'address': '', 'district': '',
-        'state': '', 'pin_code': '', 'place': '', 'ivf_name': '', 'ivf_address': '', 'doctor_name': ''
-    }
-    return render_template('commissioning_couple_index.html', form_data=form_data, errors=[], today=datetime.now().date().isoformat())
+    form_type = FORM_TYPES['commissioning_couple']
+    return cached_page(form_type.index_template, form_type)
 
 @app.route('/generate_sperm', methods=['POST'])
 @limiter.limit("5 per minute")
+@admission.admitted('render')
 def generate_sperm_document():
     logging.info(f"Processing sperm donor form submission from {request.remote_addr}")
-    form_data = {
-        'full_name': request.form.get('full_name', '').strip(),
-        'address': request.form.get('address', '').strip(),
-        'pin_code': request.form.get('pin_code', '').strip(),
-        'contact_number': request.form.get('contact_number', '').strip(),
-        'aadhaar_number': request.form.get('aadhaar_number', '').strip(),
-        'date_of_birth': request.form.get('date_of_birth', '').strip(),
-        'email_address': request.form.get('email_address', '').strip(),
-        'donor_id': request.form.get('donor_id', '').strip(),
-        'date_of_discussion': request.form.get('date_of_discussion', '').strip(),
-        'date_of_consultancy': request.form.get('date_of_consultancy', '').strip(),
-        'genetic_disorders': request.form.get('genetic_disorders', '').strip(),
-        'family_history': request.form.get('family_history', '').strip(),
-        'current_medications': request.form.get('current_medications', '').strip(),
-        'allergies': request.form.get('allergies', '').strip(),
-        'last_medical_exam': request.form.get('last_medical_exam', '').strip(),
-        'hiv_results': request.form.get('hiv_results', '').strip(),
-        'hbv_results': request.form.get('hbv_results', '').strip(),
-        'hcv_results': request.form.get('hcv_results', '').strip(),
-        'vdrl_results': request.form.get('vdrl_results', '').strip(),
-        'serious_illness': request.form.get('serious_illness', '').strip(),
-        'smoking': request.form.get('smoking', 'No'),
-        'smoking_frequency': request.form.get('smoking_frequency', '').strip(),
-        'cigarettes_per_day': request.form.get('cigarettes_per_day', '').strip(),
-        'alcohol': request.form.get('alcohol', 'No'),
-        'alcohol_frequency': request.form.get('alcohol_frequency', '').strip(),
-        'alcohol_amount': request.form.get('alcohol_amount', '').strip(),
-        'drug_use': request.form.get('drug_use', 'No'),
-        'diet': request.form.get('diet', 'Not Specified'),
-        'marital_status': request.form.get('marital_status', 'Not Specified'),
-        'num_children': request.form.get('num_children', '0').strip(),
-        'donor_experience': request.form.get('donor_experience', 'No'),
-        'donation_frequency': request.form.get('donation_frequency', '').strip(),
-        'height': request.form.get('height', '').strip(),
-        'weight': request.form.get('weight', '').strip(),
-        'education': request.form.get('education', '').strip(),
-        'mother_tongue': request.form.get('mother_tongue', '').strip(),
-        'skin_colour': request.form.get('skin_colour', '').strip(),
-        'hair_colour': request.form.get('hair_colour', '').strip(),
-        'eye_colour': request.form.get('eye_colour', '').strip(),
-        'religion': request.form.get('religion', '').strip(),
-        'occupation': request.form.get('occupation', '').strip(),
-        'consent_cryopreservation': 'Yes' if request.form.get('consent_cryopreservation') else 'No',
-        'consent_art_bank': 'Yes' if request.form.get('consent_art_bank') else 'No',
-        'consent_registry': 'Yes' if request.form.get('consent_registry') else 'No',
-        'date': datetime.now().strftime('%d/%m/%y')
-    }
-
-    # Server-side validation
-    required_fields = ['full_name', 'aadhaar_number', 'date_of_discussion', 'date_of_consultancy']
-    errors = []
-    for field in required_fields:
-        if not form_data[field]:
-            errors.append(f"{field.replace('_', ' ').title()} is required.")
-
-    # Validate Aadhaar number
-    if form_data['aadhaar_number'] and not re.match(r'^\d{12}$', form_data['aadhaar_number']):
-        errors.append("Aadhaar Number must be 12 digits.")
-
-    # Validate email format
-    if form_data['email_address'] and not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', form_data['email_address']):
-        errors.append("Invalid email address.")
-
-    # Validate phone number
-    if form_data['contact_number'] and not re.match(r'^\d{10}$|^$', form_data['contact_number']):
-        errors.append("Contact Number must be 10 digits if provided.")
-
-    # Validate PIN code
-    if form_data['pin_code'] and not re.match(r'^\d{6}$|^$', form_data['pin_code']):
-        errors.append("PIN Code must be 6 digits if provided.")
-
-    # Validate dates
-    today = datetime.now().date()
-    for date_field in ['date_of_birth', 'last_medical_exam', 'date_of_discussion', 'date_of_consultancy']:
-        if form_data[date_field]:
-            try:
-                input_date = datetime.strptime(form_data[date_field], '%Y-%m-%d').date()
-                if input_date > today:
-                    errors.append(f"{date_field.replace('_', ' ').title()} cannot be in the future.")
-            except ValueError:
-                errors.append(f"Invalid format for {date_field.replace('_', ' ').title()}.")
-
-    # Validate number of children
-    try:
-        num_children = int(form_data['num_children']) if form_data['num_children'] else 0
-        if num_children < 0:
-            errors.append("Number of children cannot be negative.")
-        elif num_children > 20:
-            errors.append("Number of children cannot exceed 20.")
-    except ValueError:
-        errors.append("Number of children must be a valid number.")
-        num_children = 0
-
-    # Validate children ages
-    children_ages = []
-    for i in range(1, num_children + 1):
-        age = request.form.get(f'child_{i}_age', '').strip()
-        try:
-            if age:
-                age_val = int(age)
-                if age_val < 0 or age_val > 100:
-                    errors.append(f"Child {i} Age must be between 0 and 100.")
-                children_ages.append(f"Child {i}: Age: {age}")
-            else:
-                children_ages.append(f"Child {i}: Age: N/A")
-        except ValueError:
-            errors.append(f"Child {i} Age must be a valid number.")
-
-    # Validate conditional fields
-    if form_data['smoking'] == 'Yes' and not (form_data['smoking_frequency'] and form_data['cigarettes_per_day']):
-        errors.append("Smoking Frequency and Cigarettes per Day are required if smoking is Yes.")
-    if form_data['alcohol'] == 'Yes' and not (form_data['alcohol_frequency'] and form_data['alcohol_amount']):
-        errors.append("Alcohol Frequency and Amount are required if alcohol consumption is Yes.")
-
-    # Validate blood test results
-    for field in ['hiv_results', 'hbv_results', 'hcv_results', 'vdrl_results']:
-        if form_data[field] and form_data[field].lower() not in ['negative', 'positive', 'pending', '']:
-            errors.append(f"{field.replace('_', ' ').title()} must be 'Negative', 'Positive', or 'Pending'.")
+    form_type = FORM_TYPES['sperm']
+    with METRICS.timer('form_parsing', form_type.name):
+        form = request.form
+    with METRICS.timer('validation', form_type.name):
+        form_data, errors = form_type.parse(form)
 
     if errors:
-        logging.warning(f"Validation errors: {errors}")
-        return render_template('sperm_index.html', errors=errors, form_data=form_data, today=datetime.now().date().isoformat(), show_modal=True)
-
-    form_data['children_ages'] = '\n'.join(children_ages) if children_ages else 'None'
-
-    # List of templates and their required fields
-    templates = [
-        {
-            'file': os.path.join(TEMPLATES_DIR, 'form_15.docx'),
-            'output': 'form_15_{full_name}_{timestamp}.docx',
-            'fields': ['full_name', 'address', 'pin_code', 'contact_number', 'aadhaar_number', 'date_of_discussion', 'date_of_consultancy', 'date']
-        },
-        {
-            'file': os.path.join(TEMPLATES_DIR, 'medical_history.docx'),
-            'output': 'medical_history_{full_name}_{timestamp}.docx',
-            'fields': ['full_name', 'date_of_birth', 'address', 'contact_number', 'email_address', 'aadhaar_number', 'donor_id', 'date', 'last_medical_exam', 'hiv_results', 'hbv_results', 'hcv_results', 'vdrl_results', 'family_history', 'serious_illness', 'current_medications', 'allergies', 'consent_cryopreservation', 'consent_art_bank', 'consent_registry']
-        },
-        {
-            'file': os.path.join(TEMPLATES_DIR, 'donor_info.docx'),
-            'output': 'donor_info_{full_name}_{timestamp}.docx',
-            'fields': ['full_name', 'date_of_birth', 'contact_number', 'email_address', 'aadhaar_number', 'genetic_disorders', 'family_history', 'current_medications', 'allergies', 'smoking', 'smoking_frequency', 'cigarettes_per_day', 'alcohol', 'alcohol_frequency', 'alcohol_amount', 'drug_use', 'diet', 'marital_status', 'num_children', 'donor_experience', 'donation_frequency', 'height', 'weight', 'education', 'mother_tongue', 'skin_colour', 'hair_colour', 'eye_colour', 'religion', 'occupation', 'date', 'children_ages']
-        }
-    ]
-
-    # Generate documents and prepare ZIP
-    generated_files = []
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    zip_filename = f"sperm_donor_documents_{form_data['full_name'].replace(' ', '_') or 'Unknown'}_{timestamp}.zip"
-    zip_path = os.path.join(DOWNLOAD_DIR, zip_filename)
+        logging.warning(f"Validation failed with {len(errors)} error(s)", extra={'errors': errors})
+        return render_template(form_type.index_template, errors=errors, form_data=form_data, today=datetime.now().date().isoformat(), show_modal=True)
 
-    try:
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for template in templates:
-                try:
-                    doc = Document(template['file'])
-                    for paragraph in doc.paragraphs:
-                        for key in template['fields']:
-                            placeholder = f'{{{key}}}'
-                            if placeholder in paragraph.text:
-                                paragraph.text = paragraph.text.replace(placeholder, str(form_data.get(key, 'N/A')))
-                    output_filename = template['output'].format(full_name=form_data['full_name'].replace(' ', '_') or 'Unknown', timestamp=timestamp)
-                    output_path = os.path.join(OUTPUT_DIR, output_filename)
-                    doc.save(output_path)
-                    zipf.write(output_path, output_filename)
-                    generated_files.append(output_path)
-                    logging.info(f"Generated {output_filename}")
-                except FileNotFoundError as e:
-                    logging.error(f"Template file {template['file']} not found: {str(e)}")
-                    return render_template('error.html', errors=[f"Template file {template['file']} not found."], show_modal=True)
-                except Exception as e:
-                    logging.error(f"Error processing {template['file']}: {str(e)}")
-                    return render_template('error.html', errors=[f"Error processing document: {str(e)}"], show_modal=True)
-    except Exception as e:
-        logging.error(f"Error creating ZIP file: {str(e)}")
-        return render_template('error.html', errors=[f"Error creating ZIP file: {str(e)}"], show_modal=True)
-
-    logging.info(f"ZIP file created: {zip_filename}")
-    return render_template('success.html', zip_filename=zip_filename, errors=[], donor_type='sperm')
+    return generate_bundle(form_type, form_data)
 
 @app.route('/generate_oocyte', methods=['POST'])
 @limiter.limit("5 per minute")
+@admission.admitted('render')
 def generate_oocyte_document():
     logging.info(f"Processing oocyte donor form submission from {request.remote_addr}")
-    form_data = {
-        'full_name': request.form.get('full_name', '').strip(),
-        'address': request.form.get('address', '').strip(),
-        'district': request.form.get('district', '').strip(),
-        'state': request.form.get('state', '').strip(),
-        'pin_code': request.form.get('pin_code', '').strip(),
-        'contact_number': request.form.get('contact_number', '').strip(),
-        'aadhaar_number': request.form.get('aadhaar_number', '').strip(),
-        'date_of_birth': request.form.get('date_of_birth', '').strip(),
-        'age': request.form.get('age', '').strip(),
-        'email_address': request.form.get('email_address', '').strip(),
-        'date_of_discussion': request.form.get('date_of_discussion', '').strip(),
-        'date_of_consultancy': request.form.get('date_of_consultancy', '').strip(),
-        'marital_status': request.form.get('marital_status', 'Not Specified'),
-        'num_children': request.form.get('num_children', '0').strip(),
-        'donor_id': request.form.get('donor_id', '').strip(),
-        'last_medical_exam': request.form.get('last_medical_exam', '').strip(),
-        'hiv_results': request.form.get('hiv_results', '').strip(),
-        'hbv_results': request.form.get('hbv_results', '').strip(),
-        'hcv_results': request.form.get('hcv_results', '').strip(),
-        'vdrl_results': request.form.get('vdrl_results', '').strip(),
-        'family_history': request.form.get('family_history', '').strip(),
-        'serious_illness': request.form.get('serious_illness', '').strip(),
-        'current_medications': request.form.get('current_medications', '').strip(),
-        'allergies': request.form.get('allergies', '').strip(),
-        'antral_follicle_count': request.form.get('antral_follicle_count', '').strip(),
-        'fsh_levels': request.form.get('fsh_levels', '').strip(),
-        'amh_levels': request.form.get('amh_levels', '').strip(),
-        'tobacco_use': request.form.get('tobacco_use', 'No'),
-        'tobacco_frequency': request.form.get('tobacco_frequency', '').strip(),
-        'alcohol': request.form.get('alcohol', 'No'),
-        'alcohol_frequency': request.form.get('alcohol_frequency', '').strip(),
-        'drug_use': request.form.get('drug_use', 'No'),
-        'exercise_routine': request.form.get('exercise_routine', '').strip(),
-        'consent_registry': 'Yes' if request.form.get('consent_registry') else 'No',
-        'place': request.form.get('place', '').strip(),
-        'ivf_name': request.form.get('ivf_name', '').strip(),
-        'ivf_address': request.form.get('ivf_address', '').strip(),
-        'doctor_name': request.form.get('doctor_name', '').strip(),
-        'date': datetime.now().strftime('%d/%m/%y')
-    }
-
-    # Server-side validation
-    required_fields = ['full_name', 'aadhaar_number', 'date_of_discussion', 'date_of_consultancy', 'ivf_name', 'ivf_address', 'doctor_name']
-    errors = []
-    for field in required_fields:
-        if not form_data[field]:
-            errors.append(f"{field.replace('_', ' ').title()} is required.")
-
-    # Validate Aadhaar number
-    if form_data['aadhaar_number'] and not re.match(r'^\d{12}$', form_data['aadhaar_number']):
-        errors.append("Aadhaar Number must be 12 digits.")
-
-    # Validate phone number
-    if form_data['contact_number'] and not re.match(r'^\d{10}$|^$', form_data['contact_number']):
-        errors.append("Contact Number must be 10 digits if provided.")
-
-    # Validate PIN code
-    if form_data['pin_code'] and not re.match(r'^\d{6}$|^$', form_data['pin_code']):
-        errors.append("PIN Code must be 6 digits if provided.")
-
-    # Validate age
-    try:
-        if form_data['age']:
-            age = int(form_data['age'])
-            if age < 18 or age > 100:
-                errors.append("Age must be between 18 and 100.")
-    except ValueError:
-        errors.append("Age must be a valid number.")
-
-    # Validate dates
-    today = datetime.now().date()
-    for date_field in ['date_of_birth', 'date_of_discussion', 'date_of_consultancy', 'last_medical_exam']:
-        if form_data[date_field]:
-            try:
-                input_date = datetime.strptime(form_data[date_field], '%Y-%m-%d').date()
-                if input_date > today:
-                    errors.append(f"{date_field.replace('_', ' ').title()} cannot be in the future.")
-            except ValueError:
-                errors.append(f"Invalid format for {date_field.replace('_', ' ').title()}.")
-
-    # Validate number of children
-    try:
-        num_children = int(form_data['num_children']) if form_data['num_children'] else 0
-        if num_children < 0:
-            errors.append("Number of children cannot be negative.")
-        elif num_children > 20:
-            errors.append("Number of children cannot exceed 20.")
-    except ValueError:
-        errors.append("Number of children must be a valid number.")
-        num_children = 0
-
-    # Validate children ages
-    children_ages = []
-    for i in range(1, num_children + 1):
-        age = request.form.get(f'child_{i}_age', '').strip()
-        try:
-            if age:
-                age_val = int(age)
-                if age_val < 0 or age_val > 100:
-                    errors.append(f"Child {i} Age must be between 0 and 100.")
-                children_ages.append(f"Child {i}: Age: {age}")
-            else:
-                children_ages.append(f"Child {i}: Age: N/A")
-        except ValueError:
-            errors.append(f"Child {i} Age must be a valid number.")
-
-    # Validate conditional fields
-    if form_data['tobacco_use'] == 'Yes' and not form_data['tobacco_frequency']:
-        errors.append("Tobacco Frequency is required if tobacco use is Yes.")
-    if form_data['alcohol'] == 'Yes' and not form_data['alcohol_frequency']:
-        errors.append("Alcohol Frequency is required if alcohol consumption is Yes.")
-
-    # Validate blood test results
-    for field in ['hiv_results', 'hbv_results', 'hcv_results', 'vdrl_results']:
-        if form_data[field] and form_data[field].lower() not in ['negative', 'positive', 'pending', '']:
-            errors.append(f"{field.replace('_', ' ').title()} must be 'Negative', 'Positive', or 'Pending'.")
+    form_type = FORM_TYPES['oocyte']
+    with METRICS.timer('form_parsing', form_type.name):
+        form = request.form
+    with METRICS.timer('validation', form_type.name):
+        form_data, errors = form_type.parse(form)
 
     if errors:
-        logging.warning(f"Validation errors: {errors}")
-        return render_template('oocyte_index.html', errors=errors, form_data=form_data, today=datetime.now().date().isoformat(), show_modal=True)
-
-    form_data['children_ages'] = '\n'.join(children_ages) if children_ages else 'None'
-
-    # List of templates and their required fields
-    templates = [
-        {
-            'file': os.path.join(TEMPLATES_DIR, 'form_13.docx'),
-            'output': 'form_13_{full_name}_{timestamp}.docx',
-            'fields': ['full_name', 'address', 'district', 'state', 'pin_code', 'contact_number', 'aadhaar_number', 'date_of_discussion', 'date', 'ivf_name', 'ivf_address', 'doctor_name']
-        },
-        {
-            'file': os.path.join(TEMPLATES_DIR, 'oocyte_medical_history.docx'),
-            'output': 'oocyte_medical_history_{full_name}_{timestamp}.docx',
-            'fields': ['full_name', 'date_of_birth', 'marital_status', 'address', 'district', 'state', 'pin_code', 'contact_number', 'email_address', 'aadhaar_number', 'donor_id', 'date', 'last_medical_exam', 'hiv_results', 'hbv_results', 'hcv_results', 'vdrl_results', 'family_history', 'serious_illness', 'current_medications', 'allergies', 'antral_follicle_count', 'fsh_levels', 'amh_levels', 'tobacco_use', 'tobacco_frequency', 'alcohol', 'alcohol_frequency', 'drug_use', 'exercise_routine', 'consent_registry']
-        },
-        {
-            'file': os.path.join(TEMPLATES_DIR, 'oocyte_donor_affidavit.docx'),
-            'output': 'oocyte_donor_affidavit_{full_name}_{timestamp}.docx',
-            'fields': ['full_name', 'age', 'date_of_birth', 'address', 'district', 'state', 'pin_code', 'contact_number', 'aadhaar_number', 'num_children', 'place', 'date', 'ivf_name', 'ivf_address', 'doctor_name']
-        }
-    ]
-
-    # Generate documents and prepare ZIP
-    generated_files = []
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    zip_filename = f"oocyte_donor_documents_{form_data['full_name'].replace(' ', '_') or 'Unknown'}_{timestamp}.zip"
-    zip_path = os.path.join(DOWNLOAD_DIR, zip_filename)
+        logging.warning(f"Validation failed with {len(errors)} error(s)", extra={'errors': errors})
+        return render_template(form_type.index_template, errors=errors, form_data=form_data, today=datetime.now().date().isoformat(), show_modal=True)
 
-    try:
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for template in templates:
-                try:
-                    doc = Document(template['file'])
-                    for paragraph in doc.paragraphs:
-                        for key in template['fields']:
-                            placeholder = f'{{{key}}}'
-                            if placeholder in paragraph.text:
-                                paragraph.text = paragraph.text.replace(placeholder, str(form_data.get(key, 'N/A')))
-                    output_filename = template['output'].format(full_name=form_data['full_name'].replace(' ', '_') or 'Unknown', timestamp=timestamp)
-                    output_path = os.path.join(OUTPUT_DIR, output_filename)
-                    doc.save(output_path)
-                    zipf.write(output_path, output_filename)
-                    generated_files.append(output_path)
-                    logging.info(f"Generated {output_filename}")
-                except FileNotFoundError as e:
-                    logging.error(f"Template file {template['file']} not found: {str(e)}")
-                    return render_template('error.html', errors=[f"Template file {template['file']} not found."], show_modal=True)
-                except Exception as e:
-                    logging.error(f"Error processing {template['file']}: {str(e)}")
-                    return render_template('error.html', errors=[f"Error processing document: {str(e)}"], show_modal=True)
-    except Exception as e:
-        logging.error(f"Error creating ZIP file: {str(e)}")
-        return render_template('error.html', errors=[f"Error creating ZIP file: {str(e)}"], show_modal=True)
-
-    logging.info(f"ZIP file created: {zip_filename}")
-    return render_template('success.html', zip_filename=zip_filename, errors=[], donor_type='oocyte')
+    return generate_bundle(form_type, form_data)
 
 @app.route('/generate_commissioning_couple', methods=['POST'])
 @limiter.limit("5 per minute")
+@admission.admitted('render')
 def generate_commissioning_couple_document():
     logging.info(f"Processing commissioning couple form submission from {request.remote_addr}")
-    form_data = {
-        'female_name': request.form.get('female_name', '').strip(),
-        'male_name': request.form.get('male_name', '').strip(),
-        'female_age': request.form.get('female_age', '').strip(),
-        'female_dob': request.form.get('female_dob', '').strip(),
-        'female_aadhaar': request.form.get('female_aadhaar', '').strip(),
-        'female_occupation': request.form.get('female_occupation', '').strip(),
-        'male_age': request.form.get('male_age', '').strip(),
-        'male_dob': request.form.get('male_dob', '').strip(),
-        'address': request.form.get('address', '').strip(),
-        'district': request.form.get('district', '').strip(),
-        'state': request.form.get('state', '').strip(),
-        'pin_code': request.form.get('pin_code', '').strip(),
-        'place': request.form.get('place', '').strip(),
-        'ivf_name': request.form.get('ivf_name', '').strip(),
-        'ivf_address': request.form.get('ivf_address', '').strip(),
-        'doctor_name': request.form.get('doctor_name', '').strip(),
-        'date': datetime.now().strftime('%d/%m/%y')
-    }
-
-    # Server-side validation
-    required_fields = ['female_name', 'male_name', 'female_aadhaar', 'female_dob', 'male_dob', 'ivf_name', 'ivf_address', 'doctor_name']
-    errors = []
-    for field in required_fields:
-        if not form_data[field]:
-            errors.append(f"{field.replace('_', ' ').title()} is required.")
-
-    # Validate Aadhaar number
-    if form_data['female_aadhaar'] and not re.match(r'^\d{12}$', form_data['female_aadhaar']):
-        errors.append("Female Aadhaar Number must be 12 digits.")
-
-    # Validate PIN code
-    if form_data['pin_code'] and not re.match(r'^\d{6}$|^$', form_data['pin_code']):
-        errors.append("PIN Code must be 6 digits if provided.")
-
-    # Validate ages
-    for field in ['female_age', 'male_age']:
-        try:
-            if form_data[field]:
-                age = int(form_data[field])
-                if age < 18 or age > 100:
-                    errors.append(f"{field.replace('_', ' ').title()} must be between 18 and 100.")
-        except ValueError:
-            errors.append(f"{field.replace('_', ' ').title()} must be a valid number.")
-
-    # Validate dates
-    today = datetime.now().date()
-    for date_field in ['female_dob', 'male_dob']:
-        if form_data[date_field]:
-            try:
-                input_date = datetime.strptime(form_data[date_field], '%Y-%m-%d').date()
-                if input_date > today:
-                    errors.append(f"{date_field.replace('_', ' ').title()} cannot be in the future.")
-            except ValueError:
-                errors.append(f"Invalid format for {date_field.replace('_', ' ').title()}.")
+    form_type = FORM_TYPES['commissioning_couple']
+    with METRICS.timer('form_parsing', form_type.name):
+        form = request.form
+    with METRICS.timer('validation', form_type.name):
+        form_data, errors = form_type.parse(form)
 
     if errors:
-        logging.warning(f"Validation errors: {errors}")
-        return render_template('commissioning_couple_index.html', errors=errors, form_data=form_data, today=datetime.now().date().isoformat(), show_modal=True)
-
-    # List of templates and their required fields
-    templates = [
-        {
-            'file': os.path.join(TEMPLATES_DIR, 'commissioning_couple_affidavit.docx'),
-            'output': 'commissioning_couple_affidavit_{female_name}_{timestamp}.docx',
-            'fields': ['female_name', 'male_name', 'female_age', 'female_dob', 'female_aadhaar', 'female_occupation', 'male_age', 'male_dob', 'address', 'district', 'state', 'pin_code', 'place', 'date', 'ivf_name', 'ivf_address', 'doctor_name']
-        }
-    ]
-
-    # Generate documents and prepare ZIP
-    generated_files = []
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    zip_filename = f"commissioning_couple_documents_{form_data['female_name'].replace(' ', '_') or 'Unknown'}_{timestamp}.zip"
-    zip_path = os.path.join(DOWNLOAD_DIR, zip_filename)
-
+        logging.warning(f"Validation failed with {len(errors)} error(s)", extra={'errors': errors})
+        return render_template(form_type.index_template, errors=errors, form_data=form_data, today=datetime.now().date().isoformat(), show_modal=True)
+
+    return generate_bundle(form_type, form_data)
+
+@app.route('/validate/<form_type_name>', methods=['POST'])
+@limiter.limit(VALIDATE_RATE_LIMIT)
+def validate_form(form_type_name):
+    """
+    Runs the server-side rules on a form as the page scripts post it, without
+    rendering a page: the whole form, or with ?field=<name> only the rules for
+    that field. Answers {"valid": ..., "errors": [...]} (plus "field").
+    """
+    form_type = FORM_TYPES.get(form_type_name)
+    if form_type is None:
+        return jsonify({'valid': False, 'errors': [f"Unknown form type '{form_type_name}'."]}), 404
+    field = request.args.get('field')
+    with METRICS.timer('validation', form_type.name):
+        if field:
+            errors = form_type.schema.validate_field(request.form, field)
+        else:
+            _, errors = form_type.parse(request.form)
+    if field:
+        return jsonify({'field': field, 'valid': not errors, 'errors': errors})
+    return jsonify({'valid': not errors, 'errors': errors})
+
+def admitted_stream(chunks, release):
+    """Yields chunks, then calls release (also if the client goes away mid-stream)."""
     try:
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for template in templates:
-                try:
-                    doc = Document(template['file'])
-                    for paragraph in doc.paragraphs:
-                        for key in template['fields']:
-                            placeholder = f'{{{key}}}'
-                            if placeholder in paragraph.text:
-                                paragraph.text = paragraph.text.replace(placeholder, str(form_data.get(key, 'N/A')))
-                    output_filename = template['output'].format(female_name=form_data['female_name'].replace(' ', '_') or 'Unknown', timestamp=timestamp)
-                    output_path = os.path.join(OUTPUT_DIR, output_filename)
-                    doc.save(output_path)
-                    zipf.write(output_path, output_filename)
-                    generated_files.append(output_path)
-                    logging.info(f"Generated {output_filename}")
-                except FileNotFoundError as e:
-                    logging.error(f"Template file {template['file']} not found: {str(e)}")
-                    return render_template('error.html', errors=[f"Template file {template['file']} not found."], show_modal=True)
-                except Exception as e:
-                    logging.error(f"Error processing {template['file']}: {str(e)}")
-                    return render_template('error.html', errors=[f"Error processing document: {str(e)}"], show_modal=True)
-    except Exception as e:
-        logging.error(f"Error creating ZIP file: {str(e)}")
-        return render_template('error.html', errors=[f"Error creating ZIP file: {str(e)}"], show_modal=True)
-
-    logging.info(f"ZIP file created: {zip_filename}")
-    return render_template('success.html', zip_filename=zip_filename, errors=[], donor_type='commissioning_couple')
-
-@app.route('/download/<filename>')
+        yield from chunks
+    finally:
+        release()
+
+@app.route('/generate_batch', methods=['POST'])
+@limiter.limit("2 per minute")
+def generate_batch():
+    form_type = FORM_TYPES.get(request.form.get('form_type', ''))
+    upload = request.files.get('records')
+    if form_type is None or upload is None or not upload.filename:
+        return render_template('error.html', errors=["A form type and a JSONL or CSV file of records are required."], show_modal=True), 400
+
+    tenant = current_tenant()
+    if tenant is None:
+        return render_template('error.html', errors=["Unknown clinic. Please check the link you used."], show_modal=True), 404
+
+    fmt = request.form.get('format') or detect_format(upload.filename)
+    try:
+        records = read_records(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''), fmt)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        logging.warning(f"Rejected batch upload from {request.remote_addr}: {str(e)}")
+        return render_template('error.html', errors=[f"Could not read records: {str(e)}"], show_modal=True), 400
+
+    # Held while the ZIP streams, which is when the batch is rendered. The body's
+    # finally only runs if it is iterated, which a HEAD request or a client gone
+    # before the first chunk never does, so closing the response releases it too
+    release = admission.releaser('batch', admission.acquire('batch'))
+    try:
+        logging.info(f"Processing batch of {len(records)} {form_type.name} records from {request.remote_addr}")
+        zip_filename = f"{form_type.name}_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        response = Response(
+            stream_with_context(admitted_stream(iter_batch_zip(form_type, records, batch_executor, BUNDLE_COMPRESSION, tenant=tenant), release)),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename={zip_filename}'},
+        )
+        response.call_on_close(release)
+        return response
+    except BaseException:
+        release()
+        raise
+
+@app.route('/jobs/<job_id>')
+@limiter.limit("120 per minute")
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'id': job_id, 'status': 'unknown', 'errors': ["Job not found. It may have expired."]}), 404
+    status = job.to_dict()
+    if job.result:
+        status['download_url'] = url_for('download_zip', token=job.result)
+    return jsonify(status)
+
+@app.route('/download/<token>')
 @limiter.limit("5 per minute")
-def download_zip(filename):
-    zip_path = os.path.join(DOWNLOAD_DIR, filename)
-    if not os.path.exists(zip_path):
-        logging.error(f"ZIP file {filename} not found for download attempt.")
+@admission.admitted('download')
+def download_zip(token):
+    bundle = bundle_store.pop(token)
+    if bundle is None:
+        logging.error(f"ZIP file {token} not found for download attempt.")
         return render_template('error.html', errors=["ZIP file not found. It may have already been downloaded or has been cleaned up."], show_modal=True)
-    
+
+    filename, data = bundle
     try:
-        # Clean up old files before sending the response
-        # Clean up output files first
-        for file in os.listdir(OUTPUT_DIR):
-            try:
-                os.remove(os.path.join(OUTPUT_DIR, file))
-            except Exception as e:
-                logging.warning(f"Failed to delete output file {file}: {str(e)}")
-        
-        # Then send the requested zip file
-        response = send_file(zip_path, as_attachment=True)
+        with METRICS.timer('download_send'):
+            response = send_file(io.BytesIO(data), mimetype='application/zip', as_attachment=True, download_name=filename)
         logging.info(f"Downloaded {filename} by {request.remote_addr}")
-
-        # Schedule cleanup of the sent zip file after the request is complete
-        @response.call_on_close
-        def cleanup_zip():
-            try:
-                os.remove(zip_path)
-                logging.info(f"Cleaned up ZIP file {zip_path}")
-            except Exception as e:
-                logging.warning(f"Failed to delete ZIP file {zip_path}: {str(e)}")
-        
         return response
     except Exception as e:
         logging.error(f"Error during download of {filename}: {str(e)}")
         return render_template('error.html', errors=[f"Error downloading file: {str(e)}"], show_modal=True)
 
+def parse_api_submission(form_type_name):
+    """Reads an API request's form type, tenant and JSON body; returns (form_type, form_data, tenant)."""
+    form_type = FORM_TYPES.get(form_type_name)
+    if form_type is None:
+        raise ApiError(404, [f"Unknown form type '{form_type_name}', expected one of {', '.join(FORM_TYPES)}."])
+    tenant = current_tenant()
+    if tenant is None:
+        raise ApiError(404, [f"Unknown tenant '{request.args.get('tenant')}'."])
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        raise ApiError(400, ["The request body must be a JSON object of form fields."])
+
+    # Same values and rules as a submitted HTML form (or a batch record)
+    with METRICS.timer('form_parsing', form_type.name):
+        form = record_to_form(form_type, body)
+    with METRICS.timer('validation', form_type.name):
+        form_data, errors = form_type.parse(form)
+    if errors:
+        logging.warning(f"API validation failed with {len(errors)} error(s)", extra={'errors': errors})
+        raise ApiError(422, errors)
+    return form_type, form_data, tenant
+
+@app.route('/api/v1/documents/<form_type_name>', methods=['POST'])
+@limiter.limit(API_BUNDLE_RATE_LIMIT)
+@admission.admitted('render')
+def api_documents(form_type_name):
+    """
+    Validates a JSON submission and responds with the ZIP of all its documents,
+    with no success page or second request for the download. ?tenant= picks the
+    tenant profile. Invalid input gets {"errors": [...]} with 400, 404 or 422.
+
+    Costs the same render and zip_write stages as the HTML flow, but no Jinja
+    page, bundle store or download round trip; see README.md for measurements.
+    """
+    form_type, form_data, tenant = parse_api_submission(form_type_name)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    try:
+        documents = render_documents(form_type, form_data, tenant, timestamp)
+    except BundleError as e:
+        raise ApiError(500, e.errors)
+    with METRICS.timer('zip_write', form_type.name):
+        data = build_zip(documents, BUNDLE_COMPRESSION)
+    zip_filename = form_type.zip_filename(form_data, timestamp)
+    logging.info(f"API generated {zip_filename} for {request.remote_addr}")
+    # send_file quotes the donor's name in Content-Disposition, non-ASCII included
+    return send_file(io.BytesIO(data), mimetype='application/zip', as_attachment=True, download_name=zip_filename)
+
+@app.route('/api/v1/documents/<form_type_name>/<document>', methods=['POST'])
+@limiter.limit(API_DOCUMENT_RATE_LIMIT)
+@admission.admitted('render')
+def api_document(form_type_name, document):
+    """
+    Like api_documents, but renders only the named document (its template file
+    without .docx, e.g. form_15) and responds with that .docx.
+    """
+    form_type, form_data, tenant = parse_api_submission(form_type_name)
+    template = form_type.template_named(document)
+    if template is None:
+        names = ', '.join(t['file'][:-len('.docx')] for t in form_type.templates)
+        raise ApiError(404, [f"Unknown document '{document}' for {form_type.name}, expected one of {names}."])
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    try:
+        [(filename, data)] = render_documents(form_type, form_data, tenant, timestamp, [template])
+    except BundleError as e:
+        raise ApiError(500, e.errors)
+    logging.info(f"API generated {filename} for {request.remote_addr}")
+    return send_file(io.BytesIO(data), mimetype=DOCX_MIMETYPE, as_attachment=True, download_name=filename)
+
+@app.errorhandler(ApiError)
+def api_error_handler(e):
+    return jsonify({'errors': e.errors}), e.status
+
+@app.route('/metrics')
+@limiter.exempt
+def metrics():
+    return Response(METRICS.exposition(), mimetype='text/plain; version=0.0.4')
+
+@app.errorhandler(Overloaded)
+def overloaded_handler(e):
+    if request.path.startswith('/api/'):
+        response = jsonify({'errors': ["The server is busy. Please try again shortly."]})
+    else:
+        response = Response(render_template('error.html', errors=["The server is busy. Please try again in a moment."], show_modal=True), mimetype='text/html')
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
 
 @app.errorhandler(429)
 def ratelimit_handler(e):
     logging.warning(f"Rate limit exceeded for {request.remote_addr}: {str(e)}")
+    if request.path.startswith('/api/'):
+        return jsonify({'errors': [f"Too many requests ({e.description}). Please try again later."]}), 429
     return render_template('error.html', errors=["Too many requests. Please try again later."], show_modal=True), 429
 
+# Time to import and set up the app, before any request
+METRICS.observe('startup', time.perf_counter() - IMPORT_STARTED, 'import')
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,183 @@
+"""
+Batch generation: renders the documents for many donors from one JSONL or CSV
+export into a single ZIP with a folder per donor.
+
+Usage:
+    python api/batch.py sperm donors.csv -o sperm_batch.zip
+    python api/batch.py oocyte donors.jsonl --executor process --workers 8
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import time
+import zipfile
+from collections import deque
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bundles import DEFAULT_POLICY  # noqa: E402
+from forms import FORM_TYPES  # noqa: E402
+from rendering import EXECUTOR_MODES, RenderExecutor  # noqa: E402
+from template_registry import TemplateRegistry  # noqa: E402
+from tenants import TenantRegistry  # noqa: E402
+
+RECORD_FORMATS = ('jsonl', 'csv')
+
+# Checkbox columns with these values count as unchecked
+FALSE_VALUES = {'', '0', 'no', 'n', 'false', 'off'}
+
+
+def detect_format(filename):
+    """Guesses the record format from a file name, defaulting to JSONL."""
+    return 'csv' if filename.lower().endswith('.csv') else 'jsonl'
+
+
+def read_records(stream, fmt):
+    """Reads a text stream of JSONL or CSV records into a list of dicts."""
+    if fmt == 'csv':
+        return list(csv.DictReader(stream))
+    if fmt != 'jsonl':
+        raise ValueError(f"Unknown record format '{fmt}', expected one of {RECORD_FORMATS}")
+    records = []
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Line {line_number} is not valid JSON: {str(e)}")
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {line_number} is not a JSON object.")
+        records.append(record)
+    return records
+
+
+def record_to_form(form_type, record):
+    """Turns a batch record into the string mapping a web form submission would give."""
+    form = {}
+    for key, value in record.items():
+        if key is None or value is None:
+            continue
+        value = str(value)
+        if key in form_type.checkbox_fields and value.strip().lower() in FALSE_VALUES:
+            continue
+        form[key] = value
+    return form
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable sink that collects what zipfile writes so it can be streamed out."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_batch_zip(form_type, records, executor, policy=DEFAULT_POLICY, window=None, tenant=None):
+    """
+    Yields the bytes of a ZIP with one folder per valid record, plus manifest.json
+    describing every record (including the ones that failed validation). Tenant
+    is the TenantProfile whose clinic details go in the documents.
+
+    Up to window records are rendering at once, so a process pool stays busy while
+    finished documents are written out in input order.
+    """
+    window = window or executor.workers * 4
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    sink = _ChunkWriter()
+    manifest = []
+    in_flight = deque()
+
+    def write_record(index, form_data, futures):
+        folder = f"{index:04d}_{form_type.file_stem(form_data)}"
+        entry = {'record': index, 'folder': folder, 'status': 'ok', 'files': []}
+        for template, future in futures:
+            try:
+                data = future.result()
+            except Exception as e:
+                logging.error(f"Batch record {index}: error processing {template['file']}: {str(e)}")
+                entry['status'] = 'error'
+                entry.setdefault('errors', []).append(f"Error processing {template['file']}: {str(e)}")
+                continue
+            filename = f"{folder}/{form_type.output_filename(template, form_data, timestamp)}"
+            compress_type, compresslevel = policy.for_member(filename)
+            zf.writestr(filename, data, compress_type=compress_type, compresslevel=compresslevel)
+            entry['files'].append(filename)
+        manifest.append(entry)
+
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for index, record in enumerate(records, start=1):
+            form_data, errors = form_type.parse(record_to_form(form_type, record))
+            if errors:
+                manifest.append({'record': index, 'status': 'invalid', 'errors': errors})
+                continue
+            in_flight.append((index, form_data, executor.submit_all(form_type.templates, form_data, tenant)))
+            if len(in_flight) >= window:
+                write_record(*in_flight.popleft())
+                yield sink.drain()
+        while in_flight:
+            write_record(*in_flight.popleft())
+            yield sink.drain()
+        manifest.sort(key=lambda entry: entry['record'])
+        zf.writestr('manifest.json', json.dumps(manifest, indent=2))
+    yield sink.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate documents for many donors from a JSONL or CSV export.')
+    parser.add_argument('form_type', choices=sorted(FORM_TYPES))
+    parser.add_argument('records', help='JSONL or CSV file, one donor per line/row')
+    parser.add_argument('-o', '--output', help='ZIP to write (default: <form_type>_batch_<timestamp>.zip)')
+    parser.add_argument('--format', choices=RECORD_FORMATS, help='Record format (default: from the file extension)')
+    parser.add_argument('--executor', choices=EXECUTOR_MODES, default='process')
+    parser.add_argument('--workers', type=int, help='Pool size (default: one per core)')
+    parser.add_argument('--templates-dir', default='templates_docx')
+    parser.add_argument('--tenants-dir', default='tenants')
+    parser.add_argument('--tenant', default='cryoconserve', help='Tenant profile with the clinic details')
+    args = parser.parse_args()
+
+    form_type = FORM_TYPES[args.form_type]
+    tenant = TenantRegistry(args.tenants_dir).get(args.tenant)
+    if tenant is None:
+        parser.error(f"no tenant profile '{args.tenant}' in {args.tenants_dir}")
+    with open(args.records, newline='', encoding='utf-8-sig') as f:
+        records = read_records(f, args.format or detect_format(args.records))
+    output = args.output or f"{form_type.name}_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+
+    registry = TemplateRegistry(args.templates_dir)
+    executor = RenderExecutor(registry, mode=args.executor, workers=args.workers)
+    start = time.perf_counter()
+    try:
+        with open(output, 'wb') as f:
+            for chunk in iter_batch_zip(form_type, records, executor, tenant=tenant):
+                f.write(chunk)
+    finally:
+        executor.shutdown()
+    elapsed = time.perf_counter() - start
+
+    with zipfile.ZipFile(output) as zf:
+        manifest = json.loads(zf.read('manifest.json'))
+    documents = sum(len(entry.get('files', [])) for entry in manifest)
+    invalid = [entry for entry in manifest if entry['status'] != 'ok']
+    print(f"Wrote {output}: {len(records)} records, {documents} documents in {elapsed:.2f}s ({documents / elapsed:.1f} documents/sec)")
+    for entry in invalid:
+        print(f"  record {entry['record']}: {entry['status']}: {'; '.join(entry['errors'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+import contextlib
+import io
+import logging
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+
+
+class BundleError(Exception):
+    """A bundle could not be produced; errors holds the messages to show the user."""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+# Formats that are already compressed containers; deflating them again gains ~nothing
+COMPRESSED_EXTENSIONS = ('.docx', '.xlsx', '.pptx', '.zip', '.jpg', '.jpeg', '.png', '.pdf')
+
+
+class CompressionPolicy:
+    """
+    Decides how each ZIP member is stored.
+
+    - Members whose name ends with one of stored_extensions are written as ZIP_STORED.
+    - Everything else is written with compression at compresslevel (None means the
+      zlib default).
+    """
+
+    def __init__(self, stored_extensions=COMPRESSED_EXTENSIONS, compression=zipfile.ZIP_DEFLATED, compresslevel=None):
+        self.stored_extensions = tuple(ext.lower() for ext in stored_extensions)
+        self.compression = compression
+        self.compresslevel = compresslevel
+
+    def for_member(self, filename):
+        """Returns (compress_type, compresslevel) for a member called filename."""
+        if filename.lower().endswith(self.stored_extensions):
+            return zipfile.ZIP_STORED, None
+        return self.compression, self.compresslevel
+
+
+DEFAULT_POLICY = CompressionPolicy()
+
+
+def build_zip(documents, policy=DEFAULT_POLICY):
+    """Returns the bytes of a ZIP holding documents, a list of (filename, bytes)."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for filename, data in documents:
+            compress_type, compresslevel = policy.for_member(filename)
+            zipf.writestr(filename, data, compress_type=compress_type, compresslevel=compresslevel)
+    return buffer.getvalue()
+
+
+def new_token():
+    """An unguessable download token, so one user can't fetch another's bundle by name."""
+    return secrets.token_urlsafe(16)
+
+
+class BundleStore:
+    """
+    Holds generated ZIPs in memory until they are downloaded.
+
+    - Bundles are looked up by the token put() returns and handed out once, like
+      the old delete-after-download behaviour of DOWNLOAD_DIR.
+    - The total size is capped at max_bytes; when a new bundle doesn't fit, the
+      oldest ones are dropped first.
+    - Bundles not downloaded within max_age seconds are dropped by sweep().
+      Bundles are kept in the order they were stored, so a sweep only looks at
+      the ones it drops.
+    """
+
+    def __init__(self, max_bytes, max_age=3600):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._bundles = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.expired = 0
+
+    def _drop_oldest(self):
+        token, (filename, data, _) = self._bundles.popitem(last=False)
+        self._size -= len(data)
+        return filename
+
+    def put(self, filename, data):
+        """Stores data to be downloaded as filename and returns its token."""
+        if len(data) > self.max_bytes:
+            raise ValueError(f"Bundle {filename} ({len(data)} bytes) exceeds the store limit of {self.max_bytes} bytes")
+        token = new_token()
+        with self._lock:
+            while self._bundles and self._size + len(data) > self.max_bytes:
+                logging.warning(f"Evicted undownloaded bundle {self._drop_oldest()} to make room")
+            self._bundles[token] = (filename, data, time.monotonic())
+            self._size += len(data)
+        return token
+
+    def pop(self, token):
+        """Returns and forgets (filename, data) for token, or None if it isn't held."""
+        with self._lock:
+            entry = self._bundles.pop(token, None)
+            if entry is None:
+                return None
+            self._size -= len(entry[1])
+            return entry[0], entry[1]
+
+    def sweep(self):
+        """Drops bundles older than max_age; returns how many were dropped."""
+        cutoff = time.monotonic() - self.max_age
+        dropped = 0
+        with self._lock:
+            while self._bundles and next(iter(self._bundles.values()))[2] < cutoff:
+                self._drop_oldest()
+                dropped += 1
+            self.expired += dropped
+        return dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                'bundles': len(self._bundles),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'expired': self.expired,
+            }
+
+
+class DiskBundleStore:
+    """
+    Keeps generated ZIPs in a directory that every worker process on a host can
+    serve downloads from.
+
+    - put() writes into a private working directory under root/work and renames
+      it into place in one step, so a bundle is either fully there or not at all.
+    - Ready bundles live in root/ready/<bucket>/<token>/<filename>, where bucket
+      is the minute they were stored in. The token carries its bucket, so a
+      download finds its bundle without listing anything.
+    - pop() claims a bundle by renaming it away before reading it; of two
+      concurrent downloads only one rename succeeds.
+    - sweep() deletes whole buckets older than max_age, so its cost depends on
+      the number of minutes kept, not the number of files.
+    - max_bytes caps all the bundles in the directory, whichever process wrote
+      them: put() totals them while holding an flock on root/lock, deletes the
+      oldest until the new one fits and renames it into place before letting go.
+    """
+
+    BUCKET_SECONDS = 60
+
+    def __init__(self, root, max_bytes, max_age=3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.work_dir = os.path.join(root, 'work')
+        self.ready_dir = os.path.join(root, 'ready')
+        self.lock_path = os.path.join(root, 'lock')
+        os.makedirs(self.work_dir, exist_ok=True)
+        os.makedirs(self.ready_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+
+    def _path(self, token):
+        bucket, sep, _ = token.partition('-')
+        if not sep or not bucket.isdigit() or os.path.basename(token) != token:
+            return None
+        return os.path.join(self.ready_dir, bucket, token)
+
+    @contextlib.contextmanager
+    def _directory_lock(self):
+        # flock() is per open file, so this also serializes threads of one process
+        import fcntl
+
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _ready_bundles(self):
+        """[(path, size)] of every ready bundle, oldest first."""
+        bundles = []
+        for bucket in sorted((b for b in os.listdir(self.ready_dir) if b.isdigit()), key=int):
+            entries = []
+            try:
+                for entry in os.scandir(os.path.join(self.ready_dir, bucket)):
+                    # A concurrent pop() or sweep() may take it away mid-scan
+                    try:
+                        entries.append((entry.stat().st_mtime_ns, entry.path, sum(f.stat().st_size for f in os.scandir(entry.path))))
+                    except FileNotFoundError:
+                        pass
+            except FileNotFoundError:
+                continue
+            bundles.extend((path, size) for _, path, size in sorted(entries))
+        return bundles
+
+    def put(self, filename, data):
+        """Stores data to be downloaded as filename and returns its token."""
+        if len(data) > self.max_bytes:
+            raise ValueError(f"Bundle {filename} ({len(data)} bytes) exceeds the store limit of {self.max_bytes} bytes")
+        token = f"{int(time.time() // self.BUCKET_SECONDS)}-{new_token()}"
+        work = tempfile.mkdtemp(dir=self.work_dir)
+        try:
+            with open(os.path.join(work, os.path.basename(filename)), 'wb') as f:
+                f.write(data)
+            path = self._path(token)
+            with self._directory_lock():
+                bundles = self._ready_bundles()
+                size = sum(size for _, size in bundles)
+                for evicted, evicted_size in bundles:
+                    if size + len(data) <= self.max_bytes:
+                        break
+                    shutil.rmtree(evicted, ignore_errors=True)
+                    size -= evicted_size
+                    logging.warning(f"Evicted undownloaded bundle {os.path.basename(evicted)} to make room")
+                    with self._lock:
+                        self.evicted += 1
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.rename(work, path)
+        except BaseException:
+            shutil.rmtree(work, ignore_errors=True)
+            raise
+        return token
+
+    def pop(self, token):
+        """Returns and deletes (filename, data) for token, or None if it isn't held."""
+        path = self._path(token)
+        if path is None:
+            return None
+        claimed = os.path.join(self.work_dir, f"claimed-{token}")
+        try:
+            os.rename(path, claimed)
+            # The rename keeps put()'s mtime; a fresh one stops sweep() expiring it mid-read
+            os.utime(claimed)
+        except OSError:
+            return None
+        try:
+            filename = os.listdir(claimed)[0]
+            with open(os.path.join(claimed, filename), 'rb') as f:
+                return filename, f.read()
+        except OSError:
+            # Swept away before it could be read; the download sees it as expired
+            return None
+        finally:
+            shutil.rmtree(claimed, ignore_errors=True)
+
+    def sweep(self):
+        """Deletes buckets older than max_age and abandoned work; returns how many buckets went."""
+        now = time.time()
+        oldest_kept = int((now - self.max_age) // self.BUCKET_SECONDS)
+        dropped = 0
+        for bucket in os.listdir(self.ready_dir):
+            if bucket.isdigit() and int(bucket) < oldest_kept:
+                shutil.rmtree(os.path.join(self.ready_dir, bucket), ignore_errors=True)
+                dropped += 1
+        # Working directories only exist while a put() or pop() is running
+        for name in os.listdir(self.work_dir):
+            path = os.path.join(self.work_dir, name)
+            try:
+                if os.stat(path).st_mtime < now - self.max_age:
+                    shutil.rmtree(path, ignore_errors=True)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self.expired += dropped
+        return dropped
+
+    def stats(self):
+        """The whole directory's bundles; evictions and sweeps are this process's."""
+        bundles = self._ready_bundles()
+        with self._lock:
+            return {
+                'bundles': len(bundles),
+                'bytes': sum(size for _, size in bundles),
+                'max_bytes': self.max_bytes,
+                'evicted': self.evicted,
+                'expired_buckets': self.expired,
+            }
+
+
+def start_sweeper(store, interval=60):
+    """
+    Starts a daemon thread calling store.sweep() every interval seconds; returns
+    an Event that stops it when set.
+    """
+    stop = threading.Event()
+
+    def sweep_forever():
+        while not stop.wait(interval):
+            try:
+                dropped = store.sweep()
+                if dropped:
+                    logging.info(f"Swept {dropped} expired bundle(s)")
+            except Exception as e:
+                logging.error(f"Bundle sweep failed: {str(e)}")
+
+    threading.Thread(target=sweep_forever, name='bundle-sweeper', daemon=True).start()
+    return stop
@@ -0,0 +1,292 @@
+"""
+Declarative form schemas.
+
+A FormSchema lists a form's fields and its validation rules. Everything that can
+be worked out ahead of time (compiled regexes, error messages, field defaults) is
+built when the schema is declared at import, so validating a submission is just
+a walk over prebuilt objects.
+"""
+from datetime import date, datetime
+import re
+
+
+def title(name):
+    """'date_of_birth' -> 'Date Of Birth', the label style used in error messages."""
+    return name.replace('_', ' ').title()
+
+
+# The only shape where date.fromisoformat and strptime('%Y-%m-%d') agree
+_ISO_DATE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+
+
+def _parse_date(value):
+    # fromisoformat is much faster, but from Python 3.11 it also takes forms the
+    # form path never did ('20240101', '2024-W01-1'), so it only sees YYYY-MM-DD.
+    # strptime handles the rest, rejecting those and still taking '2024-1-5'.
+    if _ISO_DATE.fullmatch(value):
+        return date.fromisoformat(value)
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+class Field:
+    """
+    A submitted field.
+
+    - default: value used when the field is absent.
+    - strip: whether surrounding whitespace is removed (select boxes aren't stripped).
+    - checkbox: stored as 'Yes' when present with a non-empty value, else 'No'.
+    """
+
+    def __init__(self, name, default='', strip=True, checkbox=False):
+        self.name = name
+        self.default = 'No' if checkbox else default
+        self.strip = strip
+        self.checkbox = checkbox
+
+
+class Required:
+    def __init__(self, *names):
+        self.names = names
+        self.checks = [(name, f"{title(name)} is required.") for name in names]
+
+    def for_field(self, name):
+        return Required(name) if name in self.names else None
+
+    def check(self, form_data, form, errors, today):
+        for name, message in self.checks:
+            if not form_data[name]:
+                errors.append(message)
+
+
+class Pattern:
+    """Value, when given, must match pattern."""
+
+    def __init__(self, name, pattern, message):
+        self.name = name
+        self.match = re.compile(pattern).match
+        self.message = message
+
+    def for_field(self, name):
+        return self if name == self.name else None
+
+    def check(self, form_data, form, errors, today):
+        value = form_data[self.name]
+        if value and not self.match(value):
+            errors.append(self.message)
+
+
+class PastDate:
+    """Each value, when given, must be a YYYY-MM-DD date no later than today."""
+
+    def __init__(self, *names):
+        self.names = names
+        self.checks = [
+            (name, f"{title(name)} cannot be in the future.", f"Invalid format for {title(name)}.")
+            for name in names
+        ]
+
+    def for_field(self, name):
+        return PastDate(name) if name in self.names else None
+
+    def check(self, form_data, form, errors, today):
+        for name, future_message, format_message in self.checks:
+            value = form_data[name]
+            if value:
+                try:
+                    if _parse_date(value) > today:
+                        errors.append(future_message)
+                except ValueError:
+                    errors.append(format_message)
+
+
+class IntRange:
+    """Value, when given, must be an integer between low and high."""
+
+    def __init__(self, name, low, high, range_message=None, invalid_message=None):
+        self.name = name
+        self.low = low
+        self.high = high
+        self.range_message = range_message or f"{title(name)} must be between {low} and {high}."
+        self.invalid_message = invalid_message or f"{title(name)} must be a valid number."
+
+    def for_field(self, name):
+        return self if name == self.name else None
+
+    def check(self, form_data, form, errors, today):
+        value = form_data[self.name]
+        if value:
+            try:
+                number = int(value)
+            except ValueError:
+                errors.append(self.invalid_message)
+                return
+            if number < self.low or number > self.high:
+                errors.append(self.range_message)
+
+
+class ChildCount:
+    """
+    The number of children, plus the dynamic child_<i>_age fields that go with it.
+    Also fills form_data['children_ages'] for the templates. reads lists the
+    child age fields, which aren't declared as Fields.
+    """
+
+    produces = ('children_ages',)
+
+    def __init__(self, name, maximum=20, max_age=100):
+        self.name = name
+        self.maximum = maximum
+        self.max_age = max_age
+        # Prebuilt per-child field names and messages
+        self.children = [self._child(i) for i in range(1, maximum + 1)]
+        self.reads = tuple(child[0] for child in self.children)
+
+    def _child(self, i):
+        return (
+            f'child_{i}_age',
+            f"Child {i}: Age: ",
+            f"Child {i}: Age: N/A",
+            f"Child {i} Age must be between 0 and {self.max_age}.",
+            f"Child {i} Age must be a valid number.",
+        )
+
+    def for_field(self, name):
+        return self if name == self.name or name in self.reads else None
+
+    def check(self, form_data, form, errors, today):
+        value = form_data[self.name]
+        try:
+            count = int(value) if value else 0
+            if count < 0:
+                errors.append("Number of children cannot be negative.")
+            elif count > self.maximum:
+                errors.append(f"Number of children cannot exceed {self.maximum}.")
+        except ValueError:
+            errors.append("Number of children must be a valid number.")
+            count = 0
+
+        children = self.children if count <= self.maximum else [self._child(i) for i in range(1, count + 1)]
+        children_ages = []
+        for field, label, missing, range_message, invalid_message in children[:max(count, 0)]:
+            age = form.get(field, '').strip()
+            if not age:
+                children_ages.append(missing)
+                continue
+            try:
+                age_val = int(age)
+            except ValueError:
+                errors.append(invalid_message)
+                continue
+            if age_val < 0 or age_val > self.max_age:
+                errors.append(range_message)
+            children_ages.append(label + age)
+        form_data['children_ages'] = '\n'.join(children_ages) if children_ages else 'None'
+
+
+class RequiredIf:
+    """When field equals value, every one of names must be filled in."""
+
+    def __init__(self, field, value, names, message):
+        self.field = field
+        self.value = value
+        self.names = names
+        self.message = message
+
+    def for_field(self, name):
+        # Only reported against the fields left empty, not the answer that requires them
+        return self if name in self.names else None
+
+    def check(self, form_data, form, errors, today):
+        if form_data[self.field] == self.value and not all(form_data[name] for name in self.names):
+            errors.append(self.message)
+
+
+class OneOf:
+    """Each value, when given, must be one of choices (case-insensitive)."""
+
+    def __init__(self, names, choices, message):
+        self.names = names
+        self.choices = frozenset(choice.lower() for choice in choices)
+        self.message = message
+        self.checks = [(name, f"{title(name)} {message}") for name in names]
+
+    def for_field(self, name):
+        return OneOf([name], self.choices, self.message) if name in self.names else None
+
+    def check(self, form_data, form, errors, today):
+        for name, message in self.checks:
+            value = form_data[name]
+            if value and value.lower() not in self.choices:
+                errors.append(message)
+
+
+class FormSchema:
+    """A form's fields and rules; validate() turns a submission into (form_data, errors)."""
+
+    def __init__(self, fields, rules):
+        self.fields = fields
+        self.rules = rules
+        self.field_names = frozenset(f.name for f in fields)
+        # Everything validate() puts in form_data: the fields, the date stamp and
+        # anything rules derive, i.e. what templates may use as placeholders
+        self.produced_fields = self.field_names | {'date'} | frozenset(
+            name for rule in rules for name in getattr(rule, 'produces', ())
+        )
+        # Fields grouped by how they are read, so validate() needs no per-field branching
+        self._stripped = [(f.name, f.default) for f in fields if f.strip and not f.checkbox]
+        self._raw = [(f.name, f.default) for f in fields if not f.strip and not f.checkbox]
+        self._checkboxes = [f.name for f in fields if f.checkbox]
+        self._stamp = (None, None)
+        # Each field's rules, narrowed to that field, for validate_field()
+        readable = self.field_names | frozenset(name for rule in rules for name in getattr(rule, 'reads', ()))
+        self._field_rules = {
+            name: [narrowed for narrowed in (rule.for_field(name) for rule in rules) if narrowed is not None]
+            for name in readable
+        }
+
+    def empty_form(self):
+        """The form_data a blank form is rendered with."""
+        return {f.name: f.default for f in self.fields}
+
+    def _today(self):
+        # The 'date' stamp only changes once a day, so format it once a day
+        today = date.today()
+        if self._stamp[0] != today:
+            self._stamp = (today, today.strftime('%d/%m/%y'))
+        return self._stamp
+
+    def _read(self, form):
+        get = form.get
+        form_data = {name: get(name, default).strip() for name, default in self._stripped}
+        for name, default in self._raw:
+            form_data[name] = get(name, default)
+        for name in self._checkboxes:
+            form_data[name] = 'Yes' if get(name) else 'No'
+        today, form_data['date'] = self._today()
+        return form_data, today
+
+    def validate(self, form):
+        """
+        Reads and validates a submission. form is any mapping with .get(), e.g.
+        request.form or a batch record. Returns (form_data, errors).
+        """
+        form_data, today = self._read(form)
+        errors = []
+        for rule in self.rules:
+            rule.check(form_data, form, errors, today)
+        return form_data, errors
+
+    def validate_field(self, form, name):
+        """
+        Runs only the rules that concern field name, e.g. while the user is typing.
+        form is still the whole submission, since some rules read other fields.
+        Returns that field's errors; a field without rules has none.
+        """
+        rules = self._field_rules.get(name)
+        if not rules:
+            return []
+        form_data, today = self._read(form)
+        errors = []
+        for rule in rules:
+            rule.check(form_data, form, errors, today)
+        return errors
@@ -0,0 +1,248 @@
+from form_schemas import ChildCount, Field, FormSchema, IntRange, OneOf, PastDate, Pattern, Required, RequiredIf
+
+# Templates rendered for each form type and the name of each output.
+# 'file' is relative to the template registry's directory. The fields each
+# template uses come from its compiled sidecar, written by create_template.py.
+SPERM_TEMPLATES = [
+    {
+        'file': 'form_15.docx',
+        'output': 'form_15_{full_name}_{timestamp}.docx'
+    },
+    {
+        'file': 'medical_history.docx',
+        'output': 'medical_history_{full_name}_{timestamp}.docx'
+    },
+    {
+        'file': 'donor_info.docx',
+        'output': 'donor_info_{full_name}_{timestamp}.docx'
+    }
+]
+
+OOCYTE_TEMPLATES = [
+    {
+        'file': 'form_13.docx',
+        'output': 'form_13_{full_name}_{timestamp}.docx'
+    },
+    {
+        'file': 'oocyte_medical_history.docx',
+        'output': 'oocyte_medical_history_{full_name}_{timestamp}.docx'
+    },
+    {
+        'file': 'oocyte_donor_affidavit.docx',
+        'output': 'oocyte_donor_affidavit_{full_name}_{timestamp}.docx'
+    }
+]
+
+COMMISSIONING_COUPLE_TEMPLATES = [
+    {
+        'file': 'commissioning_couple_affidavit.docx',
+        'output': 'commissioning_couple_affidavit_{female_name}_{timestamp}.docx'
+    }
+]
+
+
+BLOOD_TESTS = ['hiv_results', 'hbv_results', 'hcv_results', 'vdrl_results']
+BLOOD_RESULTS = ['Negative', 'Positive', 'Pending']
+BLOOD_MESSAGE = "must be 'Negative', 'Positive', or 'Pending'."
+AADHAAR_PATTERN = r'^\d{12}$'
+EMAIL_PATTERN = r'^[\w\.-]+@[\w\.-]+\.\w+$'
+PHONE_PATTERN = r'^\d{10}$|^$'
+PIN_PATTERN = r'^\d{6}$|^$'
+
+SPERM_SCHEMA = FormSchema(
+    fields=[
+        Field('full_name'),
+        Field('address'),
+        Field('pin_code'),
+        Field('contact_number'),
+        Field('aadhaar_number'),
+        Field('date_of_birth'),
+        Field('email_address'),
+        Field('donor_id'),
+        Field('date_of_discussion'),
+        Field('date_of_consultancy'),
+        Field('genetic_disorders'),
+        Field('family_history'),
+        Field('current_medications'),
+        Field('allergies'),
+        Field('last_medical_exam'),
+        Field('hiv_results'),
+        Field('hbv_results'),
+        Field('hcv_results'),
+        Field('vdrl_results'),
+        Field('serious_illness'),
+        Field('smoking', default='No', strip=False),
+        Field('smoking_frequency'),
+        Field('cigarettes_per_day'),
+        Field('alcohol', default='No', strip=False),
+        Field('alcohol_frequency'),
+        Field('alcohol_amount'),
+        Field('drug_use', default='No', strip=False),
+        Field('diet', default='Not Specified', strip=False),
+        Field('marital_status', default='Not Specified', strip=False),
+        Field('num_children', default='0'),
+        Field('donor_experience', default='No', strip=False),
+        Field('donation_frequency'),
+        Field('height'),
+        Field('weight'),
+        Field('education'),
+        Field('mother_tongue'),
+        Field('skin_colour'),
+        Field('hair_colour'),
+        Field('eye_colour'),
+        Field('religion'),
+        Field('occupation'),
+        Field('consent_cryopreservation', checkbox=True),
+        Field('consent_art_bank', checkbox=True),
+        Field('consent_registry', checkbox=True),
+    ],
+    rules=[
+        Required('full_name', 'aadhaar_number', 'date_of_discussion', 'date_of_consultancy'),
+        Pattern('aadhaar_number', AADHAAR_PATTERN, "Aadhaar Number must be 12 digits."),
+        Pattern('email_address', EMAIL_PATTERN, "Invalid email address."),
+        Pattern('contact_number', PHONE_PATTERN, "Contact Number must be 10 digits if provided."),
+        Pattern('pin_code', PIN_PATTERN, "PIN Code must be 6 digits if provided."),
+        PastDate('date_of_birth', 'last_medical_exam', 'date_of_discussion', 'date_of_consultancy'),
+        ChildCount('num_children'),
+        RequiredIf('smoking', 'Yes', ['smoking_frequency', 'cigarettes_per_day'],
+                   "Smoking Frequency and Cigarettes per Day are required if smoking is Yes."),
+        RequiredIf('alcohol', 'Yes', ['alcohol_frequency', 'alcohol_amount'],
+                   "Alcohol Frequency and Amount are required if alcohol consumption is Yes."),
+        OneOf(BLOOD_TESTS, BLOOD_RESULTS, BLOOD_MESSAGE),
+    ],
+)
+
+OOCYTE_SCHEMA = FormSchema(
+    fields=[
+        Field('full_name'),
+        Field('address'),
+        Field('district'),
+        Field('state'),
+        Field('pin_code'),
+        Field('contact_number'),
+        Field('aadhaar_number'),
+        Field('date_of_birth'),
+        Field('age'),
+        Field('email_address'),
+        Field('date_of_discussion'),
+        Field('date_of_consultancy'),
+        Field('marital_status', default='Not Specified', strip=False),
+        Field('num_children', default='0'),
+        Field('donor_id'),
+        Field('last_medical_exam'),
+        Field('hiv_results'),
+        Field('hbv_results'),
+        Field('hcv_results'),
+        Field('vdrl_results'),
+        Field('family_history'),
+        Field('serious_illness'),
+        Field('current_medications'),
+        Field('allergies'),
+        Field('antral_follicle_count'),
+        Field('fsh_levels'),
+        Field('amh_levels'),
+        Field('tobacco_use', default='No', strip=False),
+        Field('tobacco_frequency'),
+        Field('alcohol', default='No', strip=False),
+        Field('alcohol_frequency'),
+        Field('drug_use', default='No', strip=False),
+        Field('exercise_routine'),
+        Field('consent_registry', checkbox=True),
+        Field('place'),
+        Field('ivf_name'),
+        Field('ivf_address'),
+        Field('doctor_name'),
+    ],
+    rules=[
+        Required('full_name', 'aadhaar_number', 'date_of_discussion', 'date_of_consultancy', 'ivf_name', 'ivf_address', 'doctor_name'),
+        Pattern('aadhaar_number', AADHAAR_PATTERN, "Aadhaar Number must be 12 digits."),
+        Pattern('contact_number', PHONE_PATTERN, "Contact Number must be 10 digits if provided."),
+        Pattern('pin_code', PIN_PATTERN, "PIN Code must be 6 digits if provided."),
+        IntRange('age', 18, 100),
+        PastDate('date_of_birth', 'date_of_discussion', 'date_of_consultancy', 'last_medical_exam'),
+        ChildCount('num_children'),
+        RequiredIf('tobacco_use', 'Yes', ['tobacco_frequency'],
+                   "Tobacco Frequency is required if tobacco use is Yes."),
+        RequiredIf('alcohol', 'Yes', ['alcohol_frequency'],
+                   "Alcohol Frequency is required if alcohol consumption is Yes."),
+        OneOf(BLOOD_TESTS, BLOOD_RESULTS, BLOOD_MESSAGE),
+    ],
+)
+
+COMMISSIONING_COUPLE_SCHEMA = FormSchema(
+    fields=[
+        Field('female_name'),
+        Field('male_name'),
+        Field('female_age'),
+        Field('female_dob'),
+        Field('female_aadhaar'),
+        Field('female_occupation'),
+        Field('male_age'),
+        Field('male_dob'),
+        Field('address'),
+        Field('district'),
+        Field('state'),
+        Field('pin_code'),
+        Field('place'),
+        Field('ivf_name'),
+        Field('ivf_address'),
+        Field('doctor_name'),
+    ],
+    rules=[
+        Required('female_name', 'male_name', 'female_aadhaar', 'female_dob', 'male_dob', 'ivf_name', 'ivf_address', 'doctor_name'),
+        Pattern('female_aadhaar', AADHAAR_PATTERN, "Female Aadhaar Number must be 12 digits."),
+        Pattern('pin_code', PIN_PATTERN, "PIN Code must be 6 digits if provided."),
+        IntRange('female_age', 18, 100),
+        IntRange('male_age', 18, 100),
+        PastDate('female_dob', 'male_dob'),
+    ],
+)
+
+
+class FormType:
+    """Everything needed to turn one kind of form submission into its documents."""
+
+    def __init__(self, name, schema, templates, zip_prefix, name_field, index_template):
+        self.name = name
+        self.schema = schema
+        self.templates = templates
+        self.zip_prefix = zip_prefix
+        # Field used to name the ZIP and the generated files
+        self.name_field = name_field
+        self.index_template = index_template
+        # Fields submitted as HTML checkboxes: present means 'Yes'
+        self.checkbox_fields = frozenset(f.name for f in schema.fields if f.checkbox)
+
+    def parse(self, form):
+        """Reads and validates a submission. Returns (form_data, errors)."""
+        return self.schema.validate(form)
+
+    def file_stem(self, form_data):
+        return form_data[self.name_field].replace(' ', '_') or 'Unknown'
+
+    def zip_filename(self, form_data, timestamp):
+        return f"{self.zip_prefix}_{self.file_stem(form_data)}_{timestamp}.zip"
+
+    def output_filename(self, template, form_data, timestamp):
+        return template['output'].format(**{self.name_field: self.file_stem(form_data), 'timestamp': timestamp})
+
+    def template_named(self, name):
+        """The template whose file is name + '.docx' (e.g. 'form_15'), or None."""
+        for template in self.templates:
+            if template['file'] == f'{name}.docx':
+                return template
+        return None
+
+
+FORM_TYPES = {
+    'sperm': FormType(
+        'sperm', SPERM_SCHEMA, SPERM_TEMPLATES, 'sperm_donor_documents', 'full_name', 'sperm_index.html',
+    ),
+    'oocyte': FormType(
+        'oocyte', OOCYTE_SCHEMA, OOCYTE_TEMPLATES, 'oocyte_donor_documents', 'full_name', 'oocyte_index.html',
+    ),
+    'commissioning_couple': FormType(
+        'commissioning_couple', COMMISSIONING_COUPLE_SCHEMA, COMMISSIONING_COUPLE_TEMPLATES,
+        'commissioning_couple_documents', 'female_name', 'commissioning_couple_index.html',
+    ),
+}
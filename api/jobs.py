@@ -0,0 +1,89 @@
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Job:
+    def __init__(self, job_id):
+        self.id = job_id
+        self.status = QUEUED
+        self.result = None
+        self.errors = []
+        self.created = time.time()
+        self.finished = None
+
+    def to_dict(self):
+        return {'id': self.id, 'status': self.status, 'result': self.result, 'errors': self.errors}
+
+
+class JobQueue:
+    """
+    In-process queue of background jobs run by a small worker pool.
+
+    Callers get a job ID back immediately and poll get() for the outcome. At most
+    max_jobs are remembered; beyond that the oldest finished jobs are forgotten.
+    """
+
+    def __init__(self, workers, max_jobs=1000):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+            return self._pool
+
+    def _forget_finished(self):
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished is not None]:
+            if len(self._jobs) <= self.max_jobs:
+                break
+            del self._jobs[job_id]
+
+    def submit(self, func, *args):
+        """
+        Queues func(*args) and returns the new job's ID. func's return value becomes
+        the job's result; an exception with an 'errors' list (or any other exception)
+        marks the job failed.
+        """
+        job = Job(uuid.uuid4().hex)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._forget_finished()
+        # The caller's context (e.g. its request ID) carries over into the job's log lines
+        self._get_pool().submit(contextvars.copy_context().run, self._run, job, func, args)
+        return job.id
+
+    def _run(self, job, func, args):
+        job.status = RUNNING
+        try:
+            job.result = func(*args)
+            job.status = DONE
+        except Exception as e:
+            logging.error(f"Job {job.id} failed: {str(e)}")
+            job.errors = list(getattr(e, 'errors', None) or [str(e)])
+            job.status = FAILED
+        job.finished = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
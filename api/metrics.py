@@ -0,0 +1,122 @@
+"""
+In-process latency histograms and a Prometheus text exposition of them.
+
+Recording a sample is a bisect and two increments under a lock, cheap enough to
+leave on in production. Samples recorded inside process-pool render workers stay
+in those processes; the default thread executor records into this process.
+
+Stage times can also be collected per request: after start_request(), every
+sample recorded in that context (including render threads started with a copy
+of it) is added to the dict it returned, e.g. for a per-request log line.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+_request_stages = contextvars.ContextVar('request_stages', default=None)
+
+# Upper bounds in seconds, from sub-millisecond XML edits to slow ZIP writes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Counts of observations per bucket (not cumulative), plus their sum."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """
+    Stage latency histograms labelled by stage and target, plus stats sources.
+
+    - observe(stage, seconds, target) / timer(stage, target) record samples. The
+      target is the template file for per-template stages and the form type for
+      per-submission ones.
+    - add_stats(name, stats) registers a callable returning a dict of numbers
+      (e.g. TemplateRegistry.stats); each numeric item is exported as a gauge
+      named <prefix>_<name>_<key>.
+    - exposition() renders everything in the Prometheus text format.
+    """
+
+    def __init__(self, prefix='docgen', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, target=''):
+        key = (stage, target)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            stages = _request_stages.get()
+            if stages is not None:
+                stages[stage] = stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, stage, target=''):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, target)
+
+    def start_request(self):
+        """Starts collecting {stage: seconds} for the current request and returns the dict."""
+        stages = {}
+        _request_stages.set(stages)
+        return stages
+
+    def add_stats(self, name, stats):
+        self._stats[name] = stats
+
+    def exposition(self):
+        name = f'{self.prefix}_stage_seconds'
+        lines = [
+            f'# HELP {name} Time spent in each stage of document generation.',
+            f'# TYPE {name} histogram',
+        ]
+        with self._lock:
+            snapshot = [(key, list(h.counts), h.sum) for key, h in sorted(self._histograms.items())]
+        for (stage, target), counts, total in snapshot:
+            labels = f'stage="{_escape(stage)}",target="{_escape(target)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (None,), counts):
+                cumulative += count
+                le = '+Inf' if bound is None else repr(bound)
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {total!r}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative}')
+
+        for source, stats in self._stats.items():
+            for key, value in stats().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                gauge = f'{self.prefix}_{source}_{key}'
+                lines.append(f'# TYPE {gauge} gauge')
+                lines.append(f'{gauge} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by the app and the rendering functions it calls
+METRICS = Metrics()
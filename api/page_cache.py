@@ -0,0 +1,91 @@
+"""
+Pre-rendered pages and fingerprinted static file URLs.
+
+The home page and the blank forms only change with the date (it is the max= of
+their date inputs) and with a deploy, so each is rendered once a day and served
+from memory with a strong ETag; a browser revalidating it gets a bodiless 304.
+Static files are linked as /static/<file>?v=<content hash>, so they can be cached
+for a long time and still change the moment a deploy changes them.
+"""
+import hashlib
+import os
+import threading
+from datetime import date
+
+
+class CachedPage:
+    """A rendered page's body and its ETag, a hash of that body."""
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+
+
+class PageCache:
+    """
+    Rendered pages, each valid for the day it was rendered on.
+
+    - get(key, render) returns the CachedPage for key, calling render() for its
+      HTML only on the first request for key that day.
+    - Every page is dropped when the date changes. A deploy starts new processes
+      and so empty caches.
+    - At most max_entries keys (e.g. page and tenant) are kept; pages beyond
+      that are rendered per request rather than evicting others.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._pages = {}
+        self._day = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, render):
+        today = date.today()
+        with self._lock:
+            if self._day != today:
+                self._pages.clear()
+                self._day = today
+            page = self._pages.get(key)
+            if page is not None:
+                self.hits += 1
+                return page
+            self.misses += 1
+
+        page = CachedPage(render().encode('utf-8'))
+        with self._lock:
+            if self._day == today and len(self._pages) < self.max_entries:
+                self._pages[key] = page
+        return page
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pages': len(self._pages),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+class StaticFingerprints:
+    """Short content hashes of files in static_dir, read once per file per process."""
+
+    def __init__(self, static_dir, length=12):
+        self.static_dir = static_dir
+        self.length = length
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def version(self, filename):
+        """The fingerprint of static_dir/filename, or '' if it can't be read."""
+        version = self._versions.get(filename)
+        if version is None:
+            try:
+                with open(os.path.join(self.static_dir, filename), 'rb') as f:
+                    version = hashlib.sha256(f.read()).hexdigest()[:self.length]
+            except OSError:
+                version = ''
+            with self._lock:
+                self._versions[filename] = version
+        return version
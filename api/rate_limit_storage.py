@@ -0,0 +1,186 @@
+"""
+SQLite storage for Flask-Limiter.
+
+memory:// keeps a separate set of counters in every worker process, so with N
+gunicorn workers a client effectively gets N times its limit. This storage keeps
+the counters in one SQLite file that every worker on the host opens, and
+registers itself with the limits library under the sqlite:// scheme:
+
+    sqlite:////tmp/ratelimit.sqlite   (absolute path)
+    sqlite:///ratelimit.sqlite        (relative to the working directory)
+
+It supports the fixed window and sliding window counter strategies. A sliding
+window needs just two counters per client and limit (the current and previous
+windows), expired counters are swept every prune_interval seconds, and at most
+max_keys counters are kept, so the file stays small however many distinct
+addresses are seen.
+"""
+import os
+import sqlite3
+import threading
+import time
+from math import floor
+
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS counters_expires ON counters (expires);
+"""
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    Rate limit counters shared by all processes on a host through a SQLite file.
+
+    - Each thread of each process has its own connection (opened lazily, and
+      reopened after a fork).
+    - Reads and updates of a key happen in one write transaction, so two workers
+      can't both take the last slot of a window.
+    - Options (via Flask-Limiter's storage_options): timeout, prune_interval, max_keys.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri=None, wrap_exceptions=False, timeout=5.0, prune_interval=60, max_keys=100000, **options):
+        # sqlite:///name is relative, sqlite:////abs/name absolute, as in SQLAlchemy URLs
+        self.path = (uri or 'sqlite://').split('://', 1)[1]
+        if self.path.startswith('/'):
+            self.path = self.path[1:]
+        if not self.path:
+            raise ValueError("sqlite:// rate limit storage needs a file path, e.g. sqlite:////tmp/ratelimit.sqlite")
+        self.timeout = float(timeout)
+        self.prune_interval = float(prune_interval)
+        self.max_keys = int(max_keys)
+        self._local = threading.local()
+        self._next_prune = 0.0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._connection().executescript(_SCHEMA)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def _get(self, db, key, now):
+        row = db.execute('SELECT value FROM counters WHERE key = ? AND expires > ?', (key, now)).fetchone()
+        return row[0] if row else 0
+
+    def _incr(self, db, key, expiry, amount, now):
+        # An expired counter starts over, as if it had been swept already
+        value = db.execute(
+            """
+            INSERT INTO counters (key, value, expires) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                value = CASE WHEN expires > ? THEN value + excluded.value ELSE excluded.value END,
+                expires = CASE WHEN expires > ? THEN expires ELSE excluded.expires END
+            RETURNING value
+            """,
+            (key, amount, now + expiry, now, now),
+        ).fetchone()[0]
+        self._maybe_prune(db, now)
+        return value
+
+    def _maybe_prune(self, db, now):
+        if now < self._next_prune:
+            return
+        self._next_prune = now + self.prune_interval
+        db.execute('DELETE FROM counters WHERE expires <= ?', (now,))
+        # Still over budget: forget the counters closest to expiring anyway
+        excess = db.execute('SELECT COUNT(*) FROM counters').fetchone()[0] - self.max_keys
+        if excess > 0:
+            db.execute(
+                'DELETE FROM counters WHERE key IN (SELECT key FROM counters ORDER BY expires LIMIT ?)',
+                (excess,),
+            )
+
+    def incr(self, key, expiry, amount=1):
+        with self._transaction() as db:
+            return self._incr(db, key, expiry, amount, time.time())
+
+    def get(self, key):
+        return self._get(self._connection(), key, time.time())
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT expires FROM counters WHERE key = ? AND expires > ?', (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def clear(self, key):
+        with self._transaction() as db:
+            db.execute('DELETE FROM counters WHERE key = ?', (key,))
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        with self._transaction() as db:
+            return db.execute('DELETE FROM counters').rowcount
+
+    def _sliding_window(self, db, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        counts = dict(db.execute(
+            'SELECT key, value FROM counters WHERE key IN (?, ?) AND expires > ?', (previous_key, current_key, now)
+        ).fetchall())
+        previous_count = counts.get(previous_key, 0)
+        current_count = counts.get(current_key, 0)
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        with self._transaction() as db:
+            previous_count, previous_ttl, current_count, _ = self._sliding_window(db, key, expiry, now)
+            if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                return False
+            # The current window's counter is still needed as the previous window next time
+            self._incr(db, self.sliding_window_keys(key, expiry, now)[1], 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(self, key, expiry):
+        return self._sliding_window(self._connection(), key, expiry, time.time())
+
+    def clear_sliding_window(self, key, expiry):
+        with self._transaction() as db:
+            for window_key in self.sliding_window_keys(key, expiry, time.time()):
+                db.execute('DELETE FROM counters WHERE key = ?', (window_key,))
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, so a read-then-update can't interleave with another writer."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute('ROLLBACK' if exc_type else 'COMMIT')
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def render_key(entry, template, form_data, tenant=None):
+    """
+    Content address of one rendered document: the template file's hash (entry is
+    its CachedTemplate), how it is rendered, the tenant profile's hash, and only
+    the field values that template uses. A change to any other field of the
+    submission leaves the key (and the cached document) untouched.
+    """
+    fields = template.get('fields') or sorted(entry.compiled.placeholders)
+    values = [(key, form_data.get(key)) for key in fields]
+    tenant_digest = tenant.digest if tenant is not None else None
+    payload = json.dumps([entry.digest, template.get('renderer'), tenant_digest, values], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    """
+    LRU cache of rendered .docx bytes with a time-to-live and a memory cap.
+
+    - Entries older than ttl seconds are treated as misses and dropped.
+    - When the cached bytes would exceed max_bytes, least recently used entries go first.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key):
+        data, _ = self._entries.pop(key)
+        self._size -= len(data)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._drop(key)
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            while self._entries and self._size + len(data) > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (data, time.monotonic() + self.ttl)
+            self._size += len(data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
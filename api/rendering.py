@@ -0,0 +1,191 @@
+import contextvars
+import copy
+import io
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from metrics import METRICS
+from render_cache import render_key
+from substitution import document_stories
+from template_registry import TemplateRegistry
+
+# 'xml' edits word/document.xml directly; 'docx' goes through python-docx's object model.
+# Templates can override this with a 'renderer' key to fall back per template.
+DEFAULT_RENDERER = 'xml'
+
+EXECUTOR_MODES = ('serial', 'thread', 'process')
+
+
+def render_document(registry, template, form_data, tenant=None):
+    """
+    Returns the .docx bytes of template['file'] (relative to the registry's
+    directory) with its placeholders filled in from form_data. A template may
+    list 'fields' to fill only those; by default every placeholder is filled.
+
+    With a TenantProfile, the {tenant_*} placeholders come from the tenant, and
+    rendering starts from the registry's cached copy with those already filled.
+    """
+    name = template['file']
+    with METRICS.timer('template_load', name):
+        entry = registry.get(registry.path_for(name))
+    renderer = template.get('renderer', DEFAULT_RENDERER)
+    if renderer == 'xml':
+        package, compiled = entry.package, entry.compiled
+        if tenant is not None:
+            package, compiled = registry.tenant_bases.resolve(entry, tenant)
+        with METRICS.timer('substitution', name):
+            roots, report = package.fill(compiled, form_data, template.get('fields'))
+        with METRICS.timer('docx_save', name):
+            data = package.save(roots)
+    elif renderer == 'docx':
+        values = form_data if tenant is None else dict(form_data, **tenant.values)
+        with METRICS.timer('substitution', name):
+            doc = copy.deepcopy(entry.document)
+            report = entry.compiled.render(document_stories(doc), values, template.get('fields'))
+        with METRICS.timer('docx_save', name):
+            buffer = io.BytesIO()
+            doc.save(buffer)
+            data = buffer.getvalue()
+    else:
+        raise ValueError(f"Unknown renderer '{renderer}' for {name}")
+    if not report.ok:
+        logging.warning(f"Unresolved placeholders in {name}: unknown={report.unknown} missing={report.missing}")
+    return data
+
+
+# Each process-pool worker keeps its own registry, loaded once when the worker starts
+_worker_registry = None
+
+
+def _lower_priority(nice):
+    # Linux keeps a nice value per thread, so in a thread pool this only affects
+    # the calling pool thread; elsewhere it is the whole (pool) process
+    if nice:
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+        except (AttributeError, OSError) as e:
+            logging.warning(f"Could not lower the render priority: {str(e)}")
+
+
+def _threads_are_greenlets():
+    # Under gevent's monkey-patching a pool "thread" is a greenlet on the calling
+    # OS thread, so renicing it would renice request handling as well
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+
+def _init_worker(templates_dir, nice=0):
+    global _worker_registry
+    _lower_priority(nice)
+    _worker_registry = TemplateRegistry(templates_dir)
+    _worker_registry.preload()
+
+
+def _render_in_worker(template, form_data, tenant):
+    return render_document(_worker_registry, template, form_data, tenant)
+
+
+class RenderExecutor:
+    """
+    Renders the templates of one submission concurrently.
+
+    - 'thread': a thread pool sharing the in-process template registry. zlib and
+      lxml serialization release the GIL for much of the work.
+    - 'process': a process pool; each worker loads its own registry.
+    - 'serial': renders in the calling thread. Also used when a pool can't be
+      started (e.g. no working semaphores on a serverless host).
+
+    The pool is created on first use and sized to the number of cores by default.
+    A nice value above 0 runs the pool's threads or processes at lower CPU
+    priority, so requests that don't render (pages, downloads) win the CPU.
+    Under gevent, where pool threads are greenlets, only process pools use it.
+    With a RenderCache, documents whose template and fields are unchanged since
+    an earlier render are returned from the cache without rendering.
+    """
+
+    def __init__(self, registry, mode='thread', workers=None, cache=None, nice=0):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode '{mode}', expected one of {EXECUTOR_MODES}")
+        self.registry = registry
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache
+        self.nice = nice
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        if self._pool is None and self.mode != 'serial':
+            with self._pool_lock:
+                # Another request may have started it while we waited for the lock
+                if self._pool is None and self.mode != 'serial':
+                    self._pool = self._start_pool()
+        return self._pool
+
+    def _start_pool(self):
+        try:
+            if self.mode == 'thread':
+                nice = self.nice
+                if nice and _threads_are_greenlets():
+                    logging.warning("Render threads are greenlets under gevent; rendering at normal priority")
+                    nice = 0
+                return ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='render',
+                    initializer=_lower_priority,
+                    initargs=(nice,),
+                )
+            else:
+                return ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.registry.templates_dir, self.nice),
+                )
+        except (OSError, NotImplementedError) as e:
+            logging.warning(f"Could not start {self.mode} render pool, rendering serially: {str(e)}")
+            self.mode = 'serial'
+            return None
+
+    def submit(self, template, form_data, tenant=None):
+        """Starts rendering template (for tenant, if given) and returns a Future for its .docx bytes."""
+        key = None
+        if self.cache is not None:
+            entry = self.registry.get(self.registry.path_for(template['file']))
+            key = render_key(entry, template, form_data, tenant)
+            data = self.cache.get(key)
+            if data is not None:
+                future = Future()
+                future.set_result(data)
+                return future
+
+        future = self._submit(template, form_data, tenant)
+        if key is not None:
+            future.add_done_callback(lambda done: done.exception() is None and self.cache.put(key, done.result()))
+        return future
+
+    def _submit(self, template, form_data, tenant):
+        pool = self._get_pool()
+        if pool is None:
+            future = Future()
+            try:
+                future.set_result(render_document(self.registry, template, form_data, tenant))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        if self.mode == 'thread':
+            # Run in a copy of the caller's context so per-request stage timings are kept
+            return pool.submit(contextvars.copy_context().run, render_document, self.registry, template, form_data, tenant)
+        return pool.submit(_render_in_worker, template, form_data, tenant)
+
+    def submit_all(self, templates, form_data, tenant=None):
+        """Starts every template at once; returns [(template, Future)] in the given order."""
+        return [(template, self.submit(template, form_data, tenant)) for template in templates]
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
@@ -0,0 +1,458 @@
+"""
+Production entry point: a preforking server for the app.
+
+    python api/server.py --bind 0.0.0.0:8000 --workers 4 --worker-class threaded
+
+The master process imports the app and runs its warm-up: templates and their
+compiled sidecars, the default tenant's bases, compiled page templates and the
+page cache. It then forks the workers, so they start with all of that already
+parsed and share those memory pages with the master copy-on-write. gc.freeze()
+before forking keeps the collector from touching (and so copying) them.
+
+Worker classes:
+- sync: one request at a time per worker, no keep-alive. Predictable memory;
+  concurrency is the number of workers.
+- threaded: a thread per request. Cheap concurrency for slow clients and
+  downloads; renders still share one GIL per worker.
+- async: gevent greenlets (pip install gevent). For many idle or slow
+  connections; rendering is CPU-bound, so it doesn't render any faster.
+
+Workers are recycled gracefully after --max-requests requests (plus up to
+--max-requests-jitter, a tenth of it by default, so they don't all restart at
+once) or once their RSS exceeds --max-rss-mb. A worker due for recycling tells
+the master and keeps serving; the master forks a replacement from the warm
+state and only then tells the old worker to stop, so the listening socket
+always has a worker accepting on it. The old worker stops accepting, finishes
+its requests (up to --graceful-timeout seconds) and exits. SIGHUP replaces every
+worker that way; SIGTERM or SIGINT stops the server.
+
+Each worker has its own in-memory caches and /metrics, and sends its log lines
+to the master, the only process writing app.log. Generated ZIPs go to a
+DiskBundleStore (--bundle-dir, unless BUNDLE_STORE_DIR is set) so whichever
+worker gets the download can serve it, even after the one that built it exited.
+"""
+import argparse
+import gc
+import importlib.util
+import logging
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import BaseWSGIServer, ThreadedWSGIServer, WSGIRequestHandler
+from werkzeug.wsgi import ClosingIterator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER_CLASSES = ('sync', 'threaded', 'async')
+
+
+# Where Lifecycle leaves a request's response, for _RequestHandler to close
+RESPONSE_KEY = 'docgen.response'
+
+
+class _RequestHandler(WSGIRequestHandler):
+    # werkzeug closes every connection after its response, so no keep-alive
+    # connection can hold a stopping worker open
+
+    environ = None
+
+    def make_environ(self):
+        self.environ = super().make_environ()
+        return self.environ
+
+    def run_wsgi(self):
+        self.environ = None
+        try:
+            super().run_wsgi()
+        finally:
+            # werkzeug skips close() when discarding unread input fails, as it does
+            # once a client hangs up without reading the response; that request
+            # would never finish and would hold a stopping worker for the whole
+            # graceful timeout
+            response = self.environ.get(RESPONSE_KEY) if self.environ is not None else None
+            if response is not None:
+                response.close()
+
+    # The app logs a summary of every request itself
+    def log_request(self, code='-', size='-'):
+        pass
+
+
+class _CountingServer:
+    """
+    Counts connections from accept() until they are closed, so a stopping worker
+    also waits for ones it accepted but hasn't passed to the app yet.
+    """
+
+    multiprocess = True
+    lifecycle = None
+
+    def process_request(self, request, client_address):
+        self.lifecycle.connection_opened()
+        super().process_request(request, client_address)
+
+    def shutdown_request(self, request):
+        try:
+            super().shutdown_request(request)
+        finally:
+            self.lifecycle.connection_closed()
+
+
+class _Response(ClosingIterator):
+    """A response whose close() only runs once, however many times it's called."""
+
+    closed = False
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            super().close()
+
+
+class _SyncServer(_CountingServer, BaseWSGIServer):
+    pass
+
+
+class _ThreadedServer(_CountingServer, ThreadedWSGIServer):
+    pass
+
+
+def _current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return 0.0
+
+
+class Lifecycle:
+    """
+    WSGI middleware that tracks a worker's requests and decides when to recycle it.
+
+    - in_flight counts requests until their response is closed (by
+      _RequestHandler, if werkzeug skips it), and connections the server's
+      accepted connections until they are closed.
+    - Once max_requests have been served, or RSS passes max_rss_mb, it calls
+      retire(reason), which asks the master for a replacement; without one, it
+      stops right away.
+    - stop() sets stopping, and the worker finishes up and exits.
+    """
+
+    def __init__(self, app, max_requests=0, max_rss_mb=0, event_class=threading.Event, retire=None):
+        self.app = app
+        self.max_requests = max_requests
+        self.max_rss_mb = max_rss_mb
+        self.retire = retire or self.stop
+        self.retiring = False
+        self.stopping = event_class()
+        self.served = 0
+        self.in_flight = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.in_flight += 1
+        try:
+            response = environ[RESPONSE_KEY] = _Response(self.app(environ, start_response), self._finished)
+            return response
+        except BaseException:
+            self._finished()
+            raise
+
+    def _finished(self):
+        with self._lock:
+            self.in_flight -= 1
+            self.served += 1
+            served = self.served
+        if self.retiring:
+            return
+        if self.max_requests and served >= self.max_requests:
+            self._retire(f"served {served} requests")
+        elif self.max_rss_mb and _current_rss_mb() > self.max_rss_mb:
+            self._retire(f"RSS above {self.max_rss_mb} MiB")
+
+    def _retire(self, reason):
+        with self._lock:
+            if self.retiring:
+                return
+            self.retiring = True
+        self.retire(reason)
+
+    def connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def connection_closed(self):
+        with self._lock:
+            self.connections -= 1
+
+    def stop(self, reason):
+        if not self.stopping.is_set():
+            logging.info(f"Worker {os.getpid()} stopping: {reason}", extra={'keep': True})
+            self.stopping.set()
+
+    def idle(self):
+        return self.in_flight == 0 and self.connections == 0
+
+    def wait_idle(self, timeout):
+        deadline = time.monotonic() + timeout
+        while not self.idle() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self.idle()
+
+
+def _serve_werkzeug(sock, app, args, max_requests, retire):
+    lifecycle = Lifecycle(app, max_requests, args.max_rss_mb, retire=retire)
+    if args.worker_class == 'threaded':
+        server = _ThreadedServer(*sock.getsockname()[:2], lifecycle, handler=_RequestHandler, fd=sock.fileno())
+    else:
+        server = _SyncServer(*sock.getsockname()[:2], lifecycle, handler=_RequestHandler, fd=sock.fileno())
+    server.lifecycle = lifecycle
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: lifecycle.stop("SIGTERM"))
+    # shutdown() waits for serve_forever() to return, so it can't run on the serving thread
+    def stop_when_asked():
+        lifecycle.stopping.wait()
+        server.shutdown()
+    threading.Thread(target=stop_when_asked, name='worker-stopper', daemon=True).start()
+
+    server.serve_forever(poll_interval=0.5)
+    if not lifecycle.wait_idle(args.graceful_timeout):
+        logging.warning(
+            f"Worker {os.getpid()} exiting with {lifecycle.in_flight} request(s) and {lifecycle.connections} connection(s) unfinished"
+        )
+
+
+def _serve_gevent(sock, app, args, max_requests, retire):
+    from gevent import monkey
+
+    monkey.patch_all()
+    import gevent
+    import app as app_module
+    from gevent.event import Event
+    from gevent.pywsgi import WSGIServer
+
+    # Its lanes' conditions were made at import, from the unpatched threading module
+    app_module.admission.reset()
+    lifecycle = Lifecycle(app, max_requests, args.max_rss_mb, event_class=Event, retire=retire)
+    server = WSGIServer(sock, lifecycle, log=None)
+    gevent.signal_handler(signal.SIGTERM, lifecycle.stop, "SIGTERM")
+    server.start()
+    lifecycle.stopping.wait()
+    server.stop(timeout=args.graceful_timeout)
+
+
+def run_worker(sock, app, args, retire_fd):
+    """
+    Serves app on sock until the worker is recycled or told to stop; never returns.
+
+    To be recycled it writes its pid to retire_fd and keeps serving until the
+    master, having forked its replacement, sends it SIGTERM.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the master, which stops us
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    max_requests = args.max_requests + random.randint(0, args.max_requests_jitter) if args.max_requests else 0
+
+    def retire(reason):
+        logging.info(f"Worker {os.getpid()} asking to be replaced: {reason}", extra={'keep': True})
+        # Well under PIPE_BUF, so it can't interleave with another worker's
+        os.write(retire_fd, f"{os.getpid()}\n".encode())
+
+    code = 0
+    try:
+        if args.worker_class == 'async':
+            _serve_gevent(sock, app, args, max_requests, retire)
+        else:
+            _serve_werkzeug(sock, app, args, max_requests, retire)
+    except Exception as e:
+        logging.error(f"Worker {os.getpid()} failed: {str(e)}")
+        code = 1
+    finally:
+        from structured_logging import stop_logging
+
+        stop_logging()
+        # Skip the master's atexit handlers and finally blocks inherited by the fork
+        os._exit(code)
+
+
+class Master:
+    """Forks the workers, replaces the ones that exit and stops them on a signal."""
+
+    def __init__(self, sock, app, args):
+        self.sock = sock
+        self.app = app
+        self.args = args
+        self.workers = set()
+        self.retiring = set()
+        self.stopping = False
+        self.reload = False
+        # Workers due for recycling write their pid here
+        self.retire_r, self.retire_w = os.pipe()
+        os.set_blocking(self.retire_r, False)
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            os.close(self.retire_r)
+            run_worker(self.sock, self.app, self.args, self.retire_w)
+        self.workers.add(pid)
+        logging.info(f"Started worker {pid} ({self.args.worker_class})", extra={'keep': True})
+
+    def signal_workers(self, signum, pids=None):
+        for pid in list(self.workers if pids is None else pids):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                self.workers.discard(pid)
+
+    def reap(self):
+        """Forgets workers that exited; returns how many did."""
+        exited = 0
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if pid in self.workers:
+                self.workers.discard(pid)
+                self.retiring.discard(pid)
+                exited += 1
+                code = os.waitstatus_to_exitcode(status)
+                if code != 0 and not self.stopping:
+                    logging.warning(f"Worker {pid} exited with status {code}")
+        return exited
+
+    def replace_retiring(self):
+        """Forks a replacement for each worker that asked for one, then stops the old worker."""
+        try:
+            data = os.read(self.retire_r, 4096)
+        except BlockingIOError:
+            return
+        for pid in map(int, data.split()):
+            if pid in self.workers and pid not in self.retiring:
+                self.retiring.add(pid)
+                self.spawn()
+                self.signal_workers(signal.SIGTERM, [pid])
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, self._reload)
+        for _ in range(self.args.workers):
+            self.spawn()
+
+        while not self.stopping:
+            if self.reload:
+                # New workers first, so capacity never drops, then let the old ones finish
+                self.reload = False
+                old = set(self.workers)
+                for _ in range(self.args.workers):
+                    self.spawn()
+                self.signal_workers(signal.SIGTERM, old)
+            self.replace_retiring()
+            self.reap()
+            # Retiring workers already have their replacement
+            for _ in range(self.args.workers - len(self.workers - self.retiring)):
+                self.spawn()
+            select.select([self.retire_r], [], [], 0.2)
+
+        logging.info(f"Stopping {len(self.workers)} worker(s)", extra={'keep': True})
+        self.signal_workers(signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout + 1
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        self.signal_workers(signal.SIGKILL)
+        self.reap()
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    def _reload(self, signum, frame):
+        self.reload = True
+
+
+def parse_bind(bind):
+    host, _, port = bind.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def listen(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    # Every worker polls the same socket; non-blocking, the ones that lose the race
+    # to accept() go back to polling instead of blocking until the next connection
+    sock.setblocking(False)
+    return sock
+
+
+def load_app(args):
+    """Imports the app in the master and warms its caches there."""
+    os.chdir(ROOT)
+    import app as app_module
+    from structured_logging import forward_from_children
+
+    # Workers send their log lines here; only the master writes (and rotates) app.log
+    forward_from_children()
+
+    if args.no_rate_limit:
+        app_module.limiter.enabled = False
+    if args.no_admission:
+        app_module.admission.enabled = False
+    if app_module.BUNDLE_STORE_DIR is None:
+        app_module.use_disk_bundle_store(args.bundle_dir)
+    if app_module.ASYNC_GENERATION and args.workers > 1:
+        logging.warning("ASYNC_GENERATION keeps jobs in one worker; /jobs/<id> polls may reach another")
+    # The server logs its own requests through the app; werkzeug's lines would be duplicates
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    if args.preload:
+        start = time.perf_counter()
+        app_module.warm_up.run()
+        logging.info(f"Warmed caches in the master in {(time.perf_counter() - start) * 1e3:.0f} ms", extra={'keep': True})
+    return app_module.app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bind', default='127.0.0.1:8000', help='host:port to listen on')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--worker-class', choices=WORKER_CLASSES, default='threaded')
+    parser.add_argument('--max-requests', type=int, default=1000, help='Recycle a worker after this many requests (0: never)')
+    parser.add_argument('--max-requests-jitter', type=int, help='Up to this many more requests per worker (default: a tenth of --max-requests)')
+    parser.add_argument('--max-rss-mb', type=float, default=0, help='Recycle a worker whose RSS passes this (0: never)')
+    parser.add_argument('--graceful-timeout', type=float, default=30, help='Seconds a stopping worker gets to finish')
+    parser.add_argument('--bundle-dir', default='/tmp/docgen-bundles', help='Shared ZIP store, unless BUNDLE_STORE_DIR is set')
+    parser.add_argument('--no-preload', dest='preload', action='store_false', help='Let each worker warm its own caches')
+    parser.add_argument('--no-rate-limit', action='store_true', help='Disable rate limits, for load tests only')
+    parser.add_argument('--no-admission', action='store_true', help='Disable admission control, for load tests only')
+    args = parser.parse_args()
+    if args.max_requests_jitter is None:
+        args.max_requests_jitter = args.max_requests // 10
+
+    if args.worker_class == 'async':
+        if importlib.util.find_spec('gevent') is None:
+            parser.error("--worker-class async needs gevent (pip install gevent)")
+
+    host, port = parse_bind(args.bind)
+    sock = listen(host, port)
+    app = load_app(args)
+    # Everything loaded so far is long-lived; keep the collector's hands off it in the workers
+    gc.freeze()
+    print(f"Serving on http://{host}:{sock.getsockname()[1]} with {args.workers} {args.worker_class} worker(s), master {os.getpid()}", file=sys.stderr)
+    Master(sock, app, args).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Non-blocking, structured logging.
+
+Request threads only put records on a queue; a background QueueListener formats
+them as JSON lines and writes them to a size-rotated file, so logging adds no
+disk latency to the request path. High-volume INFO lines can be sampled.
+
+Under the preforking server only the master writes the file: forward_from_children()
+makes every process forked afterwards send its formatted lines to the master,
+since several processes rotating one file lose and interleave records.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import socket
+import threading
+import time
+
+# Set per request by the app so every record logged while handling it carries the ID
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+# The running QueueListener, once setup_logging() has been called, and its file handler
+_listener = None
+_file_handler = None
+
+# Set by forward_from_children(): forked processes send their lines through it
+_children_socket = None
+# Socket buffer for forwarded lines; one line is one datagram, so this also bounds its size
+FORWARD_BUFFER_BYTES = 1024 * 1024
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id and any extra= fields."""
+
+    def format(self, record):
+        forwarded = getattr(record, 'forwarded', None)
+        if forwarded is not None:
+            return forwarded
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and key != 'keep':
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestQueueHandler(logging.handlers.QueueHandler):
+    """Stamps the current request ID on a record before it leaves the request's thread."""
+
+    def prepare(self, record):
+        record.request_id = getattr(record, 'request_id', None) or request_id_var.get()
+        return super().prepare(record)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps 1 in every INFO (and DEBUG) records per call site; warnings and errors
+    always pass, as do records logged with extra={'keep': True}.
+    """
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = every
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.every <= 1 or record.levelno >= logging.WARNING or getattr(record, 'keep', False):
+            return True
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            count = self._seen.get(site, 0)
+            self._seen[site] = count + 1
+        return count % self.every == 0
+
+
+class ForwardingHandler(logging.Handler):
+    """Sends each formatted record as one datagram to the process that called forward_from_children()."""
+
+    def __init__(self, sock):
+        super().__init__()
+        self.sock = sock
+
+    def emit(self, record):
+        try:
+            self.sock.send(self.format(record).encode('utf-8'))
+        except Exception:
+            self.handleError(record)
+
+
+def forward_from_children():
+    """
+    Makes processes forked after this call (e.g. server workers) send their log
+    lines to this process, which writes them to its file with its own records.
+    """
+    global _children_socket
+    if _file_handler is None or _children_socket is not None:
+        return
+    receiver, _children_socket = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    _children_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, FORWARD_BUFFER_BYTES)
+    receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, FORWARD_BUFFER_BYTES)
+
+    def receive():
+        while True:
+            line = receiver.recv(FORWARD_BUFFER_BYTES).decode('utf-8', 'replace')
+            _file_handler.handle(logging.makeLogRecord({'forwarded': line}))
+
+    threading.Thread(target=receive, name='log-receiver', daemon=True).start()
+
+
+def _restart_listener():
+    # A forked child (a server worker, a render process) doesn't inherit the
+    # listener's thread, so it needs its own. It gets a new queue too: the
+    # inherited one may hold the parent's unwritten records, and its internal
+    # lock whatever state the parent's listener left it in.
+    global _listener
+    if _listener is None:
+        return
+    records = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, RequestQueueHandler):
+            handler.queue = records
+    handlers = _listener.handlers
+    if _children_socket is not None:
+        forwarding = ForwardingHandler(_children_socket)
+        forwarding.setFormatter(JsonFormatter())
+        handlers = (forwarding,)
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Writes out every queued record and stops the listener; safe to call twice."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging(path, level=logging.INFO, max_bytes=10 * 1024 * 1024, backup_count=5, sample_every=1):
+    """
+    Routes the root logger through a queue to a rotating JSON log file at path.
+    Returns the started QueueListener; it is stopped (and the queue flushed) at
+    exit, and restarted in forked child processes.
+    """
+    global _listener, _file_handler
+    records = queue.SimpleQueue()
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonFormatter())
+
+    queue_handler = RequestQueueHandler(records)
+    # Filtered before queueing, so dropped lines cost neither queue nor disk time
+    queue_handler.addFilter(SamplingFilter(sample_every))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    stop_logging()
+    _file_handler = file_handler
+    _listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_restart_listener)
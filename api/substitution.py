@@ -0,0 +1,220 @@
+import re
+
+# python-docx (and lxml under it) is imported where elements are created rather
+# than here, so importing this module (and the app) stays cheap on a cold start
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+XML_NS = 'http://www.w3.org/XML/1998/namespace'
+
+PLACEHOLDER_RE = re.compile(r'\{(\w+)\}')
+
+# Parts holding document text ("stories"). Tables and text boxes live inside these parts.
+STORY_CONTENT_TYPES = frozenset([
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.footer+xml',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.endnotes+xml',
+])
+
+W_T = f'{{{W_NS}}}t'
+W_P = f'{{{W_NS}}}p'
+W_BR = f'{{{W_NS}}}br'
+W_TAB = f'{{{W_NS}}}tab'
+XML_SPACE = f'{{{XML_NS}}}space'
+
+
+class SubstitutionReport:
+    """What a render left unresolved."""
+
+    def __init__(self, unknown, missing):
+        # Placeholders present in the template that the caller did not allow/provide
+        self.unknown = unknown
+        # Allowed fields that appear in the template but had no value ('N/A' was used)
+        self.missing = missing
+
+    @property
+    def ok(self):
+        return not self.unknown and not self.missing
+
+
+class CompiledText:
+    def __init__(self, index, segments):
+        # Position of the w:t element in its part, in document order
+        self.index = index
+        # Alternating literal text and field names: [(False, 'I, '), (True, 'full_name'), ...]
+        self.segments = segments
+
+
+def _paragraph_of(t):
+    for ancestor in t.iterancestors(W_P):
+        return ancestor
+    return None
+
+
+def _compile_paragraph(nodes):
+    """
+    Maps the placeholders in one paragraph's text onto its w:t nodes.
+
+    nodes is a list of (index, text). A placeholder split across runs is written
+    entirely into the node where it starts; the runs it spills into keep only their
+    own remaining text, so each run keeps its formatting.
+    """
+    joined = ''.join(text for _, text in nodes)
+    matches = list(PLACEHOLDER_RE.finditer(joined))
+    if not matches:
+        return []
+
+    compiled = []
+    start = 0
+    for index, text in nodes:
+        end = start + len(text)
+        overlapping = [m for m in matches if m.start() < end and m.end() > start]
+        if overlapping:
+            segments = []
+            pos = start
+            for m in overlapping:
+                if m.start() >= start:
+                    if m.start() > pos:
+                        segments.append((False, joined[pos:m.start()]))
+                    segments.append((True, m.group(1)))
+                pos = min(m.end(), end)
+            if pos < end:
+                segments.append((False, joined[pos:end]))
+            compiled.append(CompiledText(index, segments))
+        start = end
+    return compiled
+
+
+def _compile_part(root):
+    compiled = []
+    paragraph = None
+    nodes = []
+    for index, t in enumerate(root.iter(W_T)):
+        p = _paragraph_of(t)
+        if p is not paragraph:
+            compiled.extend(_compile_paragraph(nodes))
+            paragraph = p
+            nodes = []
+        nodes.append((index, t.text or ''))
+    compiled.extend(_compile_paragraph(nodes))
+    return compiled
+
+
+def _set_text(t, text):
+    """Sets a w:t's text, turning newlines and tabs into w:br/w:tab within the same run."""
+    if '\n' not in text and '\t' not in text:
+        t.text = text
+        if text != text.strip():
+            t.set(XML_SPACE, 'preserve')
+        return
+
+    from docx.oxml.parser import OxmlElement
+
+    anchor = t
+    for i, piece in enumerate(re.split(r'(\n|\t)', text)):
+        if piece == '\n':
+            element = OxmlElement('w:br')
+        elif piece == '\t':
+            element = OxmlElement('w:tab')
+        elif i == 0:
+            t.text = piece
+            if piece != piece.strip():
+                t.set(XML_SPACE, 'preserve')
+            continue
+        elif not piece:
+            continue
+        else:
+            element = OxmlElement('w:t')
+            element.text = piece
+            if piece != piece.strip():
+                element.set(XML_SPACE, 'preserve')
+        anchor.addnext(element)
+        anchor = element
+
+
+class CompiledTemplate:
+    """
+    Index of every {placeholder} in a template, built once when the template is loaded.
+
+    Placeholders are located per w:t node in every story part (body, tables, text
+    boxes, headers, footers, notes), including ones split across runs. Rendering
+    rewrites only those nodes, in a single pass over each part, so run formatting
+    such as bold labels is kept.
+    """
+
+    def __init__(self, parts):
+        # {part name: [CompiledText, ...]}, only for parts that contain placeholders
+        self.parts = parts
+        self.placeholders = frozenset(
+            value
+            for texts in parts.values()
+            for text in texts
+            for is_field, value in text.segments
+            if is_field
+        )
+
+    def render(self, roots, values, fields=None):
+        """
+        Fills placeholders in roots ({part name: root element} of a copy of the
+        compiled template) from values.
+
+        Only placeholders named in fields are substituted (all of them when fields is
+        None); a field without a value is rendered as 'N/A'. Returns a SubstitutionReport.
+        """
+        allowed = self.placeholders if fields is None else self.placeholders.intersection(fields)
+        missing = sorted(name for name in allowed if name not in values)
+        unknown = sorted(self.placeholders - allowed)
+        resolved = {name: str(values.get(name, 'N/A')) for name in allowed}
+
+        for part_name, texts in self.parts.items():
+            nodes = list(roots[part_name].iter(W_T))
+            for text in texts:
+                parts = []
+                for is_field, value in text.segments:
+                    if not is_field:
+                        parts.append(value)
+                    elif value in resolved:
+                        parts.append(resolved[value])
+                    else:
+                        parts.append(f'{{{value}}}')
+                _set_text(nodes[text.index], ''.join(parts))
+
+        return SubstitutionReport(unknown, missing)
+
+    def to_dict(self):
+        """
+        A JSON-friendly form of the index: per part, each w:t node's position and
+        its segments, [is_field, text or field name]. The literal segments give
+        each placeholder's offset within its node.
+        """
+        return {
+            part_name: [{'node': text.index, 'segments': [list(segment) for segment in text.segments]} for text in texts]
+            for part_name, texts in self.parts.items()
+        }
+
+    @classmethod
+    def from_dict(cls, parts):
+        """Rebuilds a CompiledTemplate from to_dict() output without scanning the template."""
+        return cls({
+            part_name: [CompiledText(text['node'], [tuple(segment) for segment in text['segments']]) for text in texts]
+            for part_name, texts in parts.items()
+        })
+
+
+def compile_template(roots):
+    """Builds a CompiledTemplate from {part name: root element} of a template's story parts."""
+    parts = {}
+    for part_name, root in roots.items():
+        texts = _compile_part(root)
+        if texts:
+            parts[part_name] = texts
+    return CompiledTemplate(parts)
+
+
+def document_stories(document):
+    """Returns {part name: root element} for the story parts of a python-docx Document."""
+    stories = {}
+    for part in document.part.package.iter_parts():
+        if part.content_type in STORY_CONTENT_TYPES and hasattr(part, 'element'):
+            stories[part.partname.membername] = part.element
+    return stories
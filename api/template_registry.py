@@ -0,0 +1,163 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+
+from substitution import CompiledTemplate, compile_template
+from tenant_bases import TenantBaseCache
+from xml_renderer import XmlPackage
+
+# Written by create_template.py next to each template: form_15.docx -> form_15.compiled.json
+SIDECAR_SUFFIX = '.compiled.json'
+SIDECAR_FORMAT = 1
+
+
+def sidecar_path(path):
+    return os.path.splitext(path)[0] + SIDECAR_SUFFIX
+
+
+def build_sidecar(path, data):
+    """
+    The compiled form of the template whose bytes are data: its content hash, the
+    fields it needs, and the placeholder index by part, w:t node and segment.
+    """
+    compiled = compile_template(XmlPackage(data).roots)
+    return {
+        'format': SIDECAR_FORMAT,
+        'template': os.path.basename(path),
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'required_fields': sorted(compiled.placeholders),
+        'parts': compiled.to_dict(),
+    }
+
+
+def write_sidecar(path):
+    """Compiles the template at path and writes its sidecar; returns the sidecar dict."""
+    with open(path, 'rb') as f:
+        sidecar = build_sidecar(path, f.read())
+    with open(sidecar_path(path), 'w', encoding='utf-8') as f:
+        json.dump(sidecar, f, indent=1)
+    return sidecar
+
+
+def load_sidecar(path, digest):
+    """The CompiledTemplate from path's sidecar, or None if there is none or it is stale."""
+    try:
+        with open(sidecar_path(path), encoding='utf-8') as f:
+            sidecar = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logging.warning(f"Ignoring unreadable sidecar for {path}: {str(e)}")
+        return None
+    if sidecar.get('format') != SIDECAR_FORMAT or sidecar.get('sha256') != digest:
+        logging.warning(f"Sidecar for {path} is out of date, compiling the template at runtime")
+        return None
+    return CompiledTemplate.from_dict(sidecar['parts'])
+
+
+class CachedTemplate:
+    """A parsed .docx template, its placeholder index and the file state it was loaded from."""
+
+    def __init__(self, path, mtime, size, data):
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.data = data
+        self.digest = hashlib.sha256(data).hexdigest()
+        self.package = XmlPackage(data)
+        # The index precompiled by create_template.py, if it matches these bytes
+        self.compiled = load_sidecar(path, self.digest)
+        self.precompiled = self.compiled is not None
+        if self.compiled is None:
+            self.compiled = compile_template(self.package.roots)
+        self._document = None
+
+    @property
+    def document(self):
+        """The template parsed by python-docx; only built for templates using the docx renderer."""
+        if self._document is None:
+            from docx import Document
+
+            self._document = Document(io.BytesIO(self.data))
+        return self._document
+
+
+class TemplateRegistry:
+    """
+    Keeps every .docx template parsed in memory and hands out private copies.
+
+    - Templates are parsed on first use (or up front via preload()).
+    - A template is re-parsed when its file's mtime or size changes.
+    - The placeholder index comes from the template's .compiled.json sidecar when
+      it matches the file's hash, and is rebuilt from the XML otherwise.
+    - Each entry keeps the raw package and its parsed word/document.xml for the XML
+      renderer, and lazily a python-docx Document for the docx renderer; copying
+      either is much cheaper than unzipping and re-parsing the package.
+    - tenant_bases caches each tenant's partially filled copies of the templates.
+    """
+
+    def __init__(self, templates_dir, tenant_base_bytes=8 * 1024 * 1024, max_tenants=16):
+        self.templates_dir = templates_dir
+        self.tenant_bases = TenantBaseCache(tenant_base_bytes, max_tenants)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _load(self, path, stat):
+        with open(path, 'rb') as f:
+            data = f.read()
+        return CachedTemplate(path, stat.st_mtime_ns, stat.st_size, data)
+
+    def path_for(self, name):
+        """Resolves a template file name relative to templates_dir."""
+        return os.path.join(self.templates_dir, name)
+
+    def get(self, path):
+        """Returns the CachedTemplate for path, (re)loading it if the file changed."""
+        stat = os.stat(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry.mtime == stat.st_mtime_ns and entry.size == stat.st_size:
+            with self._lock:
+                self.hits += 1
+            return entry
+
+        with self._lock:
+            # Another thread may have loaded it while we waited for the lock
+            entry = self._entries.get(path)
+            if entry is not None and entry.mtime == stat.st_mtime_ns and entry.size == stat.st_size:
+                self.hits += 1
+                return entry
+            if entry is not None:
+                self.reloads += 1
+                logging.info(f"Template {path} changed on disk, reloading")
+            self.misses += 1
+            entry = self._load(path, stat)
+            self._entries[path] = entry
+            return entry
+
+    def preload(self):
+        """Parses every .docx in templates_dir so the first request doesn't pay for it."""
+        if not os.path.isdir(self.templates_dir):
+            logging.warning(f"Templates directory {self.templates_dir} not found, skipping preload")
+            return
+        for name in sorted(os.listdir(self.templates_dir)):
+            if name.endswith('.docx'):
+                try:
+                    self.get(os.path.join(self.templates_dir, name))
+                except Exception as e:
+                    logging.error(f"Failed to preload template {name}: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'templates': len(self._entries),
+                'precompiled': sum(entry.precompiled for entry in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+            }
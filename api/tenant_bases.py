@@ -0,0 +1,108 @@
+"""
+Templates with a tenant's details already filled in.
+
+Tenant placeholders are the same for every document a tenant generates, so they
+are resolved once per (template, tenant) into a base package with its own
+placeholder index. Each request then only fills the donor fields on a copy of
+that base.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from metrics import METRICS
+from substitution import compile_template
+from tenants import TENANT_PLACEHOLDERS
+
+
+class TenantBase:
+    """A template's package and placeholder index with one tenant's values filled in."""
+
+    def __init__(self, package, compiled, size):
+        self.package = package
+        self.compiled = compiled
+        # Serialized size of the resolved parts, the measure used for the memory budget
+        self.size = size
+
+
+def build_base(entry, tenant):
+    """Fills tenant's values into a copy of entry (a CachedTemplate) and reindexes the rest."""
+    tenant_fields = entry.compiled.placeholders & TENANT_PLACEHOLDERS
+    roots, _ = entry.package.fill(entry.compiled, tenant.values, tenant_fields)
+    package = entry.package.with_parts(roots)
+    size = sum(len(blob) for name, blob in package.members if name in roots)
+    return TenantBase(package, compile_template(roots), size)
+
+
+class TenantBaseCache:
+    """
+    LRU cache of TenantBase objects, bounded per tenant and in number of tenants.
+
+    - Each tenant's bases are kept within max_bytes_per_tenant; its least recently
+      used templates are dropped first.
+    - At most max_tenants tenants are cached; the least recently used tenant's
+      bases are all dropped when another one is added.
+    - Entries are keyed by template and profile hash, so a reloaded template or an
+      edited profile never reuses a stale base.
+    """
+
+    def __init__(self, max_bytes_per_tenant=8 * 1024 * 1024, max_tenants=16):
+        self.max_bytes_per_tenant = max_bytes_per_tenant
+        self.max_tenants = max_tenants
+        # {tenant digest: [OrderedDict {template digest: TenantBase}, bytes]}
+        self._tenants = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def resolve(self, entry, tenant):
+        """Returns (package, compiled) to render entry for tenant from."""
+        if not entry.compiled.placeholders & TENANT_PLACEHOLDERS:
+            return entry.package, entry.compiled
+
+        with self._lock:
+            bucket = self._tenants.get(tenant.digest)
+            base = bucket[0].get(entry.digest) if bucket is not None else None
+            if base is not None:
+                self._tenants.move_to_end(tenant.digest)
+                bucket[0].move_to_end(entry.digest)
+                self.hits += 1
+                return base.package, base.compiled
+            self.misses += 1
+
+        with METRICS.timer('tenant_base', os.path.basename(entry.path)):
+            base = build_base(entry, tenant)
+        self._put(tenant, entry, base)
+        return base.package, base.compiled
+
+    def _put(self, tenant, entry, base):
+        if base.size > self.max_bytes_per_tenant:
+            return
+        with self._lock:
+            bucket = self._tenants.get(tenant.digest)
+            if bucket is None:
+                bucket = self._tenants[tenant.digest] = [OrderedDict(), 0]
+                while len(self._tenants) > self.max_tenants:
+                    _, (evicted, _) = self._tenants.popitem(last=False)
+                    self.evictions += len(evicted)
+            self._tenants.move_to_end(tenant.digest)
+            bases = bucket[0]
+            if entry.digest in bases:
+                bucket[1] -= bases.pop(entry.digest).size
+            while bases and bucket[1] + base.size > self.max_bytes_per_tenant:
+                bucket[1] -= bases.popitem(last=False)[1].size
+                self.evictions += 1
+            bases[entry.digest] = base
+            bucket[1] += base.size
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tenants': len(self._tenants),
+                'bases': sum(len(bases) for bases, _ in self._tenants.values()),
+                'bytes': sum(size for _, size in self._tenants.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
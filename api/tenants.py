@@ -0,0 +1,82 @@
+"""
+Tenant profiles: the clinic details (doctor, counsellor, ART bank, witness)
+that templates refer to as {tenant_*} placeholders.
+
+Each profile is a JSON file in the tenants directory, named after the tenant:
+
+    tenants/cryoconserve.json
+    {"display_name": "Cryoconserve", "fields": {"doctor_name": "Dr. ...", ...}}
+
+A profile must give every field in TENANT_FIELDS. Values may contain newlines,
+which become line breaks in the document.
+"""
+import hashlib
+import json
+import logging
+import os
+
+TENANT_PREFIX = 'tenant_'
+
+TENANT_FIELDS = (
+    'doctor_name',
+    'doctor_address',
+    'counsellor_name',
+    'counsellor_address',
+    'bank_name',
+    'bank_legal_name',
+    'bank_address',
+    'bank_address_line',
+    'witness_name',
+    'witness_address',
+)
+
+# The placeholders templates may use for tenant details
+TENANT_PLACEHOLDERS = frozenset(TENANT_PREFIX + name for name in TENANT_FIELDS)
+
+
+class TenantProfile:
+    """A tenant's name and its placeholder values, keyed by placeholder ({tenant_doctor_name: ...})."""
+
+    def __init__(self, name, display_name, fields):
+        missing = [field for field in TENANT_FIELDS if not fields.get(field)]
+        if missing:
+            raise ValueError(f"Tenant profile '{name}' is missing: {', '.join(missing)}")
+        self.name = name
+        self.display_name = display_name or name
+        self.values = {TENANT_PREFIX + field: str(fields[field]) for field in TENANT_FIELDS}
+        # Identifies these exact values, so cached documents for an edited profile aren't reused
+        self.digest = hashlib.sha256(
+            json.dumps([name, self.values], sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+
+
+def load_profile(path):
+    with open(path, encoding='utf-8') as f:
+        profile = json.load(f)
+    name = os.path.splitext(os.path.basename(path))[0]
+    return TenantProfile(name, profile.get('display_name'), profile.get('fields', {}))
+
+
+class TenantRegistry:
+    """The tenant profiles in tenants_dir, loaded once."""
+
+    def __init__(self, tenants_dir):
+        self.tenants_dir = tenants_dir
+        self._profiles = {}
+        if not os.path.isdir(tenants_dir):
+            logging.warning(f"Tenants directory {tenants_dir} not found, no tenant profiles loaded")
+            return
+        for filename in sorted(os.listdir(tenants_dir)):
+            if filename.endswith('.json'):
+                try:
+                    profile = load_profile(os.path.join(tenants_dir, filename))
+                except (OSError, ValueError) as e:
+                    logging.error(f"Failed to load tenant profile {filename}: {str(e)}")
+                    continue
+                self._profiles[profile.name] = profile
+
+    def get(self, name):
+        return self._profiles.get(name)
+
+    def names(self):
+        return sorted(self._profiles)
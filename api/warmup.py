@@ -0,0 +1,63 @@
+"""
+Cache warm-up off the request path.
+
+On a cold start (e.g. a new serverless instance) the app answers its first
+request before parsing any .docx template; the caches are filled on a daemon
+thread once that response has been sent. A render that arrives before the
+warm-up reaches its template simply loads it on demand, as before.
+"""
+import logging
+import threading
+
+from metrics import METRICS
+
+
+class WarmUp:
+    """
+    Runs named warm-up tasks once, in order, on a daemon thread.
+
+    - start() only starts the thread the first time it is called.
+    - A failing task is logged and the remaining tasks still run.
+    - Each task is timed as the 'warm_up' stage on /metrics, labelled by name.
+    - done is set once every task has finished.
+    """
+
+    def __init__(self, tasks):
+        self.tasks = list(tasks)
+        self.done = threading.Event()
+        self.failed = 0
+        self._started = False
+        self._lock = threading.Lock()
+
+    @property
+    def started(self):
+        return self._started
+
+    def start(self):
+        """Starts the warm-up thread; returns False if it was already started."""
+        with self._lock:
+            if self._started:
+                return False
+            self._started = True
+        threading.Thread(target=self.run, name='warm-up', daemon=True).start()
+        return True
+
+    def run(self):
+        """Runs every task in the calling thread."""
+        self._started = True
+        for name, task in self.tasks:
+            try:
+                with METRICS.timer('warm_up', name):
+                    task()
+            except Exception as e:
+                self.failed += 1
+                logging.error(f"Warm-up task {name} failed: {str(e)}")
+        self.done.set()
+        logging.info(f"Warm-up finished ({len(self.tasks)} tasks, {self.failed} failed)")
+
+    def stats(self):
+        return {
+            'started': int(self._started),
+            'done': int(self.done.is_set()),
+            'failed': self.failed,
+        }
@@ -0,0 +1,80 @@
+import copy
+import io
+import zipfile
+
+from substitution import STORY_CONTENT_TYPES
+
+CONTENT_TYPES_PART = '[Content_Types].xml'
+
+
+def _story_part_names(content_types_xml):
+    from docx.oxml.parser import parse_xml
+
+    names = []
+    for override in parse_xml(content_types_xml).iterchildren('{*}Override'):
+        if override.get('ContentType') in STORY_CONTENT_TYPES:
+            names.append(override.get('PartName').lstrip('/'))
+    return names
+
+
+class XmlPackage:
+    """
+    A .docx package held as its raw zip members plus its parsed story parts
+    (word/document.xml, headers, footers, notes).
+
+    Rendering from this skips python-docx's package loading, relationship graph and
+    Paragraph/Run proxies: only the story parts are copied, edited and re-serialized,
+    and every other member is written back byte for byte.
+    """
+
+    def __init__(self, data):
+        # python-docx is only imported once a template is actually loaded
+        from docx.oxml.parser import parse_xml
+
+        self.members = []
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            for info in zf.infolist():
+                self.members.append((info.filename, zf.read(info)))
+        blobs = dict(self.members)
+        self.roots = {
+            name: parse_xml(blobs[name])
+            for name in _story_part_names(blobs[CONTENT_TYPES_PART])
+            if name in blobs
+        }
+
+    def with_parts(self, roots):
+        """
+        A package like this one with the parts in roots ({part name: root})
+        replaced, e.g. by a partially filled copy that later renders start from.
+        """
+        from docx.opc.oxml import serialize_part_xml
+
+        package = copy.copy(self)
+        rendered = {name: serialize_part_xml(root) for name, root in roots.items()}
+        package.members = [(name, rendered.get(name, blob)) for name, blob in self.members]
+        package.roots = dict(self.roots, **roots)
+        return package
+
+    def render(self, compiled, values, fields=None):
+        """Returns (docx bytes, SubstitutionReport) for a filled copy of this package."""
+        roots, report = self.fill(compiled, values, fields)
+        return self.save(roots), report
+
+    def fill(self, compiled, values, fields=None):
+        """Returns ({part name: filled root}, SubstitutionReport) for the parts with placeholders."""
+        # Parts without placeholders are never touched, so only the others need copying
+        roots = {name: copy.deepcopy(self.roots[name]) for name in compiled.parts}
+        return roots, compiled.render(roots, values, fields)
+
+    def save(self, roots):
+        """Returns the .docx bytes of this package with roots in place of the original parts."""
+        from docx.opc.oxml import serialize_part_xml
+
+        rendered = {name: serialize_part_xml(root) for name, root in roots.items()}
+
+        buffer = io.BytesIO()
+        # Same member order and compression python-docx uses when saving
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            for name, blob in self.members:
+                zf.writestr(name, rendered.get(name, blob))
+        return buffer.getvalue()
@@ -0,0 +1,72 @@
+"""
+Benchmark: CPU time and size of the per-submission ZIP under different
+compression policies, for the sperm, oocyte and commissioning couple bundles.
+
+Usage:
+    python benchmarks/bench_bundle.py [--iterations N]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+
+from bundles import CompressionPolicy, build_zip  # noqa: E402
+from template_registry import TemplateRegistry  # noqa: E402
+
+TEMPLATES_DIR = os.path.join(ROOT, 'templates_docx')
+
+BUNDLES = {
+    'sperm': ['form_15.docx', 'medical_history.docx', 'donor_info.docx'],
+    'oocyte': ['form_13.docx', 'oocyte_medical_history.docx', 'oocyte_donor_affidavit.docx'],
+    'commissioning_couple': ['commissioning_couple_affidavit.docx'],
+}
+
+POLICIES = {
+    'deflate all (old)': CompressionPolicy(stored_extensions=()),
+    'deflate all, level 1': CompressionPolicy(stored_extensions=(), compresslevel=1),
+    'store .docx': CompressionPolicy(),
+}
+
+
+def render_bundle(registry, names):
+    documents = []
+    for name in names:
+        entry = registry.get(os.path.join(TEMPLATES_DIR, name))
+        values = {key: f'Sample {key.replace("_", " ")}' for key in entry.compiled.placeholders}
+        documents.append((name, entry.package.render(entry.compiled, values)[0]))
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    registry = TemplateRegistry(TEMPLATES_DIR)
+    print(f"{'bundle':<22}{'policy':<24}{'cpu ms':>9}{'bytes':>10}{'cpu saved ms':>14}{'bytes saved':>13}")
+    for bundle, names in BUNDLES.items():
+        documents = render_bundle(registry, names)
+        baseline_cpu = baseline_size = None
+        for label, policy in POLICIES.items():
+            start = time.process_time()
+            for _ in range(args.iterations):
+                data = build_zip(documents, policy)
+            cpu_ms = (time.process_time() - start) / args.iterations * 1e3
+            # Make sure the policy still produces a readable archive
+            with zipfile.ZipFile(io.BytesIO(data)) as zf:
+                assert zf.testzip() is None
+            if baseline_cpu is None:
+                baseline_cpu, baseline_size = cpu_ms, len(data)
+            print(
+                f"{bundle:<22}{label:<24}{cpu_ms:>9.2f}{len(data):>10}"
+                f"{baseline_cpu - cpu_ms:>14.2f}{baseline_size - len(data):>13}"
+            )
+
+
+if __name__ == '__main__':
+    main()
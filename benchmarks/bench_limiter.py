@@ -0,0 +1,94 @@
+"""
+Benchmark: rate limiter overhead per request for each storage backend.
+
+A bare Flask route is requested through the test client with no limiter, then
+with Flask-Limiter on each storage/strategy pair, from many distinct client
+addresses. The difference is what the limiter adds to every request. Keys
+held by the storage afterwards show how its memory grows with distinct clients.
+
+Usage:
+    python benchmarks/bench_limiter.py [--requests N] [--clients N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+
+from flask import Flask  # noqa: E402
+from flask_limiter import Limiter  # noqa: E402
+from flask_limiter.util import get_remote_address  # noqa: E402
+import rate_limit_storage  # noqa: E402,F401
+
+LIMITS = ["200 per day", "50 per hour"]
+
+
+def make_app(storage_uri=None, strategy=None):
+    app = Flask(__name__)
+
+    @app.route('/')
+    def index():
+        return ''
+
+    limiter = None
+    if storage_uri:
+        limiter = Limiter(
+            app=app,
+            key_func=get_remote_address,
+            default_limits=LIMITS,
+            storage_uri=storage_uri,
+            strategy=strategy,
+        )
+    return app, limiter
+
+
+def stored_keys(limiter):
+    storage = limiter.limiter.storage
+    if isinstance(storage, rate_limit_storage.SQLiteStorage):
+        return storage._connection().execute('SELECT COUNT(*) FROM counters').fetchone()[0]
+    return len(storage.storage) + len(storage.events)
+
+
+def run(app, requests, clients):
+    client = app.test_client()
+    addresses = [f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}' for i in range(clients)]
+    start = time.perf_counter()
+    for i in range(requests):
+        client.get('/', environ_base={'REMOTE_ADDR': addresses[i % clients]})
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=1000, help='Distinct client addresses')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per backend; the fastest is reported')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_limiter_')
+    backends = [
+        ('no limiter', None, None),
+        ('memory, fixed window', 'memory://', 'fixed-window'),
+        ('memory, moving window', 'memory://', 'moving-window'),
+        ('memory, sliding counter', 'memory://', 'sliding-window-counter'),
+        ('sqlite, fixed window', f'sqlite:///{workdir}/fixed.sqlite', 'fixed-window'),
+        ('sqlite, sliding counter', f'sqlite:///{workdir}/sliding.sqlite', 'sliding-window-counter'),
+    ]
+
+    print(f"{args.requests} requests from {args.clients} clients, limits {LIMITS}")
+    print(f"{'backend':<26}{'us/request':>12}{'overhead us':>13}{'stored keys':>13}")
+    baseline = None
+    for label, storage_uri, strategy in backends:
+        app, limiter = make_app(storage_uri, strategy)
+        us = min(run(app, args.requests, args.clients) for _ in range(args.repeat))
+        if baseline is None:
+            baseline = us
+        keys = stored_keys(limiter) if limiter else 0
+        print(f"{label:<26}{us:>12.1f}{us - baseline:>13.1f}{keys:>13}")
+
+
+if __name__ == '__main__':
+    main()
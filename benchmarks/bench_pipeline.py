@@ -0,0 +1,224 @@
+"""
+Benchmark: the document generation pipeline, per template and end to end.
+
+- Per template: render_document() for every template in templates_docx/, each
+  time for a different synthetic donor.
+- End to end: the Flask test client posts each form to /generate_* and
+  downloads the ZIP, as a browser would (rate limits are switched off).
+- API: the same submissions posted as JSON to /api/v1/documents/<form>, which
+  answers with the ZIP itself.
+
+For each it reports documents/sec, p50/p95/p99 latency, bytes written, and the
+process's peak RSS so far. --json writes the results with the run's commit and
+environment so runs can be compared; --baseline compares against such a file.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--iterations N] [--requests N] [--json out.json] [--baseline old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from donors import synthetic_donors  # noqa: E402
+from forms import FORM_TYPES  # noqa: E402
+from rendering import render_document  # noqa: E402
+from template_registry import TemplateRegistry  # noqa: E402
+from tenants import TenantRegistry  # noqa: E402
+
+TEMPLATES_DIR = os.path.join(ROOT, 'templates_docx')
+TENANTS_DIR = os.path.join(ROOT, 'tenants')
+# Added to --seed for the API section's donors, so they differ from the end-to-end ones
+API_SEED_OFFSET = 1000
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(p / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize(name, latencies, documents, bytes_written, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'name': name,
+        'samples': len(latencies),
+        'documents': documents,
+        'docs_per_sec': documents / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1e3,
+        'p95_ms': percentile(latencies, 95) * 1e3,
+        'p99_ms': percentile(latencies, 99) * 1e3,
+        'bytes_written': bytes_written,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def bench_templates(iterations, seed, tenant_name):
+    """render_document() for each template, once per synthetic donor."""
+    registry = TemplateRegistry(TEMPLATES_DIR)
+    registry.preload()
+    tenant = TenantRegistry(TENANTS_DIR).get(tenant_name)
+    if tenant is None:
+        raise RuntimeError(f"no tenant profile '{tenant_name}' in {TENANTS_DIR}")
+    results = []
+    for form_name, form_type in FORM_TYPES.items():
+        donors = [form_type.parse(form)[0] for form in synthetic_donors(form_name, iterations, seed)]
+        for template in form_type.templates:
+            render_document(registry, template, donors[0], tenant)  # warm-up
+            latencies = []
+            bytes_written = 0
+            start = time.perf_counter()
+            for form_data in donors:
+                t0 = time.perf_counter()
+                bytes_written += len(render_document(registry, template, form_data, tenant))
+                latencies.append(time.perf_counter() - t0)
+            elapsed = time.perf_counter() - start
+            results.append(summarize(f"template {template['file']}", latencies, len(donors), bytes_written, elapsed))
+    return results
+
+
+def bench_end_to_end(requests, seed):
+    """POST /generate_<form> and GET the ZIP, for each synthetic donor."""
+    os.chdir(ROOT)
+    import app as app_module
+
+    app_module.limiter.enabled = False
+    client = app_module.app.test_client()
+    results = []
+    for form_name, form_type in FORM_TYPES.items():
+        url = f'/generate_{form_name}'
+        donors = synthetic_donors(form_name, requests + 1, seed)
+        client.post(url, data=donors.pop())  # warm-up
+        latencies = []
+        bytes_written = 0
+        start = time.perf_counter()
+        for form in donors:
+            t0 = time.perf_counter()
+            page = client.post(url, data=form).get_data(as_text=True)
+            match = re.search(r'/download/([\w-]+)', page)
+            if match is None:
+                raise RuntimeError(f"{url} did not return a download link")
+            bytes_written += len(client.get(f'/download/{match.group(1)}').get_data())
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        documents = len(donors) * len(form_type.templates)
+        results.append(summarize(f"end to end {form_name}", latencies, documents, bytes_written, elapsed))
+    return results
+
+
+def bench_api(requests, seed):
+    """POST each synthetic donor as JSON to /api/v1/documents/<form>, which returns the ZIP."""
+    os.chdir(ROOT)
+    import app as app_module
+
+    app_module.limiter.enabled = False
+    client = app_module.app.test_client()
+    results = []
+    for form_name, form_type in FORM_TYPES.items():
+        url = f'/api/v1/documents/{form_name}'
+        # Not bench_end_to_end's donors: in the same process they would all be render cache hits
+        donors = synthetic_donors(form_name, requests + 1, seed + API_SEED_OFFSET)
+        client.post(url, json=donors.pop())  # warm-up
+        latencies = []
+        bytes_written = 0
+        start = time.perf_counter()
+        for form in donors:
+            t0 = time.perf_counter()
+            response = client.post(url, json=form)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} answered {response.status_code}: {response.get_data(as_text=True)}")
+            bytes_written += len(response.get_data())
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        documents = len(donors) * len(form_type.templates)
+        results.append(summarize(f"api {form_name}", latencies, documents, bytes_written, elapsed))
+    return results
+
+
+def environment(args):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'args': vars(args),
+    }
+
+
+def print_results(results, baseline):
+    previous = {result['name']: result for result in (baseline or {}).get('results', [])}
+    header = f"{'benchmark':<46}{'docs/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'KiB out':>10}{'RSS MiB':>9}"
+    print(header + ('  vs baseline docs/s, p95' if previous else ''))
+    for result in results:
+        line = (
+            f"{result['name']:<46}{result['docs_per_sec']:>9.1f}{result['p50_ms']:>9.2f}"
+            f"{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}{result['bytes_written'] / 1024:>10.0f}"
+            f"{result['peak_rss_mb']:>9.1f}"
+        )
+        old = previous.get(result['name'])
+        if old:
+            line += (
+                f"  {(result['docs_per_sec'] / old['docs_per_sec'] - 1) * 100:+.0f}%"
+                f", {(result['p95_ms'] / old['p95_ms'] - 1) * 100:+.0f}%"
+            )
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=200, help='Renders per template')
+    parser.add_argument('--requests', type=int, default=50, help='Submissions per form type, end to end')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic donors')
+    parser.add_argument('--tenant', default='cryoconserve', help='Tenant profile to render for')
+    parser.add_argument('--only', choices=('templates', 'end-to-end', 'api'), help='Run just one part')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--baseline', help='Results file from an earlier run to compare against')
+    args = parser.parse_args()
+
+    results = []
+    if args.only in (None, 'templates'):
+        results += bench_templates(args.iterations, args.seed, args.tenant)
+    if args.only in (None, 'end-to-end'):
+        results += bench_end_to_end(args.requests, args.seed)
+    if args.only in (None, 'api'):
+        results += bench_api(args.requests, args.seed)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment(args), 'results': results}, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == '__main__':
+    main()
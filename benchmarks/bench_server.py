@@ -0,0 +1,270 @@
+"""
+Benchmark: the preforking server (api/server.py) under load, per worker class.
+
+For each worker class it starts the server on a free port (rate limits off),
+waits until it answers, then drives it from --clients threads for --duration
+seconds with a mix of cached page GETs and JSON API renders, over real HTTP.
+It reports requests/sec and p50/p95 latency per kind of request, and the memory
+of the master and each worker:
+- RSS, what each process has resident, shared pages included;
+- PSS, shared pages split between the processes sharing them, so the PSS of all
+  of them adds up to what the server really uses;
+- USS, pages only that process uses, what a worker costs on top of the others.
+--compare-preload also runs each class with --no-preload, to show what warming
+the caches in the master (and sharing them copy-on-write) saves. Requests shed
+by admission control (503) are counted apart and left out of the latencies,
+and the client waits out their Retry-After. --compare-admission also runs each
+class with it off; with --render-clients saturating generation, e.g.
+    --clients 4 --api-share 0 --render-clients 24 --compare-admission
+it shows what admission control does to page latency at the same page load.
+--recycle-every N also runs each class with workers recycled after about N
+requests; any connection a recycling worker drops shows up as an error.
+--abort-share hangs up on that fraction of page requests after the first byte
+of the response, as an impatient browser does. Each run reports how long the
+server then took to stop: a request the server lost track of holds its worker
+for the whole --graceful-timeout.
+
+async needs gevent and is skipped if it isn't installed.
+
+Usage:
+    python benchmarks/bench_server.py [--workers N] [--clients N] [--duration S] [--classes sync threaded]
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import percentile  # noqa: E402
+from donors import synthetic_donors  # noqa: E402
+
+PAGES = ['/', '/sperm', '/oocyte']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, worker_class, workers, options):
+    command = [
+        sys.executable, os.path.join(ROOT, 'api', 'server.py'), '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers), '--worker-class', worker_class, '--no-rate-limit',
+    ] + list(options)
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with status {server.returncode}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/')
+            if connection.getresponse().status == 200:
+                connection.close()
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("server did not start within 60 s")
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def worker_pids(master_pid):
+    pids = []
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                # The command name is in parentheses and may contain spaces
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == master_pid:
+            pids.append(int(name))
+    return sorted(pids)
+
+
+def memory_mb(pid):
+    """RSS, PSS and USS of pid in MiB, from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    uss = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return values.get('Rss', 0) / 1024, values.get('Pss', 0) / 1024, uss / 1024
+
+
+def client_loop(port, deadline, api_share, seed, results, lock, abort_share=0.0):
+    rng = random.Random(seed)
+    donors = {name: synthetic_donors(name, 20, seed) for name in ('sperm', 'oocyte')}
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    latencies = {'page': [], 'api': []}
+    errors = 0
+    shed = 0
+    aborted = 0
+    while time.monotonic() < deadline:
+        if rng.random() < api_share:
+            kind = 'api'
+            form_name = rng.choice(['sperm', 'oocyte'])
+            body = json.dumps(rng.choice(donors[form_name]))
+            args = ('POST', f'/api/v1/documents/{form_name}', body, {'Content-Type': 'application/json'})
+        else:
+            kind = 'page'
+            args = ('GET', rng.choice(PAGES), None, {})
+        t0 = time.perf_counter()
+        try:
+            connection.request(*args)
+            if kind == 'page' and rng.random() < abort_share:
+                # Closing with the rest of the response unread makes the kernel reset the connection
+                connection.sock.recv(1)
+                connection.close()
+                aborted += 1
+                continue
+            response = connection.getresponse()
+            response.read()
+            if response.will_close:
+                connection.close()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            continue
+        if response.status == 503:
+            shed += 1
+            # As a well-behaved client would; retrying at once only adds load
+            time.sleep(max(min(float(response.getheader('Retry-After', 1)), deadline - time.monotonic()), 0))
+        elif response.status != 200:
+            errors += 1
+        else:
+            latencies[kind].append(time.perf_counter() - t0)
+    connection.close()
+    with lock:
+        for kind, values in latencies.items():
+            results[kind].extend(values)
+        results['errors'] += errors
+        results['shed'] += shed
+        results['aborted'] += aborted
+
+
+def run_load(port, clients, duration, api_share, seed, render_clients=0, abort_share=0.0):
+    results = {'page': [], 'api': [], 'errors': 0, 'shed': 0, 'aborted': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    # render_clients only post documents, on top of the clients' mix
+    shares = [api_share] * clients + [1.0] * render_clients
+    threads = [
+        threading.Thread(target=client_loop, args=(port, deadline, share, seed + i, results, lock, abort_share))
+        for i, share in enumerate(shares)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results['elapsed'] = time.perf_counter() - start
+    return results
+
+
+def bench(worker_class, args, options):
+    port = free_port()
+    server = start_server(port, worker_class, args.workers, options)
+    try:
+        # A short warm-up so every worker has served (and cached) before measuring
+        run_load(port, args.clients, 1, args.api_share, args.seed)
+        results = run_load(
+            port, args.clients, args.duration, args.api_share, args.seed, args.render_clients, args.abort_share
+        )
+        processes = [('master', server.pid)] + [('worker', pid) for pid in worker_pids(server.pid)]
+        memory = []
+        for role, pid in processes:
+            try:
+                memory.append((role, pid) + memory_mb(pid))
+            except OSError:
+                pass  # A worker that was just recycled
+    finally:
+        start = time.perf_counter()
+        stop_server(server)
+    results['stop_seconds'] = time.perf_counter() - start
+    return results, memory
+
+
+def print_run(label, results, memory):
+    total = len(results['page']) + len(results['api'])
+    print(
+        f"{label}: {total / results['elapsed']:.1f} req/s, {results['shed']} shed, {results['aborted']} aborted,"
+        f" {results['errors']} errors, stopped in {results['stop_seconds']:.1f} s"
+    )
+    for kind in ('page', 'api'):
+        latencies = sorted(results[kind])
+        if latencies:
+            print(
+                f"  {kind:<6}{len(latencies) / results['elapsed']:>9.1f} req/s"
+                f"   p50 {percentile(latencies, 50) * 1e3:>8.2f} ms   p95 {percentile(latencies, 95) * 1e3:>8.2f} ms"
+            )
+    print(f"  {'process':<16}{'RSS MiB':>9}{'PSS MiB':>9}{'USS MiB':>9}")
+    for role, pid, rss, pss, uss in memory:
+        print(f"  {f'{role} {pid}':<16}{rss:>9.1f}{pss:>9.1f}{uss:>9.1f}")
+    print(f"  {'total':<16}{sum(m[2] for m in memory):>9.1f}{sum(m[3] for m in memory):>9.1f}{sum(m[4] for m in memory):>9.1f}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--classes', nargs='+', default=['sync', 'threaded', 'async'], choices=('sync', 'threaded', 'async'))
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent client connections')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of load per run')
+    parser.add_argument('--api-share', type=float, default=0.2, help='Fraction of requests that render documents')
+    parser.add_argument('--render-clients', type=int, default=0, help='Extra clients that only render documents')
+    parser.add_argument('--abort-share', type=float, default=0.0, help='Fraction of page requests the client hangs up on')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare-preload', action='store_true', help='Also run each class with --no-preload')
+    parser.add_argument('--compare-admission', action='store_true', help='Also run each class with --no-admission')
+    parser.add_argument('--recycle-every', type=int, default=0, help='Also run each class recycling workers after this many requests')
+    args = parser.parse_args()
+
+    no_recycling = ['--max-requests', '0']
+    variants = [('', no_recycling)]
+    if args.compare_preload:
+        variants.append((', no preload', no_recycling + ['--no-preload']))
+    if args.compare_admission:
+        variants.append((', no admission control', no_recycling + ['--no-admission']))
+    if args.recycle_every:
+        variants.append((
+            f', recycling every {args.recycle_every} requests',
+            ['--max-requests', str(args.recycle_every), '--max-requests-jitter', str(args.recycle_every // 10)],
+        ))
+
+    for worker_class in args.classes:
+        if worker_class == 'async' and importlib.util.find_spec('gevent') is None:
+            print("async: skipped, gevent is not installed\n")
+            continue
+        for suffix, options in variants:
+            results, memory = bench(worker_class, args, options)
+            clients = f"{args.clients} clients" + (f" + {args.render_clients} rendering" if args.render_clients else '')
+            print_run(f"{worker_class}, {args.workers} workers, {clients}{suffix}", results, memory)
+
+
+if __name__ == '__main__':
+    main()
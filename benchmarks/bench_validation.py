@@ -0,0 +1,415 @@
+"""
+Benchmark: the declarative, precompiled form schemas vs the hand-written
+validation they replaced, on a batch of synthetic submissions (a mix of valid
+and invalid ones) for each form type. Also checks both produce the same
+form_data and errors.
+
+Usage:
+    python benchmarks/bench_validation.py [--records N]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+
+from forms import FORM_TYPES  # noqa: E402
+
+
+def legacy_parse_sperm_form(form):
+    """The hand-written sperm donor validation the schema replaced."""
+    form_data = {
+        'full_name': form.get('full_name', '').strip(),
+        'address': form.get('address', '').strip(),
+        'pin_code': form.get('pin_code', '').strip(),
+        'contact_number': form.get('contact_number', '').strip(),
+        'aadhaar_number': form.get('aadhaar_number', '').strip(),
+        'date_of_birth': form.get('date_of_birth', '').strip(),
+        'email_address': form.get('email_address', '').strip(),
+        'donor_id': form.get('donor_id', '').strip(),
+        'date_of_discussion': form.get('date_of_discussion', '').strip(),
+        'date_of_consultancy': form.get('date_of_consultancy', '').strip(),
+        'genetic_disorders': form.get('genetic_disorders', '').strip(),
+        'family_history': form.get('family_history', '').strip(),
+        'current_medications': form.get('current_medications', '').strip(),
+        'allergies': form.get('allergies', '').strip(),
+        'last_medical_exam': form.get('last_medical_exam', '').strip(),
+        'hiv_results': form.get('hiv_results', '').strip(),
+        'hbv_results': form.get('hbv_results', '').strip(),
+        'hcv_results': form.get('hcv_results', '').strip(),
+        'vdrl_results': form.get('vdrl_results', '').strip(),
+        'serious_illness': form.get('serious_illness', '').strip(),
+        'smoking': form.get('smoking', 'No'),
+        'smoking_frequency': form.get('smoking_frequency', '').strip(),
+        'cigarettes_per_day': form.get('cigarettes_per_day', '').strip(),
+        'alcohol': form.get('alcohol', 'No'),
+        'alcohol_frequency': form.get('alcohol_frequency', '').strip(),
+        'alcohol_amount': form.get('alcohol_amount', '').strip(),
+        'drug_use': form.get('drug_use', 'No'),
+        'diet': form.get('diet', 'Not Specified'),
+        'marital_status': form.get('marital_status', 'Not Specified'),
+        'num_children': form.get('num_children', '0').strip(),
+        'donor_experience': form.get('donor_experience', 'No'),
+        'donation_frequency': form.get('donation_frequency', '').strip(),
+        'height': form.get('height', '').strip(),
+        'weight': form.get('weight', '').strip(),
+        'education': form.get('education', '').strip(),
+        'mother_tongue': form.get('mother_tongue', '').strip(),
+        'skin_colour': form.get('skin_colour', '').strip(),
+        'hair_colour': form.get('hair_colour', '').strip(),
+        'eye_colour': form.get('eye_colour', '').strip(),
+        'religion': form.get('religion', '').strip(),
+        'occupation': form.get('occupation', '').strip(),
+        'consent_cryopreservation': 'Yes' if form.get('consent_cryopreservation') else 'No',
+        'consent_art_bank': 'Yes' if form.get('consent_art_bank') else 'No',
+        'consent_registry': 'Yes' if form.get('consent_registry') else 'No',
+        'date': datetime.now().strftime('%d/%m/%y')
+    }
+
+    # Server-side validation
+    required_fields = ['full_name', 'aadhaar_number', 'date_of_discussion', 'date_of_consultancy']
+    errors = []
+    for field in required_fields:
+        if not form_data[field]:
+            errors.append(f"{field.replace('_', ' ').title()} is required.")
+
+    # Validate Aadhaar number
+    if form_data['aadhaar_number'] and not re.match(r'^\d{12}$', form_data['aadhaar_number']):
+        errors.append("Aadhaar Number must be 12 digits.")
+
+    # Validate email format
+    if form_data['email_address'] and not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', form_data['email_address']):
+        errors.append("Invalid email address.")
+
+    # Validate phone number
+    if form_data['contact_number'] and not re.match(r'^\d{10}$|^$', form_data['contact_number']):
+        errors.append("Contact Number must be 10 digits if provided.")
+
+    # Validate PIN code
+    if form_data['pin_code'] and not re.match(r'^\d{6}$|^$', form_data['pin_code']):
+        errors.append("PIN Code must be 6 digits if provided.")
+
+    # Validate dates
+    today = datetime.now().date()
+    for date_field in ['date_of_birth', 'last_medical_exam', 'date_of_discussion', 'date_of_consultancy']:
+        if form_data[date_field]:
+            try:
+                input_date = datetime.strptime(form_data[date_field], '%Y-%m-%d').date()
+                if input_date > today:
+                    errors.append(f"{date_field.replace('_', ' ').title()} cannot be in the future.")
+            except ValueError:
+                errors.append(f"Invalid format for {date_field.replace('_', ' ').title()}.")
+
+    # Validate number of children
+    try:
+        num_children = int(form_data['num_children']) if form_data['num_children'] else 0
+        if num_children < 0:
+            errors.append("Number of children cannot be negative.")
+        elif num_children > 20:
+            errors.append("Number of children cannot exceed 20.")
+    except ValueError:
+        errors.append("Number of children must be a valid number.")
+        num_children = 0
+
+    # Validate children ages
+    children_ages = []
+    for i in range(1, num_children + 1):
+        age = form.get(f'child_{i}_age', '').strip()
+        try:
+            if age:
+                age_val = int(age)
+                if age_val < 0 or age_val > 100:
+                    errors.append(f"Child {i} Age must be between 0 and 100.")
+                children_ages.append(f"Child {i}: Age: {age}")
+            else:
+                children_ages.append(f"Child {i}: Age: N/A")
+        except ValueError:
+            errors.append(f"Child {i} Age must be a valid number.")
+
+    # Validate conditional fields
+    if form_data['smoking'] == 'Yes' and not (form_data['smoking_frequency'] and form_data['cigarettes_per_day']):
+        errors.append("Smoking Frequency and Cigarettes per Day are required if smoking is Yes.")
+    if form_data['alcohol'] == 'Yes' and not (form_data['alcohol_frequency'] and form_data['alcohol_amount']):
+        errors.append("Alcohol Frequency and Amount are required if alcohol consumption is Yes.")
+
+    # Validate blood test results
+    for field in ['hiv_results', 'hbv_results', 'hcv_results', 'vdrl_results']:
+        if form_data[field] and form_data[field].lower() not in ['negative', 'positive', 'pending', '']:
+            errors.append(f"{field.replace('_', ' ').title()} must be 'Negative', 'Positive', or 'Pending'.")
+
+    form_data['children_ages'] = '\n'.join(children_ages) if children_ages else 'None'
+
+    return form_data, errors
+
+
+def legacy_parse_oocyte_form(form):
+    """The hand-written oocyte donor validation the schema replaced."""
+    form_data = {
+        'full_name': form.get('full_name', '').strip(),
+        'address': form.get('address', '').strip(),
+        'district': form.get('district', '').strip(),
+        'state': form.get('state', '').strip(),
+        'pin_code': form.get('pin_code', '').strip(),
+        'contact_number': form.get('contact_number', '').strip(),
+        'aadhaar_number': form.get('aadhaar_number', '').strip(),
+        'date_of_birth': form.get('date_of_birth', '').strip(),
+        'age': form.get('age', '').strip(),
+        'email_address': form.get('email_address', '').strip(),
+        'date_of_discussion': form.get('date_of_discussion', '').strip(),
+        'date_of_consultancy': form.get('date_of_consultancy', '').strip(),
+        'marital_status': form.get('marital_status', 'Not Specified'),
+        'num_children': form.get('num_children', '0').strip(),
+        'donor_id': form.get('donor_id', '').strip(),
+        'last_medical_exam': form.get('last_medical_exam', '').strip(),
+        'hiv_results': form.get('hiv_results', '').strip(),
+        'hbv_results': form.get('hbv_results', '').strip(),
+        'hcv_results': form.get('hcv_results', '').strip(),
+        'vdrl_results': form.get('vdrl_results', '').strip(),
+        'family_history': form.get('family_history', '').strip(),
+        'serious_illness': form.get('serious_illness', '').strip(),
+        'current_medications': form.get('current_medications', '').strip(),
+        'allergies': form.get('allergies', '').strip(),
+        'antral_follicle_count': form.get('antral_follicle_count', '').strip(),
+        'fsh_levels': form.get('fsh_levels', '').strip(),
+        'amh_levels': form.get('amh_levels', '').strip(),
+        'tobacco_use': form.get('tobacco_use', 'No'),
+        'tobacco_frequency': form.get('tobacco_frequency', '').strip(),
+        'alcohol': form.get('alcohol', 'No'),
+        'alcohol_frequency': form.get('alcohol_frequency', '').strip(),
+        'drug_use': form.get('drug_use', 'No'),
+        'exercise_routine': form.get('exercise_routine', '').strip(),
+        'consent_registry': 'Yes' if form.get('consent_registry') else 'No',
+        'place': form.get('place', '').strip(),
+        'ivf_name': form.get('ivf_name', '').strip(),
+        'ivf_address': form.get('ivf_address', '').strip(),
+        'doctor_name': form.get('doctor_name', '').strip(),
+        'date': datetime.now().strftime('%d/%m/%y')
+    }
+
+    # Server-side validation
+    required_fields = ['full_name', 'aadhaar_number', 'date_of_discussion', 'date_of_consultancy', 'ivf_name', 'ivf_address', 'doctor_name']
+    errors = []
+    for field in required_fields:
+        if not form_data[field]:
+            errors.append(f"{field.replace('_', ' ').title()} is required.")
+
+    # Validate Aadhaar number
+    if form_data['aadhaar_number'] and not re.match(r'^\d{12}$', form_data['aadhaar_number']):
+        errors.append("Aadhaar Number must be 12 digits.")
+
+    # Validate phone number
+    if form_data['contact_number'] and not re.match(r'^\d{10}$|^$', form_data['contact_number']):
+        errors.append("Contact Number must be 10 digits if provided.")
+
+    # Validate PIN code
+    if form_data['pin_code'] and not re.match(r'^\d{6}$|^$', form_data['pin_code']):
+        errors.append("PIN Code must be 6 digits if provided.")
+
+    # Validate age
+    try:
+        if form_data['age']:
+            age = int(form_data['age'])
+            if age < 18 or age > 100:
+                errors.append("Age must be between 18 and 100.")
+    except ValueError:
+        errors.append("Age must be a valid number.")
+
+    # Validate dates
+    today = datetime.now().date()
+    for date_field in ['date_of_birth', 'date_of_discussion', 'date_of_consultancy', 'last_medical_exam']:
+        if form_data[date_field]:
+            try:
+                input_date = datetime.strptime(form_data[date_field], '%Y-%m-%d').date()
+                if input_date > today:
+                    errors.append(f"{date_field.replace('_', ' ').title()} cannot be in the future.")
+            except ValueError:
+                errors.append(f"Invalid format for {date_field.replace('_', ' ').title()}.")
+
+    # Validate number of children
+    try:
+        num_children = int(form_data['num_children']) if form_data['num_children'] else 0
+        if num_children < 0:
+            errors.append("Number of children cannot be negative.")
+        elif num_children > 20:
+            errors.append("Number of children cannot exceed 20.")
+    except ValueError:
+        errors.append("Number of children must be a valid number.")
+        num_children = 0
+
+    # Validate children ages
+    children_ages = []
+    for i in range(1, num_children + 1):
+        age = form.get(f'child_{i}_age', '').strip()
+        try:
+            if age:
+                age_val = int(age)
+                if age_val < 0 or age_val > 100:
+                    errors.append(f"Child {i} Age must be between 0 and 100.")
+                children_ages.append(f"Child {i}: Age: {age}")
+            else:
+                children_ages.append(f"Child {i}: Age: N/A")
+        except ValueError:
+            errors.append(f"Child {i} Age must be a valid number.")
+
+    # Validate conditional fields
+    if form_data['tobacco_use'] == 'Yes' and not form_data['tobacco_frequency']:
+        errors.append("Tobacco Frequency is required if tobacco use is Yes.")
+    if form_data['alcohol'] == 'Yes' and not form_data['alcohol_frequency']:
+        errors.append("Alcohol Frequency is required if alcohol consumption is Yes.")
+
+    # Validate blood test results
+    for field in ['hiv_results', 'hbv_results', 'hcv_results', 'vdrl_results']:
+        if form_data[field] and form_data[field].lower() not in ['negative', 'positive', 'pending', '']:
+            errors.append(f"{field.replace('_', ' ').title()} must be 'Negative', 'Positive', or 'Pending'.")
+
+    form_data['children_ages'] = '\n'.join(children_ages) if children_ages else 'None'
+
+    return form_data, errors
+
+
+def legacy_parse_commissioning_couple_form(form):
+    """The hand-written commissioning couple validation the schema replaced."""
+    form_data = {
+        'female_name': form.get('female_name', '').strip(),
+        'male_name': form.get('male_name', '').strip(),
+        'female_age': form.get('female_age', '').strip(),
+        'female_dob': form.get('female_dob', '').strip(),
+        'female_aadhaar': form.get('female_aadhaar', '').strip(),
+        'female_occupation': form.get('female_occupation', '').strip(),
+        'male_age': form.get('male_age', '').strip(),
+        'male_dob': form.get('male_dob', '').strip(),
+        'address': form.get('address', '').strip(),
+        'district': form.get('district', '').strip(),
+        'state': form.get('state', '').strip(),
+        'pin_code': form.get('pin_code', '').strip(),
+        'place': form.get('place', '').strip(),
+        'ivf_name': form.get('ivf_name', '').strip(),
+        'ivf_address': form.get('ivf_address', '').strip(),
+        'doctor_name': form.get('doctor_name', '').strip(),
+        'date': datetime.now().strftime('%d/%m/%y')
+    }
+
+    # Server-side validation
+    required_fields = ['female_name', 'male_name', 'female_aadhaar', 'female_dob', 'male_dob', 'ivf_name', 'ivf_address', 'doctor_name']
+    errors = []
+    for field in required_fields:
+        if not form_data[field]:
+            errors.append(f"{field.replace('_', ' ').title()} is required.")
+
+    # Validate Aadhaar number
+    if form_data['female_aadhaar'] and not re.match(r'^\d{12}$', form_data['female_aadhaar']):
+        errors.append("Female Aadhaar Number must be 12 digits.")
+
+    # Validate PIN code
+    if form_data['pin_code'] and not re.match(r'^\d{6}$|^$', form_data['pin_code']):
+        errors.append("PIN Code must be 6 digits if provided.")
+
+    # Validate ages
+    for field in ['female_age', 'male_age']:
+        try:
+            if form_data[field]:
+                age = int(form_data[field])
+                if age < 18 or age > 100:
+                    errors.append(f"{field.replace('_', ' ').title()} must be between 18 and 100.")
+        except ValueError:
+            errors.append(f"{field.replace('_', ' ').title()} must be a valid number.")
+
+    # Validate dates
+    today = datetime.now().date()
+    for date_field in ['female_dob', 'male_dob']:
+        if form_data[date_field]:
+            try:
+                input_date = datetime.strptime(form_data[date_field], '%Y-%m-%d').date()
+                if input_date > today:
+                    errors.append(f"{date_field.replace('_', ' ').title()} cannot be in the future.")
+            except ValueError:
+                errors.append(f"Invalid format for {date_field.replace('_', ' ').title()}.")
+
+    return form_data, errors
+
+
+LEGACY = {
+    'sperm': legacy_parse_sperm_form,
+    'oocyte': legacy_parse_oocyte_form,
+    'commissioning_couple': legacy_parse_commissioning_couple_form,
+}
+
+# Values to draw from per field; a few of each are deliberately invalid
+SAMPLES = {
+    'aadhaar': ['123412341234', '987698769876', '1234', ''],
+    'phone': ['9876543210', '98765', ''],
+    'pin': ['560010', '5600', ''],
+    'email': ['donor@example.com', 'not-an-email', ''],
+    'date': ['1990-05-17', '2024-01-01', '2099-01-01', '17/05/1990', ''],
+    'age': ['30', '17', 'thirty', ''],
+    'count': ['0', '1', '2', '3', '25', '-1', 'two'],
+    'blood': ['Negative', 'positive', 'Pending', 'unknown', ''],
+    'yes_no': ['Yes', 'No'],
+    'text': ['Sample text', '  padded  ', ''],
+}
+
+
+def sample_for(name, rng):
+    if 'aadhaar' in name:
+        kind = 'aadhaar'
+    elif name == 'contact_number':
+        kind = 'phone'
+    elif name == 'pin_code':
+        kind = 'pin'
+    elif name == 'email_address':
+        kind = 'email'
+    elif name.startswith('date_of') or name.endswith('_dob') or name == 'last_medical_exam':
+        kind = 'date'
+    elif name == 'age' or name.endswith('_age'):
+        kind = 'age'
+    elif name == 'num_children':
+        kind = 'count'
+    elif name.endswith('_results'):
+        kind = 'blood'
+    elif name in ('smoking', 'alcohol', 'tobacco_use', 'drug_use', 'donor_experience') or name.startswith('consent_'):
+        kind = 'yes_no'
+    else:
+        kind = 'text'
+    return rng.choice(SAMPLES[kind])
+
+
+def synthetic_records(form_type, count, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        record = {name: sample_for(name, rng) for name in form_type.schema.field_names}
+        for i in range(1, 4):
+            record[f'child_{i}_age'] = rng.choice(['4', '150', 'x', ''])
+        records.append(record)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'form':<22}{'records':>9}{'legacy ms':>11}{'schema ms':>11}{'speedup':>9}  same result")
+    for name, form_type in FORM_TYPES.items():
+        records = synthetic_records(form_type, args.records)
+        legacy = LEGACY[name]
+
+        start = time.perf_counter()
+        legacy_results = [legacy(record) for record in records]
+        legacy_ms = (time.perf_counter() - start) * 1e3
+
+        start = time.perf_counter()
+        schema_results = [form_type.parse(record) for record in records]
+        schema_ms = (time.perf_counter() - start) * 1e3
+
+        same = legacy_results == schema_results
+        print(f"{name:<22}{len(records):>9}{legacy_ms:>11.1f}{schema_ms:>11.1f}{legacy_ms / schema_ms:>8.1f}x  {same}")
+
+
+if __name__ == '__main__':
+    main()
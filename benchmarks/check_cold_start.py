@@ -0,0 +1,131 @@
+"""
+Checks the app's cold start against a time budget.
+
+Each run is a fresh Python process, as on a new serverless instance, which:
+- imports api/app.py (python-docx must not be imported yet),
+- serves GET / through the Flask test client (the first response),
+- waits for the background warm-up the first response starts,
+- posts one oocyte form and downloads its ZIP (the first document).
+
+It reports the median of each over the runs and exits with status 1 if import
+plus first response exceeds --budget-ms, or if python-docx was imported before
+the first response. --profile-import also prints `python -X importtime` for the
+app, rolled up by top-level package and by the slowest modules.
+
+Usage:
+    python benchmarks/check_cold_start.py [--runs N] [--budget-ms MS] [--profile-import]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in each fresh process; prints one JSON line of timings in milliseconds
+CHILD = """
+import json, os, re, sys, time
+start = time.perf_counter()
+sys.path.insert(0, 'api')
+import app as app_module
+imported = time.perf_counter()
+docx_at_import = 'docx' in sys.modules
+
+client = app_module.app.test_client()
+# A different client address per run, so repeated runs aren't rate limited
+client.environ_base['REMOTE_ADDR'] = f'10.{os.getpid() % 250}.{os.getpid() // 250 % 250}.1'
+response = client.get('/')
+assert response.status_code == 200, response.status_code
+first_response = time.perf_counter()
+docx_at_first_response = 'docx' in sys.modules
+response.close()  # Sends the close a WSGI server would, which starts the warm-up
+
+app_module.warm_up.done.wait(60)
+warmed = time.perf_counter()
+
+sys.path.insert(0, 'benchmarks')
+from donors import synthetic_donors
+page = client.post('/generate_oocyte', data=synthetic_donors('oocyte', 1)[0]).get_data(as_text=True)
+token = re.search(r'/download/([^"]+)', page).group(1)
+assert client.get(f'/download/{token}').status_code == 200
+first_document = time.perf_counter()
+
+print(json.dumps({
+    'import_ms': (imported - start) * 1e3,
+    'first_response_ms': (first_response - start) * 1e3,
+    'warm_up_ms': (warmed - first_response) * 1e3,
+    'first_document_ms': (first_document - warmed) * 1e3,
+    'docx_at_import': docx_at_import,
+    'docx_at_first_response': docx_at_first_response,
+}))
+"""
+
+
+def run_child():
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def profile_import(top):
+    """Prints the app's import time by top-level package and its slowest modules."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', "import sys; sys.path.insert(0, 'api'); import app"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    packages = {}
+    for name, self_us, _ in modules:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    total = sum(packages.values())
+
+    print(f"Import time by top-level package ({total / 1e3:.0f} ms in total)")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<32}{self_us / 1e3:>9.1f} ms{self_us / total:>7.0%}")
+    print("Slowest modules, including what they import")
+    for name, _, cumulative_us in sorted(modules, key=lambda module: -module[2])[:top]:
+        print(f"  {name:<48}{cumulative_us / 1e3:>9.1f} ms")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Fresh processes to measure')
+    parser.add_argument('--budget-ms', type=float, default=1000, help='Budget for import plus first response')
+    parser.add_argument('--profile-import', action='store_true', help='Also print an import time report')
+    parser.add_argument('--top', type=int, default=15, help='Rows in each part of the import report')
+    args = parser.parse_args()
+
+    if args.profile_import:
+        profile_import(args.top)
+
+    runs = [run_child() for _ in range(args.runs)]
+    for key in ('import_ms', 'first_response_ms', 'warm_up_ms', 'first_document_ms'):
+        values = [run[key] for run in runs]
+        print(f"{key:<20}median {statistics.median(values):>8.1f}   max {max(values):>8.1f}")
+
+    failed = False
+    first_response = statistics.median(run['first_response_ms'] for run in runs)
+    if first_response > args.budget_ms:
+        print(f"FAIL: first response after {first_response:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if any(run['docx_at_import'] or run['docx_at_first_response'] for run in runs):
+        print("FAIL: python-docx was imported before the first response")
+        failed = True
+    if not failed:
+        print(f"OK: first response after {first_response:.0f} ms, within the {args.budget_ms:.0f} ms budget")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
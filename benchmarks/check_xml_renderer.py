@@ -0,0 +1,78 @@
+"""
+Checks that the XML renderer produces the same package as the python-docx
+renderer for every template in templates_docx/, and compares their cost.
+
+Every zip member must match byte for byte, in the same order and with the same
+compression. Only the members' timestamps can differ (both writers stamp the
+current time). Exits with status 1 on any mismatch.
+
+Usage:
+    python benchmarks/check_xml_renderer.py [--iterations N]
+"""
+import argparse
+import copy
+import io
+import os
+import sys
+import time
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+
+from substitution import document_stories  # noqa: E402
+from template_registry import TemplateRegistry  # noqa: E402
+
+TEMPLATES_DIR = os.path.join(ROOT, 'templates_docx')
+
+
+def render_docx(entry, values):
+    doc = copy.deepcopy(entry.document)
+    entry.compiled.render(document_stories(doc), values)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def render_xml(entry, values):
+    return entry.package.render(entry.compiled, values)[0]
+
+
+def members(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return [(info.filename, info.compress_type, zf.read(info)) for info in zf.infolist()]
+
+
+def timed(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    registry = TemplateRegistry(TEMPLATES_DIR)
+    failed = False
+    print(f"{'template':<36}{'docx ms':>9}{'xml ms':>9}{'speedup':>9}  identical")
+    for name in sorted(os.listdir(TEMPLATES_DIR)):
+        if not name.endswith('.docx'):
+            continue
+        entry = registry.get(os.path.join(TEMPLATES_DIR, name))
+        # Newlines and tabs exercise the w:br/w:tab conversion as well
+        values = {key: f'Sample {key}\nline two\tend' for key in entry.compiled.placeholders}
+
+        identical = members(render_docx(entry, values)) == members(render_xml(entry, values))
+        failed = failed or not identical
+        docx_ms = timed(lambda: render_docx(entry, values), args.iterations)
+        xml_ms = timed(lambda: render_xml(entry, values), args.iterations)
+        print(f"{name:<36}{docx_ms:>9.2f}{xml_ms:>9.2f}{docx_ms / xml_ms:>8.1f}x  {identical}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
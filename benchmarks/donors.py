@@ -0,0 +1,134 @@
+"""
+Synthetic, valid submissions for each form type, for the benchmarks.
+
+Donors are generated from a seed, so the same arguments always give the same
+submissions and benchmark runs can be compared with each other.
+"""
+import random
+from datetime import date, timedelta
+
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Ananya', 'Vihaan', 'Meera', 'Kabir', 'Saanvi', 'Arjun', 'Priya']
+LAST_NAMES = ['Sharma', 'Iyer', 'Reddy', 'Nair', 'Patel', 'Gupta', 'Rao', 'Menon', 'Das', 'Singh']
+CITIES = [('Bengaluru', 'Karnataka'), ('Chennai', 'Tamil Nadu'), ('Kochi', 'Kerala'), ('Pune', 'Maharashtra')]
+CLINICS = ['Sunrise Fertility Centre', 'Green Valley IVF', 'Lotus ART Clinic']
+NOTES = ['None', 'Not applicable', 'Seasonal allergy to pollen, no medication required.']
+
+
+def _digits(rng, count):
+    return ''.join(rng.choice('0123456789') for _ in range(count))
+
+
+def _past_date(rng, min_days, max_days):
+    return (date.today() - timedelta(days=rng.randint(min_days, max_days))).isoformat()
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _children(rng, form):
+    count = rng.randint(0, 3)
+    form['num_children'] = str(count)
+    for i in range(1, count + 1):
+        form[f'child_{i}_age'] = str(rng.randint(1, 17))
+
+
+def _address(rng, form):
+    city, state = rng.choice(CITIES)
+    form.update({
+        'address': f"{rng.randint(1, 999)}, {rng.randint(1, 40)}th Cross, {city}",
+        'pin_code': _digits(rng, 6),
+        'contact_number': _digits(rng, 10),
+    })
+    return city, state
+
+
+def sperm_donor(rng):
+    form = {
+        'full_name': _name(rng),
+        'aadhaar_number': _digits(rng, 12),
+        'date_of_birth': _past_date(rng, 21 * 365, 40 * 365),
+        'email_address': f"donor{_digits(rng, 4)}@example.com",
+        'donor_id': f"SD-{_digits(rng, 5)}",
+        'date_of_discussion': _past_date(rng, 10, 60),
+        'date_of_consultancy': _past_date(rng, 1, 9),
+        'genetic_disorders': rng.choice(NOTES),
+        'family_history': rng.choice(NOTES),
+        'current_medications': rng.choice(NOTES),
+        'allergies': rng.choice(NOTES),
+        'last_medical_exam': _past_date(rng, 30, 365),
+        'hiv_results': 'Negative',
+        'hbv_results': 'Negative',
+        'hcv_results': 'Negative',
+        'vdrl_results': rng.choice(['Negative', 'Pending']),
+        'serious_illness': 'None',
+        'smoking': rng.choice(['Yes', 'No']),
+        'alcohol': rng.choice(['Yes', 'No']),
+        'drug_use': 'No',
+        'diet': rng.choice(['Vegetarian', 'Non-Vegetarian']),
+        'marital_status': rng.choice(['Single', 'Married']),
+        'donor_experience': 'No',
+        'height': str(rng.randint(160, 190)),
+        'weight': str(rng.randint(55, 90)),
+        'education': rng.choice(['B.Sc.', 'B.E.', 'M.A.']),
+        'mother_tongue': rng.choice(['Kannada', 'Tamil', 'Hindi']),
+        'skin_colour': 'Wheatish',
+        'hair_colour': 'Black',
+        'eye_colour': 'Brown',
+        'religion': 'Hindu',
+        'occupation': rng.choice(['Engineer', 'Teacher', 'Student']),
+        'consent_cryopreservation': 'on',
+        'consent_art_bank': 'on',
+        'consent_registry': 'on',
+    }
+    _address(rng, form)
+    _children(rng, form)
+    if form['smoking'] == 'Yes':
+        form.update({'smoking_frequency': 'Occasionally', 'cigarettes_per_day': str(rng.randint(1, 5))})
+    if form['alcohol'] == 'Yes':
+        form.update({'alcohol_frequency': 'Weekly', 'alcohol_amount': '2 drinks'})
+    return form
+
+
+def oocyte_donor(rng):
+    form = {
+        'full_name': _name(rng),
+        'aadhaar_number': _digits(rng, 12),
+        'age': str(rng.randint(23, 35)),
+        'date_of_discussion': _past_date(rng, 10, 60),
+        'date_of_consultancy': _past_date(rng, 1, 9),
+        'ivf_name': rng.choice(CLINICS),
+        'ivf_address': f"{rng.randint(1, 99)} MG Road",
+        'doctor_name': f"Dr. {_name(rng)}",
+    }
+    form['district'], form['state'] = _address(rng, form)
+    _children(rng, form)
+    return form
+
+
+def commissioning_couple(rng):
+    return {
+        'female_name': _name(rng),
+        'male_name': _name(rng),
+        'female_aadhaar': _digits(rng, 12),
+        'female_dob': _past_date(rng, 28 * 365, 42 * 365),
+        'male_dob': _past_date(rng, 30 * 365, 45 * 365),
+        'female_age': str(rng.randint(28, 42)),
+        'male_age': str(rng.randint(30, 45)),
+        'ivf_name': rng.choice(CLINICS),
+        'ivf_address': f"{rng.randint(1, 99)} MG Road",
+        'doctor_name': f"Dr. {_name(rng)}",
+    }
+
+
+GENERATORS = {
+    'sperm': sperm_donor,
+    'oocyte': oocyte_donor,
+    'commissioning_couple': commissioning_couple,
+}
+
+
+def synthetic_donors(form_type_name, count, seed=0):
+    """Returns count raw submissions (as a browser would post them) for a form type."""
+    rng = random.Random(f"{form_type_name}:{seed}")
+    return [GENERATORS[form_type_name](rng) for _ in range(count)]
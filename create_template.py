@@ -1,8 +1,22 @@
+import docx
 from docx import Document
 from docx.shared import Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import argparse
+import hashlib
+import inspect
+import json
 import os
+import sys
+
+# The form definitions and the template compiler live with the app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+from forms import FORM_TYPES  # noqa: E402
+from template_registry import write_sidecar  # noqa: E402
+from tenants import TENANT_PLACEHOLDERS  # noqa: E402
 
 def apply_official_style(doc):
     """
@@ -47,12 +61,12 @@ def create_form_15_template():
     p.add_run('I, ').bold = True
     p.add_run('{full_name}, residing at {address}, PIN Code: {pin_code}, Mobile: {contact_number}, Aadhaar Number {aadhaar_number}, willingly consent to donate my sperm to couple/individual who are unable to have a child by other means. At this stage and to the best of my knowledge I am free of any infectious diseases or genetic disorders.')
 
-    doc.add_paragraph('I have had a full discussion with ').add_run('Dr. Ravikumar N.R').bold = True
-    doc.add_paragraph('on {date_of_discussion}, address Subash Nagara, B.H Road, Nelamangala Town, Bengaluru District, Karnataka-562123.')
+    doc.add_paragraph('I have had a full discussion with ').add_run('{tenant_doctor_name}').bold = True
+    doc.add_paragraph('on {date_of_discussion}, address {tenant_doctor_address}.')
     
     p = doc.add_paragraph('I have been counselled by ')
-    p.add_run('Ranjana Basavaraj Byadagi').bold = True
-    p.add_run(', address Avaraguppa, Avaraguppa Post, Siddapura, Uttara Kannada-581355 on {date_of_consultancy}.')
+    p.add_run('{tenant_counsellor_name}').bold = True
+    p.add_run(', address {tenant_counsellor_address} on {date_of_consultancy}.')
     
     doc.add_paragraph('(I understand that there will be no direct or indirect contact between the recipient, and me, and my personal identity will not be disclosed to the recipient or to the child born through the use of my gamete: If applicable)')
     doc.add_paragraph('I understand that I shall have no rights whatsoever on the resulting offspring and vice versa.')
@@ -67,7 +81,7 @@ def create_form_15_template():
     for text in [
         '\n_______________________________\nName and signature of the Doctor',
         '\n___________________________________________________________\nName, address and signature of the Witness from the ART bank',
-        '\nName and address of the ART bank\nCryoconserve Private Limited,\n3rd Floor, 59/1, Dr Rajkumar Road, 2nd Block,\nRajajinagar, Bengaluru, Karnataka 560010',
+        '\nName and address of the ART bank\n{tenant_bank_legal_name},\n{tenant_bank_address}',
         '\nDated: {date}'
     ]:
         p = doc.add_paragraph(text)
@@ -85,7 +99,7 @@ def create_medical_history_template():
     doc.add_paragraph()
 
     # Left-align header info
-    for label, value in [("ART Bank Name: ", "Cryoconserve"), ("Donor ID: ", "{donor_id}"), ("Date: ", "{date}")]:
+    for label, value in [("ART Bank Name: ", "{tenant_bank_name}"), ("Donor ID: ", "{donor_id}"), ("Date: ", "{date}")]:
         p = doc.add_paragraph()
         p.alignment = WD_ALIGN_PARAGRAPH.LEFT
         p.add_run(label).bold = True
@@ -219,10 +233,10 @@ def create_form_13_template():
 
     # Left-align signature and address blocks
     for text in [
-        '\nName, address and signature of the Witness from the clinic\nMrs. Ruby Stella\nIVF Access, Coimbatore, at 609, 2nd Floor, Avinashi Road, above Pazhamudir Plus, Peelamedu, Coimbatore, Tamil Nadu 641004',
+        '\nName, address and signature of the Witness from the clinic\n{tenant_witness_name}\n{tenant_witness_address}',
         '\nName and signature of the Doctor\n{doctor_name}',
         '\nName and address of the ART clinic\n{ivf_name}, {ivf_address}',
-        '\nName and address of the ART bank that recruited and screened the donor\nCryoconserve, 3rd Floor, 59/1, 2nd Block, Rajajinagar, Bengaluru-560010',
+        '\nName and address of the ART bank that recruited and screened the donor\n{tenant_bank_name}, {tenant_bank_address_line}',
         '\nDated: {date}'
     ]:
         p = doc.add_paragraph(text)
@@ -238,7 +252,7 @@ def create_oocyte_medical_history_template():
     doc.add_heading('MEDICAL HISTORY AND SCREENING REPORT FOR OOCYTE DONOR', level=1).alignment = WD_ALIGN_PARAGRAPH.CENTER
     doc.add_paragraph()
 
-    for label, value in [("ART Bank Name: ", "Cryoconserve"), ("Donor ID: ", "{donor_id}"), ("Date: ", "{date}")]:
+    for label, value in [("ART Bank Name: ", "{tenant_bank_name}"), ("Donor ID: ", "{donor_id}"), ("Date: ", "{date}")]:
         p = doc.add_paragraph()
         p.alignment = WD_ALIGN_PARAGRAPH.LEFT
         p.add_run(label).bold = True
@@ -349,32 +363,135 @@ def create_commissioning_couple_affidavit_template():
 
     doc.save('templates_docx/commissioning_couple_affidavit.docx')
 
-def create_all_templates():
-    """Creates the output directory and generates all DOCX templates."""
+# Each template's builder and the file it writes
+TEMPLATE_BUILDERS = {
+    "Form 15": (create_form_15_template, 'form_15.docx'),
+    "Semen Donor Medical History": (create_medical_history_template, 'medical_history.docx'),
+    "Semen Donor Info Form": (create_donor_info_template, 'donor_info.docx'),
+    "Form 13": (create_form_13_template, 'form_13.docx'),
+    "Oocyte Donor Medical History": (create_oocyte_medical_history_template, 'oocyte_medical_history.docx'),
+    "Oocyte Donor Affidavit": (create_oocyte_donor_affidavit_template, 'oocyte_donor_affidavit.docx'),
+    "Commissioning Couple Affidavit": (create_commissioning_couple_affidavit_template, 'commissioning_couple_affidavit.docx'),
+}
+
+# Remembers what each template was last built from, so unchanged ones can be skipped
+BUILD_MANIFEST = '.build_manifest.json'
+
+def builder_hash(func):
+    """Hash of everything a template is built from: its builder, the shared styling and python-docx."""
+    source = inspect.getsource(func) + inspect.getsource(apply_official_style) + docx.__version__
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def validate_template(path):
+    """Raises if the file at path isn't a .docx python-docx can open, or has no text."""
+    doc = Document(path)
+    if not any(p.text.strip() for p in doc.paragraphs):
+        raise ValueError(f"{path} has no text")
+
+def build_template(name):
+    """Runs one builder and validates its output; used by the process pool."""
+    func, filename = TEMPLATE_BUILDERS[name]
+    func()
+    validate_template(os.path.join('templates_docx', filename))
+    return name
+
+def create_all_templates(force=False, workers=None):
+    """
+    Creates the output directory and generates the DOCX templates.
+
+    Templates whose builder, styling and output file are unchanged since the last
+    build are skipped unless force is set; the rest are built in a process pool.
+    Returns True if every template built and validated.
+    """
     output_dir = 'templates_docx'
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
         print(f"Created directory: {output_dir}")
-    
-    templates_to_create = {
-        "Form 15": create_form_15_template,
-        "Semen Donor Medical History": create_medical_history_template,
-        "Semen Donor Info Form": create_donor_info_template,
-        "Form 13": create_form_13_template,
-        "Oocyte Donor Medical History": create_oocyte_medical_history_template,
-        "Oocyte Donor Affidavit": create_oocyte_donor_affidavit_template,
-        "Commissioning Couple Affidavit": create_commissioning_couple_affidavit_template,
-    }
+
+    manifest_path = os.path.join(output_dir, BUILD_MANIFEST)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
 
     print("Starting template generation...")
-    for name, func in templates_to_create.items():
-        try:
-            func()
-            print(f"  ✓ Successfully generated: {name}")
-        except Exception as e:
-            print(f"  ✗ Failed to generate {name}: {e}")
-    
-    print("\nAll templates have been processed.")
+    hashes = {name: builder_hash(func) for name, (func, _) in TEMPLATE_BUILDERS.items()}
+    pending = []
+    for name, (_, filename) in TEMPLATE_BUILDERS.items():
+        path = os.path.join(output_dir, filename)
+        built = manifest.get(filename, {})
+        if not force and os.path.exists(path) and built.get('source') == hashes[name] and built.get('sha256') == file_hash(path):
+            print(f"  - Up to date: {name}")
+        else:
+            pending.append(name)
+
+    ok = True
+    try:
+        pool = ProcessPoolExecutor(max_workers=workers) if len(pending) > 1 else None
+    except (OSError, NotImplementedError) as e:
+        print(f"  Could not start a process pool, building serially: {e}")
+        pool = None
+    with pool or nullcontext():
+        if pool is not None:
+            futures = [(name, pool.submit(build_template, name)) for name in pending]
+        else:
+            futures = [(name, None) for name in pending]
+        for name, future in futures:
+            filename = TEMPLATE_BUILDERS[name][1]
+            try:
+                if future is not None:
+                    future.result()
+                else:
+                    build_template(name)
+                manifest[filename] = {'source': hashes[name], 'sha256': file_hash(os.path.join(output_dir, filename))}
+                print(f"  ✓ Successfully generated: {name}")
+            except Exception as e:
+                manifest.pop(filename, None)
+                ok = False
+                print(f"  ✗ Failed to generate {name}: {e}")
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"\nAll templates have been processed ({len(pending)} built, {len(TEMPLATE_BUILDERS) - len(pending)} up to date).")
+    return ok
+
+def compile_templates(output_dir='templates_docx'):
+    """
+    Writes the compiled sidecar (placeholder index, required fields, content hash)
+    next to every template the forms use, and checks that each placeholder is a
+    field its form produces or a tenant detail. Returns True if every template passed.
+    """
+    print("Compiling templates...")
+    ok = True
+    for form_type in FORM_TYPES.values():
+        for template in form_type.templates:
+            path = os.path.join(output_dir, template['file'])
+            try:
+                sidecar = write_sidecar(path)
+            except Exception as e:
+                print(f"  ✗ Failed to compile {template['file']}: {e}")
+                ok = False
+                continue
+            unknown = sorted(set(sidecar['required_fields']) - form_type.schema.produced_fields - TENANT_PLACEHOLDERS)
+            if unknown:
+                print(f"  ✗ {template['file']} uses fields the {form_type.name} form doesn't produce: {', '.join(unknown)}")
+                ok = False
+            else:
+                print(f"  ✓ Compiled {template['file']} ({len(sidecar['required_fields'])} fields)")
+    return ok
 
 if __name__ == '__main__':
-    create_all_templates()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Build the .docx templates and their compiled sidecars.')
+    parser.add_argument('--compile-only', action='store_true', help='Only (re)compile the existing templates')
+    parser.add_argument('--force', action='store_true', help='Rebuild every template, even unchanged ones')
+    parser.add_argument('--workers', type=int, help='Build processes (default: one per core)')
+    args = parser.parse_args()
+    built = args.compile_only or create_all_templates(force=args.force, workers=args.workers)
+    if not compile_templates() or not built:
+        sys.exit(1)
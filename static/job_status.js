@@ -0,0 +1,50 @@
+document.addEventListener('DOMContentLoaded', () => {
+    const statusBox = document.getElementById('jobStatus');
+    const heading = document.getElementById('jobHeading');
+    const jobUrl = statusBox.dataset.jobUrl;
+    const pollInterval = 1000;
+
+    function showReady(job) {
+        heading.textContent = 'Documents Generated Successfully';
+        statusBox.className = 'alert alert-success';
+        statusBox.textContent = 'Your documents have been generated successfully. ';
+        const link = document.createElement('a');
+        link.href = job.download_url;
+        link.className = 'alert-link';
+        link.textContent = 'Click here to download the ZIP file';
+        statusBox.appendChild(link);
+        statusBox.appendChild(document.createTextNode('.'));
+    }
+
+    function showFailed(errors) {
+        heading.textContent = 'An Error Occurred';
+        statusBox.className = 'alert alert-danger';
+        const list = document.createElement('ul');
+        errors.forEach(error => {
+            const item = document.createElement('li');
+            item.textContent = error;
+            list.appendChild(item);
+        });
+        statusBox.replaceChildren(list);
+    }
+
+    async function poll() {
+        try {
+            const response = await fetch(jobUrl, { headers: { 'Accept': 'application/json' } });
+            const job = await response.json();
+            if (job.status === 'done') {
+                showReady(job);
+                return;
+            }
+            if (job.status === 'failed' || job.status === 'unknown') {
+                showFailed(job.errors || ['Document generation failed.']);
+                return;
+            }
+        } catch (error) {
+            // Network hiccup: keep polling
+        }
+        setTimeout(poll, pollInterval);
+    }
+
+    poll();
+});
@@ -104,85 +104,82 @@ document.addEventListener('DOMContentLoaded', () => {
         field.addEventListener('input', updateProgressBar);
     });
 
-    // Form validation
-    form.addEventListener('submit', (event) => {
-        const errors = [];
-        const errorList = document.getElementById('errorList');
-        const errorModal = new bootstrap.Modal(document.getElementById('errorModal'));
-
-        // Required fields
-        ['full_name', 'aadhaar_number', 'date_of_discussion', 'date_of_consultancy', 'ivf_name', 'doctor_name'].forEach(field => {
-            const element = form[field];
-            if (!element || !element.value.trim()) {
-                errors.push(`${field.replace(/_/g, ' ').replace(/\b\w/g, c => c.toUpperCase())} is required.`);
-            }
-        });
+    // Validation runs the server's rules through /validate/oocyte, so errors show up
+    // as the user types and a rejected submission no longer re-renders the page
+    const validateUrl = '/validate/oocyte';
+    const errorModal = new bootstrap.Modal(document.getElementById('errorModal'));
+    const errorList = document.getElementById('errorList');
+    const validationTimers = {};
+    const validationRequests = {};
+
+    function showErrorModal(errors) {
+        if (errors) {
+            errorList.innerHTML = '';
+            errors.forEach(error => {
+                const item = document.createElement('li');
+                item.textContent = error;
+                errorList.appendChild(item);
+            });
+        }
+        errorModal.show();
+    }
 
-        // Pattern validations
-        if (form.aadhaar_number?.value && !/^\d{12}$/.test(form.aadhaar_number.value)) {
-            errors.push('Aadhaar Number must be 12 digits.');
-        }
-        if (form.contact_number?.value && !/^\d{10}$/.test(form.contact_number.value)) {
-            errors.push('Contact Number must be 10 digits.');
-        }
-        if (form.pin_code?.value && !/^\d{6}$/.test(form.pin_code.value)) {
-            errors.push('PIN Code must be 6 digits.');
+    function showFieldErrors(field, errors) {
+        const anchor = field.type === 'radio' ? field.closest('div') : field;
+        let feedback = anchor.parentElement.querySelector(`.invalid-feedback[data-field="${field.name}"]`);
+        field.classList.toggle('is-invalid', errors.length > 0);
+        if (errors.length === 0) {
+            if (feedback) feedback.remove();
+            return;
         }
-        if (form.email_address?.value && !/^[\w\.-]+@[\w\.-]+\.\w+$/.test(form.email_address.value)) {
-            errors.push('Invalid email address.');
+        if (!feedback) {
+            feedback = document.createElement('div');
+            // d-block: radios' feedback isn't a sibling of the invalid input
+            feedback.className = 'invalid-feedback d-block';
+            feedback.dataset.field = field.name;
+            anchor.insertAdjacentElement('afterend', feedback);
         }
+        feedback.textContent = errors.join(' ');
+    }
 
-        // Number range validations
-        if (form.age?.value && (parseInt(form.age.value) < 18 || parseInt(form.age.value) > 100)) {
-            errors.push('Age must be between 18 and 100.');
-        }
-        if (form.num_children?.value && (parseInt(form.num_children.value) < 0 || parseInt(form.num_children.value) > 20)) {
-            errors.push('Number of children must be between 0 and 20.');
-        }
-        if (document.getElementById('tobacco_use_yes')?.checked && !form.tobacco_frequency?.value.trim()) {
-            errors.push('Tobacco Frequency is required if tobacco use is Yes.');
-        }
-        if (document.getElementById('alcohol_yes')?.checked && !form.alcohol_frequency?.value.trim()) {
-            errors.push('Alcohol Frequency is required if alcohol consumption is Yes.');
-        }
-        ['antral_follicle_count', 'fsh_levels', 'amh_levels'].forEach(field => {
-            if (form[field]?.value && (isNaN(form[field].value) || parseFloat(form[field].value) < 0)) {
-                errors.push(`${field.replace(/_/g, ' ').replace(/\b\w/g, c => c.toUpperCase())} must be a non-negative number.`);
-            }
-        });
+    function validateField(field) {
+        // Only the latest value matters; drop the answer for an older one
+        if (validationRequests[field.name]) validationRequests[field.name].abort();
+        const controller = new AbortController();
+        validationRequests[field.name] = controller;
+        fetch(`${validateUrl}?field=${encodeURIComponent(field.name)}`, { method: 'POST', body: new FormData(form), signal: controller.signal })
+            .then(response => response.ok ? response.json() : null)
+            .then(result => {
+                if (result) showFieldErrors(field, result.errors);
+            })
+            .catch(() => {});  // Aborted or offline; the form is still checked on submit
+    }
 
-        // Date validations
-        ['date_of_birth', 'last_medical_exam', 'date_of_discussion', 'date_of_consultancy'].forEach(field => {
-            if (form[field]?.value && form[field].value > today) {
-                errors.push(`${field.replace(/_/g, ' ').replace(/\b\w/g, c => c.toUpperCase())} cannot be in the future.`);
-            }
-        });
+    function scheduleValidation(event) {
+        const field = event.target;
+        if (!field.name) return;
+        clearTimeout(validationTimers[field.name]);
+        validationTimers[field.name] = setTimeout(() => validateField(field), 400);
+    }
 
-        // Blood test result validations
-        ['hiv_results', 'hbv_results', 'hcv_results', 'vdrl_results'].forEach(field => {
-            if (form[field]?.value && !['Negative', 'Positive', 'Pending', ''].includes(form[field].value)) {
-                errors.push(`${field.replace(/_/g, ' ').replace(/\b\w/g, c => c.toUpperCase())} must be 'Negative', 'Positive', or 'Pending'.`);
-            }
-        });
-
-        // Child age validations
-        const numChildren = parseInt(form.num_children?.value) || 0;
-        for (let i = 1; i <= numChildren; i++) {
-            const ageInput = document.querySelector(`input[name=child_${i}_age]`);
-            if (ageInput && ageInput.value) {
-                const age = parseInt(ageInput.value);
-                if (isNaN(age) || age < 0 || age > 100) {
-                    errors.push(`Child ${i} Age must be between 0 and 100.`);
-                }
-            }
-        }
+    // Delegated, so the child age fields added later are covered too
+    form.addEventListener('input', scheduleValidation);
+    form.addEventListener('change', scheduleValidation);
 
-        if (errors.length > 0) {
-            event.preventDefault();
-            errorList.innerHTML = errors.map(error => `<li>${error}</li>`).join('');
-            errorModal.show();
-        } else {
-            console.log('Form validation passed, submitting...');
-        }
+    if (errorList.children.length > 0) showErrorModal();
+
+    form.addEventListener('submit', (event) => {
+        event.preventDefault();
+        fetch(validateUrl, { method: 'POST', body: new FormData(form) })
+            .then(response => response.ok ? response.json() : { valid: true })
+            // If the check itself fails, submit anyway: /generate_oocyte validates again
+            .catch(() => ({ valid: true }))
+            .then(result => {
+                if (result.valid) {
+                    form.submit();
+                } else {
+                    showErrorModal(result.errors);
+                }
+            });
     });
 });
@@ -11,9 +11,10 @@ document.addEventListener('DOMContentLoaded', () => {
     const alcoholDetails = document.getElementById('alcohol_details');
     const today = new Date().toISOString().split('T')[0];
 
-    // Initialize Bootstrap tooltips
+    // Initialize Bootstrap tooltips (this page is styled with Tailwind and may not load Bootstrap)
+    const hasBootstrap = typeof bootstrap !== 'undefined';
     const tooltipTriggerList = document.querySelectorAll('[data-bs-toggle="tooltip"]');
-    tooltipTriggerList.forEach(tooltipTriggerEl => new bootstrap.Tooltip(tooltipTriggerEl));
+    if (hasBootstrap) tooltipTriggerList.forEach(tooltipTriggerEl => new bootstrap.Tooltip(tooltipTriggerEl));
 
     // Set max date for date inputs
     document.querySelectorAll('input[type="date"]').forEach(input => {
@@ -56,7 +57,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 <input type="number" class="form-control" id="child_${i}_age" name="child_${i}_age" value="${existingValue}" min="0" max="100" title="Age must be between 0 and 100" data-bs-toggle="tooltip" data-bs-placement="right">
             `;
             childrenAgesDiv.appendChild(div);
-            new bootstrap.Tooltip(div.querySelector('input'));
+            if (hasBootstrap) new bootstrap.Tooltip(div.querySelector('input'));
         }
         updateProgressBar();
     }
@@ -93,79 +94,81 @@ document.addEventListener('DOMContentLoaded', () => {
         field.addEventListener('input', updateProgressBar);
     });
 
-    // Form validation
-    form.addEventListener('submit', (event) => {
-        const errors = [];
-        const errorList = document.getElementById('errorList');
-        const errorModal = new bootstrap.Modal(document.getElementById('errorModal'));
-
-        // Required fields
-        if (!form.full_name.value) errors.push('Full Name is required.');
-        if (!form.aadhaar_number.value) errors.push('Aadhaar Number is required.');
-        if (!form.date_of_discussion.value) errors.push('Date of Discussion is required.');
-        if (!form.date_of_consultancy.value) errors.push('Date of Consultancy is required.');
-
-        // Pattern validations
-        if (form.aadhaar_number.value && !/^\d{12}$/.test(form.aadhaar_number.value)) {
-            errors.push('Aadhaar Number must be 12 digits.');
-        }
-        if (form.contact_number.value && !/^\d{10}$/.test(form.contact_number.value)) {
-            errors.push('Contact Number must be 10 digits.');
-        }
-        if (form.pin_code.value && !/^\d{6}$/.test(form.pin_code.value)) {
-            errors.push('PIN Code must be 6 digits.');
-        }
-        if (form.email_address.value && !/^[\w\.-]+@[\w\.-]+\.\w+$/.test(form.email_address.value)) {
-            errors.push('Invalid email address.');
-        }
-        if (form.height.value && !/^\d+(\.\d+)? (cm|ft)$/.test(form.height.value)) {
-            errors.push('Height must be in format "number cm" or "number ft".');
-        }
-        if (form.weight.value && !/^\d+(\.\d+)? (kg|lbs)$/.test(form.weight.value)) {
-            errors.push('Weight must be in format "number kg" or "number lbs".');
-        }
+    // Validation runs the server's rules through /validate/sperm, so errors show up
+    // as the user types and a rejected submission no longer re-renders the page
+    const validateUrl = '/validate/sperm';
+    const errorModal = document.getElementById('errorModal');
+    const errorList = document.getElementById('errorList');
+    const validationTimers = {};
+    const validationRequests = {};
+
+    function showErrorModal(errors) {
+        if (errors) {
+            errorList.innerHTML = '';
+            errors.forEach(error => {
+                const item = document.createElement('li');
+                item.textContent = error;
+                errorList.appendChild(item);
+            });
+        }
+        errorModal.classList.remove('hidden');
+    }
 
-        // Number range validations
-        if (form.num_children.value && (parseInt(form.num_children.value) < 0 || parseInt(form.num_children.value) > 20)) {
-            errors.push('Number of children must be between 0 and 20.');
-        }
-        if (form.smoking_yes?.checked && (!form.smoking_frequency.value || !form.cigarettes_per_day.value)) {
-            errors.push('Smoking Frequency and Cigarettes per Day are required if smoking is Yes.');
+    function showFieldErrors(field, errors) {
+        const anchor = field.type === 'radio' ? field.closest('div') : field;
+        let message = anchor.parentElement.querySelector(`.field-error[data-field="${field.name}"]`);
+        if (errors.length === 0) {
+            if (message) message.remove();
+            return;
         }
-        if (form.alcohol_yes?.checked && (!form.alcohol_frequency.value || !form.alcohol_amount.value)) {
-            errors.push('Alcohol Frequency and Amount are required if alcohol consumption is Yes.');
+        if (!message) {
+            message = document.createElement('p');
+            message.className = 'field-error mt-1 text-sm text-red-500';
+            message.dataset.field = field.name;
+            anchor.insertAdjacentElement('afterend', message);
         }
+        message.textContent = errors.join(' ');
+    }
 
-        // Date validations
-        ['date_of_birth', 'last_medical_exam', 'date_of_discussion', 'date_of_consultancy'].forEach(field => {
-            if (form[field].value && form[field].value > today) {
-                errors.push(`${field.replace('_', ' ').replace(/\b\w/g, c => c.toUpperCase())} cannot be in the future.`);
-            }
-        });
+    function validateField(field) {
+        // Only the latest value matters; drop the answer for an older one
+        if (validationRequests[field.name]) validationRequests[field.name].abort();
+        const controller = new AbortController();
+        validationRequests[field.name] = controller;
+        fetch(`${validateUrl}?field=${encodeURIComponent(field.name)}`, { method: 'POST', body: new FormData(form), signal: controller.signal })
+            .then(response => response.ok ? response.json() : null)
+            .then(result => {
+                if (result) showFieldErrors(field, result.errors);
+            })
+            .catch(() => {});  // Aborted or offline; the form is still checked on submit
+    }
 
-        // Blood test result validations
-        ['hiv_results', 'hbv_results', 'hcv_results', 'vdrl_results'].forEach(field => {
-            if (form[field].value && !['Negative', 'Positive', 'Pending', ''].includes(form[field].value)) {
-                errors.push(`${field.replace('_', ' ').replace(/\b\w/g, c => c.toUpperCase())} must be 'Negative', 'Positive', or 'Pending'.`);
-            }
-        });
-
-        // Child age validations
-        const numChildren = parseInt(form.num_children.value) || 0;
-        for (let i = 1; i <= numChildren; i++) {
-            const ageInput = document.querySelector(`input[name=child_${i}_age]`);
-            if (ageInput && ageInput.value) {
-                const age = parseInt(ageInput.value);
-                if (isNaN(age) || age < 0 || age > 100) {
-                    errors.push(`Child ${i} Age must be between 0 and 100.`);
-                }
-            }
-        }
+    function scheduleValidation(event) {
+        const field = event.target;
+        if (!field.name) return;
+        clearTimeout(validationTimers[field.name]);
+        validationTimers[field.name] = setTimeout(() => validateField(field), 400);
+    }
 
-        if (errors.length > 0) {
-            event.preventDefault();
-            errorList.innerHTML = errors.map(error => `<li>${error}</li>`).join('');
-            errorModal.show();
-        }
+    // Delegated, so the child age fields added later are covered too
+    form.addEventListener('input', scheduleValidation);
+    form.addEventListener('change', scheduleValidation);
+
+    document.getElementById('closeErrorModal')?.addEventListener('click', () => errorModal.classList.add('hidden'));
+    if (errorList.children.length > 0) showErrorModal();
+
+    form.addEventListener('submit', (event) => {
+        event.preventDefault();
+        fetch(validateUrl, { method: 'POST', body: new FormData(form) })
+            .then(response => response.ok ? response.json() : { valid: true })
+            // If the check itself fails, submit anyway: /generate_sperm validates again
+            .catch(() => ({ valid: true }))
+            .then(result => {
+                if (result.valid) {
+                    form.submit();
+                } else {
+                    showErrorModal(result.errors);
+                }
+            });
     });
-});
\ No newline at end of file
+});